@@ -0,0 +1,46 @@
+"""
+Times encoding multi-megabyte default values as WDL literals,
+against the previous chained str.replace escaping.
+
+    python benchmarks/bench_literals.py
+"""
+import random
+import string
+import timeit
+
+from wdlgen.util import _quote_string, encode_wdl_literal
+
+
+def chained_replace(val: str) -> str:
+    sanitised = val.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return f'"{sanitised}"'
+
+
+def main():
+    rng = random.Random(0)
+    alphabet = string.ascii_letters + string.digits + '_-./"\\\n\t'
+
+    # ~4MB string, eg: an inlined file of regions
+    big_string = "".join(rng.choice(alphabet) for _ in range(4_000_000))
+    # ~100k sample names, many repeated
+    samples = [f"sample_{rng.randrange(20_000)}.bam" for _ in range(100_000)]
+    # a reference map of contig -> (path, length)
+    references = {
+        f"chr{i}_{j}": (f"/refs/chr{i}_{j}.fa", rng.randrange(10**9))
+        for i in range(25)
+        for j in range(1_000)
+    }
+
+    cases = [
+        ("4MB string (chained replace)", lambda: chained_replace(big_string)),
+        ("4MB string (_quote_string)", lambda: _quote_string(big_string)),
+        ("100k sample array", lambda: encode_wdl_literal(samples)),
+        ("25k entry Map[String, Pair]", lambda: encode_wdl_literal(references)),
+    ]
+    for name, case in cases:
+        best = min(timeit.repeat(case, number=1, repeat=5))
+        print(f"{name:<32} {best * 1000:8.1f}ms ({len(case()) / 1e6:.1f}MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ setup(
     license="GNU",
     packages=["wdlgen"],
     install_requires=[],
+    entry_points={"console_scripts": ["wdlgen=wdlgen.cli:main"]},
     zip_safe=False,
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -1,5 +1,39 @@
+from wdlgen import File, Output, Task, Workflow, WorkflowCall, WorkflowScatter
 
 
+def call(name: str, **inputs) -> WorkflowCall:
+    """
+    A call of the task 'name', with each input's value
+    """
+    return WorkflowCall(name, inputs_details={k: {"value": v} for k, v in inputs.items()})
+
+
+def echo_task(name: str = "tool", inputs=None, **kwargs) -> Task:
+    """
+    A task that runs echo, with a File output 'out', eg: echo_task(runtime=Task.Runtime(cpu=1))
+    """
+    return Task(
+        name,
+        inputs=inputs,
+        outputs=[Output(File, "out", "stdout()")],
+        command=Task.Command("echo"),
+        **kwargs,
+    )
+
+
+def chained_workflow(n: int) -> Workflow:
+    """
+    n calls, each reading the previous one's output, the second half within a scatter
+    """
+    calls = [
+        WorkflowCall("tool", alias=f"t{i}", inputs_details={"x": {"value": f"t{i - 1}.out"}})
+        for i in range(n)
+    ]
+    return Workflow(
+        "wf",
+        calls=[*calls[: n // 2], WorkflowScatter("i", "items", calls[n // 2 :])],
+    )
+
 
 def non_blank_lines_list(text: str) -> list[str]:
     lines = text.splitlines()
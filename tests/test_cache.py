@@ -0,0 +1,21 @@
+import pickle
+import unittest
+
+from wdlgen.cache import LruCache
+
+
+class TestLruCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LruCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a")
+        cache["c"] = 3
+        self.assertEqual(["a", "c"], list(cache))
+
+    def test_pickle(self):
+        cache = LruCache(2)
+        cache["a"] = 1
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual({"a": 1}, dict(copy))
+        self.assertEqual(2, copy.maxsize)
@@ -0,0 +1,133 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from wdlgen.cli import main
+from wdlgen.spec import compile_spec
+
+SPEC = {
+    "version": "1.0",
+    "tasks": [
+        {
+            "name": "hello",
+            "inputs": [{"name": "greeting", "type": "String", "default": "hi"}],
+            "outputs": [{"name": "out", "type": "File", "expression": "stdout()"}],
+            "command": {"base": "echo", "inputs": [{"name": "greeting", "prefix": "-g"}]},
+            "runtime": {"docker": '"ubuntu:20.04"'},
+        }
+    ],
+    "workflows": [
+        {
+            "name": "wf",
+            "inputs": [{"name": "items", "type": "Array[String]"}],
+            "calls": [
+                {
+                    "scatter": "i",
+                    "in": "items",
+                    "body": [{"call": "hello.hello", "inputs": {"greeting": "i"}}],
+                }
+            ],
+            "outputs": [{"name": "outs", "type": "Array[File]", "expression": "hello.out"}],
+        }
+    ],
+}
+
+TOML_SPEC = """
+[[tasks]]
+name = "toml_task"
+command = "echo hi"
+
+[[tasks.outputs]]
+name = "out"
+type = "String"
+expression = "read_string(stdout())"
+"""
+
+
+class TestSpec(unittest.TestCase):
+    def test_compile_spec(self):
+        workflows, tasks = compile_spec(SPEC)
+        task = tasks[0].get_string()
+        self.assertIn('String greeting = "hi"', task)
+        self.assertIn("-g ~{greeting}", task)
+
+        workflow = workflows[0].get_string()
+        self.assertIn('import "tools/hello.wdl" as hello', workflow)
+        self.assertIn("scatter (i in items)", workflow)
+        self.assertIn("call hello.hello", workflow)
+
+    def test_structs_are_per_spec(self):
+        task = {"name": "t", "inputs": [{"name": "s", "type": "Sample"}], "command": "echo"}
+        defined = {"version": "1.0", "structs": {"Sample": {"name": "String"}}, "tasks": [task]}
+        undefined = {"version": "1.0", "tasks": [task]}
+        self.assertIn("String name", compile_spec(defined)[1][0].get_string())
+        self.assertRaises(Exception, compile_spec, undefined)
+
+    def test_invalid_call(self):
+        self.assertRaises(
+            Exception, compile_spec, {"workflows": [{"name": "wf", "calls": [{}]}]}
+        )
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.specs = []
+        for i in range(3):
+            path = os.path.join(self.dir, f"spec{i}.json")
+            with open(path, "w") as f:
+                json.dump(SPEC, f)
+            self.specs.append(path)
+        toml_path = os.path.join(self.dir, "spec_toml.toml")
+        with open(toml_path, "w") as f:
+            f.write(TOML_SPEC)
+        self.specs.append(toml_path)
+        self.out = os.path.join(self.dir, "out")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compile_many(self):
+        self.assertEqual(0, main(["compile", *self.specs, "-o", self.out, "--jobs", "2"]))
+        for i in range(3):
+            self.assertTrue(os.path.exists(os.path.join(self.out, f"spec{i}", "wf.wdl")))
+            self.assertTrue(
+                os.path.exists(os.path.join(self.out, f"spec{i}", "tools", "hello.wdl"))
+            )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.out, "spec_toml", "tools", "toml_task.wdl"))
+        )
+
+    def test_changed_only(self):
+        args = ["compile", *self.specs, "-o", self.out, "--changed-only"]
+        self.assertEqual(0, main(args))
+
+        workflow_path = os.path.join(self.out, "spec0", "wf.wdl")
+        os.remove(workflow_path)
+        self.assertEqual(0, main(args))
+        self.assertFalse(os.path.exists(workflow_path))
+
+        with open(self.specs[0], "w") as f:
+            json.dump({**SPEC, "version": "development"}, f)
+        self.assertEqual(0, main([*args, "--timing"]))
+        self.assertTrue(os.path.exists(workflow_path))
+
+    def test_same_spec_name_is_rejected(self):
+        other = os.path.join(self.dir, "other")
+        os.mkdir(other)
+        duplicate = os.path.join(other, "spec0.json")
+        with open(duplicate, "w") as f:
+            json.dump(SPEC, f)
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["compile", self.specs[0], duplicate, "-o", self.out, "--jobs", "2"])
+        self.assertFalse(os.path.exists(self.out))
+
+    def test_failure_exit_code(self):
+        bad = os.path.join(self.dir, "bad.json")
+        with open(bad, "w") as f:
+            json.dump({"tasks": [{"name": "t", "inputs": [{"name": "x", "type": "Nope"}]}]}, f)
+        self.assertEqual(1, main(["compile", bad, "-o", self.out]))
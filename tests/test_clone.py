@@ -0,0 +1,58 @@
+import unittest
+
+from wdlgen import Input, Task, Workflow, WorkflowCall, String
+
+from tests.helpers import echo_task
+
+
+class TestClone(unittest.TestCase):
+    def setUp(self):
+        self.task = echo_task(
+            inputs=[Input(String, "a"), Input(String, "threads", "1", requires_quotes=False)],
+            runtime=Task.Runtime(cpu=1, memory='"4G"'),
+        )
+
+    def test_runtime_override_merges(self):
+        task = self.task
+        variant = task.clone(runtime={"cpu": 4})
+
+        self.assertEqual(4, variant.runtime["cpu"])
+        self.assertEqual('"4G"', variant.runtime["memory"])
+        self.assertEqual(1, task.runtime["cpu"])
+        self.assertIs(task.command, variant.command)
+        self.assertIs(task.outputs[0], variant.outputs[0])
+
+    def test_input_defaults(self):
+        task = self.task
+        variant = task.clone(input_defaults={"threads": "8"})
+
+        self.assertIn("String threads = 8", variant.get_string())
+        self.assertIn("String threads = 1", task.get_string())
+        self.assertIs(task.inputs[0], variant.inputs[0])
+        self.assertRaises(Exception, task.clone, input_defaults={"unknown": 1})
+
+    def test_lists_are_independent(self):
+        task = self.task
+        variant = task.clone()
+        variant.inputs.append(Input(String, "extra"))
+        self.assertEqual(2, len(task.inputs))
+
+    def test_unknown_attribute(self):
+        self.assertRaises(Exception, self.task.clone, not_an_attribute=1)
+
+    def test_fingerprint_not_copied(self):
+        task = self.task
+        fp = task.fingerprint()
+        self.assertNotEqual(fp, task.clone(name="other").fingerprint())
+
+    def test_workflow_and_call(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "x", "datatype": "String"}})
+        variant = call.clone(alias="tool2", input_values={"a": "y", "b": "z"})
+        self.assertEqual({"value": "y", "datatype": "String"}, variant.inputs_details["a"])
+        self.assertEqual({"value": "z"}, variant.inputs_details["b"])
+        self.assertEqual("x", call.inputs_details["a"]["value"])
+
+        workflow = Workflow("wf", inputs=[Input(String, "x")], calls=[call])
+        wf_variant = workflow.clone(input_defaults={"x": "default"}, calls=[variant])
+        self.assertIn('String x = "default"', wf_variant.get_string())
+        self.assertIs(call, workflow.calls[0])
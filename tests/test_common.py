@@ -1,6 +1,13 @@
 import unittest
 
 from wdlgen import ParameterMeta
+from wdlgen.util import (
+    convert_python_value_to_wdl_literal,
+    encode_wdl_literal,
+    get_referenced_identifiers,
+    parse_wdl_literal,
+    rename_identifiers,
+)
 
 
 class TestParamMeta(unittest.TestCase):
@@ -15,3 +22,61 @@ class TestParamMeta(unittest.TestCase):
     def test_backslackquote_sanitise(self):
         meta = ParameterMeta(foo='bar\\"').get_string()
         self.assertEqual('foo: "bar\\\\\\""', meta)
+
+    def test_list_value(self):
+        meta = ParameterMeta(foo=["a", 1]).get_string()
+        self.assertEqual('foo: ["a", 1]', meta)
+
+
+class TestLiteralEncoder(unittest.TestCase):
+    def test_scalars(self):
+        self.assertEqual("true", encode_wdl_literal(True))
+        self.assertEqual("1", encode_wdl_literal(1))
+        self.assertEqual("2.5", encode_wdl_literal(2.5))
+        self.assertEqual("None", encode_wdl_literal(None))
+
+    def test_string_escapes(self):
+        self.assertEqual(
+            '"a\\"b\\\\c\\n\\t\\x01\\x7f"', encode_wdl_literal('a"b\\c\n\t\x01\x7f')
+        )
+
+    def test_string_placeholders(self):
+        self.assertEqual('"\\~{x} \\${y} $z"', encode_wdl_literal("~{x} ${y} $z"))
+        self.assertEqual('"~{x}"', convert_python_value_to_wdl_literal("~{x}"))
+
+    def test_nested(self):
+        self.assertEqual(
+            '{"a": [(1, "x"), (2, "y")], "b": []}',
+            encode_wdl_literal({"a": [(1, "x"), (2, "y")], "b": []}),
+        )
+
+    def test_unsupported(self):
+        self.assertRaises(Exception, encode_wdl_literal, (1, 2, 3))
+        self.assertRaises(Exception, encode_wdl_literal, float("nan"))
+        self.assertRaises(Exception, encode_wdl_literal, object())
+
+
+class TestLiteralParser(unittest.TestCase):
+    def test_round_trip(self):
+        value = {"a": [1, -2.5, True, None], "b": ['x"\n\x01\\', "~{y}"]}
+        self.assertEqual(value, parse_wdl_literal(encode_wdl_literal(value)))
+
+    def test_pairs_and_map_keys(self):
+        self.assertEqual(
+            {"1": {"left": "a", "right": 2}}, parse_wdl_literal('{1: ("a", 2)}')
+        )
+        self.assertEqual("it's", parse_wdl_literal("'it\\'s'"))
+
+    def test_not_literals(self):
+        for expression in ["x", "[a]", '"~{x}"', "1 + 2", '"open']:
+            self.assertRaises(Exception, parse_wdl_literal, expression)
+
+
+class TestExpressionIdentifiers(unittest.TestCase):
+    def test_references_skip_members_and_literals(self):
+        refs = get_referenced_identifiers('task1.out + "x ~{y.z}" + 1.5')
+        self.assertEqual({"task1", "y"}, refs)
+
+    def test_rename(self):
+        renamed = rename_identifiers('i + "i ~{i}" + t.i', {"i": "j"})
+        self.assertEqual('j + "i ~{j}" + t.i', renamed)
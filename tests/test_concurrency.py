@@ -0,0 +1,92 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from wdlgen import (
+    Input,
+    Output,
+    Task,
+    Workflow,
+    WorkflowCall,
+    WorkflowScatter,
+    WorkflowConditional,
+    StepValueLine,
+    StepValueSection,
+    Meta,
+    ParameterMeta,
+    String,
+    File,
+)
+
+
+class TestConcurrentRendering(unittest.TestCase):
+    def setUp(self):
+        calls = [
+            WorkflowCall(
+                "tools.tool",
+                alias=f"tool{i}",
+                inputs_details={
+                    f"inp{j}": {"value": f"x{j}", "position": 10 - j, "datatype": "String"}
+                    for j in range(10)
+                },
+                messages=[f"message {i}"],
+            )
+            for i in range(20)
+        ]
+        self.workflow = Workflow(
+            "wf",
+            inputs=[Input(String, f"x{j}") for j in range(10)],
+            calls=[
+                *calls[:10],
+                WorkflowScatter("i", "items", calls[10:15]),
+                WorkflowConditional("flag", calls[15:]),
+            ],
+            outputs=[Output(File, "out", "tool0.out")],
+            meta=Meta(author="illusional"),
+        )
+        self.task = Task(
+            "tool",
+            inputs=[Input(String, f"inp{j}") for j in range(10)],
+            command=Task.Command(
+                "echo",
+                inputs=[
+                    Task.Command.CommandInput.from_fields(f"inp{j}", position=j)
+                    for j in range(10)
+                ],
+            ),
+            runtime=Task.Runtime(cpu=2),
+            parameter_meta=ParameterMeta(inp0="help"),
+        )
+
+    def test_render_shared_model_from_threads(self):
+        workflow, task = self.workflow, self.task
+        expected = (workflow.get_string(), workflow.get_string(compact=True), task.get_string())
+
+        def render(i):
+            return (
+                workflow.get_string(),
+                workflow.get_string(compact=True),
+                task.get_string(),
+            )
+
+        with ThreadPoolExecutor(max_workers=16) as ex:
+            results = list(ex.map(render, range(400)))
+
+        self.assertTrue(all(r == expected for r in results))
+
+    def test_render_has_no_side_effects(self):
+        workflow = self.workflow
+        before = dict(vars(workflow.calls[0]))
+        workflow.get_string()
+        self.assertEqual(before, vars(workflow.calls[0]))
+
+    def test_order_lines_copies(self):
+        lines = [StepValueLine("b", "1", position=2), StepValueLine("a", "2", position=1)]
+        section = StepValueSection(lines)
+        self.assertEqual(["a", "b"], [l.tag for l in section.order_lines(lines)])
+        self.assertEqual(["a", "b"], [l.tag for l in section.lines])
+        self.assertEqual(["b", "a"], [l.tag for l in lines])
+
+    def test_inputs_details_not_shared(self):
+        a, b = WorkflowCall("a"), WorkflowCall("b")
+        a.inputs_details["x"] = {"value": "y"}
+        self.assertEqual({}, b.inputs_details)
@@ -0,0 +1,128 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from tests.test_cli import SPEC
+from wdlgen.cli import main
+from wdlgen.daemon import Client, GenerationServer, LruCache
+from wdlgen.spec import render_spec_bundle
+
+
+class TestTaskCache(unittest.TestCase):
+    def test_structs_in_key(self):
+        task = {"name": "t", "inputs": [{"name": "s", "type": "Sample"}], "command": "echo"}
+        cache = LruCache(4)
+        for members, expected in (({"name": "String"}, "String name"), ({"bam": "File"}, "File bam")):
+            spec = {"version": "1.0", "structs": {"Sample": members}, "tasks": [task]}
+            files = render_spec_bundle(spec, task_cache=cache)
+            self.assertIn(expected, files["tools/t.wdl"])
+        self.assertEqual(2, len(cache))
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "wdlgen.sock")
+        self.server = GenerationServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def test_socket_path_in_use(self):
+        # a live daemon's socket
+        self.assertRaises(Exception, GenerationServer, self.socket_path)
+        self.assertTrue(os.path.exists(self.socket_path))
+
+        not_a_socket = os.path.join(self.tmp.name, "file")
+        with open(not_a_socket, "w") as f:
+            f.write("keep")
+        self.assertRaises(Exception, GenerationServer, not_a_socket)
+        self.assertTrue(os.path.exists(not_a_socket))
+
+    def test_replaces_stale_socket(self):
+        stale = os.path.join(self.tmp.name, "stale.sock")
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(stale)
+        s.close()
+        server = GenerationServer(stale)
+        server.server_close()
+        self.assertFalse(os.path.exists(stale))
+
+    def test_ping_while_rendering(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_render(*args, **kwargs):
+            started.set()
+            release.wait(10)
+            return {}
+
+        with mock.patch("wdlgen.daemon.render_spec_bundle", slow_render):
+            with Client(self.socket_path, timeout=10) as rendering:
+                thread = threading.Thread(target=rendering.render, args=(SPEC,))
+                thread.start()
+                self.assertTrue(started.wait(10))
+                with Client(self.socket_path, timeout=5) as client:
+                    self.assertTrue(client.request("ping")["ok"])
+                release.set()
+                thread.join()
+
+    def test_render_is_cached(self):
+        with Client(self.socket_path, timeout=10) as client:
+            self.assertTrue(client.request("ping")["ok"])
+            files = client.render(SPEC)
+            again = client.render(SPEC)
+            stats = client.request("stats")
+
+        self.assertEqual(files, again)
+        self.assertIn("call hello.hello", files["wf.wdl"])
+        self.assertIn("tools/hello.wdl", files)
+        self.assertEqual(1, stats["bundles"]["hits"])
+
+    def test_tasks_shared_between_specs(self):
+        with Client(self.socket_path, timeout=10) as client:
+            client.render(SPEC)
+            client.render({**SPEC, "workflows": []})
+            stats = client.request("stats")
+        self.assertEqual(1, stats["tasks"]["size"])
+        self.assertEqual(1, stats["tasks"]["hits"])
+
+    def test_export_and_errors(self):
+        out = os.path.join(self.tmp.name, "out")
+        with Client(self.socket_path, timeout=10) as client:
+            paths = client.export(SPEC, out, compact=True)
+            self.assertRaises(Exception, client.request, "unknown")
+            # the connection is still usable after an error
+            self.assertTrue(client.request("ping")["ok"])
+
+        self.assertEqual(["tools/hello.wdl", "wf.wdl"], paths)
+        self.assertTrue(os.path.exists(os.path.join(out, "wf.wdl")))
+
+    def test_cli_through_daemon(self):
+        spec_path = os.path.join(self.tmp.name, "spec.json")
+        with open(spec_path, "w") as f:
+            json.dump(SPEC, f)
+        out = os.path.join(self.tmp.name, "out")
+        self.assertEqual(
+            0, main(["compile", spec_path, "-o", out, "--socket", self.socket_path])
+        )
+        self.assertTrue(os.path.exists(os.path.join(out, "spec", "tools", "hello.wdl")))
+
+    def test_cli_rejects_local_only_flags(self):
+        for flags in (["--changed-only"], ["-j", "4"]):
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertRaises(
+                    SystemExit,
+                    main,
+                    ["compile", "spec.json", "--socket", self.socket_path, *flags],
+                )
@@ -0,0 +1,88 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+
+from wdlgen import Workflow, WorkflowCall
+from wdlgen.export import (
+    InMemorySink,
+    export_bundle,
+    package_for_submission,
+    write_imports_zip,
+)
+
+from tests.helpers import echo_task
+
+
+class BundleTestCase(unittest.TestCase):
+    """
+    Five tasks, and a workflow that imports and calls each.
+    """
+
+    def setUp(self):
+        self.tasks = [echo_task(f"tool{i}") for i in range(5)]
+        self.workflow = Workflow(
+            "wf",
+            imports=[Workflow.WorkflowImport(t.name, t.name) for t in self.tasks],
+            calls=[WorkflowCall(f"{t.name}.{t.name}") for t in self.tasks],
+        )
+
+
+class TestExportBundle(BundleTestCase):
+    def test_in_memory(self):
+        workflow, tasks = self.workflow, self.tasks
+        sink = InMemorySink()
+        paths = asyncio.run(
+            export_bundle(sink, workflow, tasks, max_concurrency=2)
+        )
+
+        self.assertEqual(
+            ["wf.wdl", *(f"tools/tool{i}.wdl" for i in range(5))], paths
+        )
+        self.assertEqual(workflow.get_string(), sink.files["wf.wdl"])
+        self.assertEqual(tasks[3].get_string(), sink.files["tools/tool3.wdl"])
+
+    def test_local_directory(self):
+        workflow, tasks = self.workflow, self.tasks
+        with tempfile.TemporaryDirectory() as d:
+            asyncio.run(export_bundle(d, workflow, tasks, compact=True))
+            with open(os.path.join(d, "tools", "tool0.wdl")) as f:
+                self.assertEqual(tasks[0].get_string(compact=True), f.read())
+            self.assertTrue(os.path.exists(os.path.join(d, "wf.wdl")))
+
+
+class TestImportsZip(BundleTestCase):
+    def test_deterministic(self):
+        workflow, tasks = self.workflow, self.tasks
+        source, first = package_for_submission(workflow, tasks)
+        _, second = package_for_submission(workflow, tasks)
+
+        self.assertEqual(first, second)
+        self.assertEqual(workflow.get_string(), source)
+
+        with zipfile.ZipFile(io.BytesIO(first)) as zf:
+            self.assertEqual([i.path for i in workflow.imports], zf.namelist())
+            self.assertEqual(
+                tasks[1].get_string(), zf.read("tools/tool1.wdl").decode()
+            )
+
+    def test_order_independent(self):
+        tasks = self.tasks
+        self.assertEqual(
+            write_imports_zip(tasks), write_imports_zip(list(reversed(tasks)))
+        )
+
+    def test_to_file(self):
+        tasks = self.tasks
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "imports.zip")
+            self.assertIsNone(write_imports_zip(tasks, path))
+            with open(path, "rb") as f:
+                self.assertEqual(write_imports_zip(tasks), f.read())
+
+    def test_missing_import(self):
+        workflow, tasks = self.workflow, self.tasks
+        with self.assertRaises(Exception):
+            write_imports_zip(tasks[1:], workflow=workflow)
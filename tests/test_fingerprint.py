@@ -0,0 +1,77 @@
+import unittest
+
+from wdlgen import (
+    Input,
+    Workflow,
+    Meta,
+    ParameterMeta,
+    String,
+    File,
+)
+from wdlgen.util import canonical_rendering
+
+from tests.helpers import call, echo_task
+
+
+class OrderedModelsTestCase(unittest.TestCase):
+    """
+    A task and a call, each also built with its inputs and meta in the reverse order.
+    """
+
+    def setUp(self):
+        self.task = echo_task(
+            inputs=[Input(String, "a"), Input(File, "b")],
+            meta=Meta(author="illusional", email="x@y.z"),
+            parameter_meta=ParameterMeta(a="help", b="help"),
+        )
+        self.reversed_task = echo_task(
+            inputs=[Input(File, "b"), Input(String, "a")],
+            meta=Meta(email="x@y.z", author="illusional"),
+            parameter_meta=ParameterMeta(b="help", a="help"),
+        )
+        self.call = call("tool", a="x", b="y")
+        self.reversed_call = call("tool", b="y", a="x")
+
+
+class TestCanonicalRendering(OrderedModelsTestCase):
+    def test_construction_order_independent(self):
+        self.assertNotEqual(self.task.get_string(), self.reversed_task.get_string())
+        self.assertEqual(
+            self.task.get_canonical_string(), self.reversed_task.get_canonical_string()
+        )
+
+    def test_call_comments_excluded(self):
+        self.reversed_call.messages = ["generated"]
+        self.assertEqual(
+            self.call.get_canonical_string(), self.reversed_call.get_canonical_string()
+        )
+
+    def test_context_is_reset(self):
+        with canonical_rendering():
+            canonical = self.reversed_task.get_string()
+        self.assertEqual(self.task.get_canonical_string(), canonical)
+        self.assertNotEqual(canonical, self.reversed_task.get_string())
+
+
+class TestFingerprint(OrderedModelsTestCase):
+    def test_stable(self):
+        self.assertEqual(self.task.fingerprint(), self.reversed_task.fingerprint())
+        self.assertEqual(64, len(self.task.fingerprint()))
+
+    def test_follows_modifications(self):
+        task = self.task
+        fp = task.fingerprint()
+        task.inputs.append(Input(String, "c"))
+        self.assertNotEqual(fp, task.fingerprint())
+
+    def test_follows_child_modifications(self):
+        call = self.call
+        w = Workflow("wf", calls=[call])
+        fp = w.fingerprint()
+        call.set_input("changed", "1")
+        self.assertNotEqual(fp, w.fingerprint())
+
+    def test_workflow(self):
+        w1 = Workflow("wf", inputs=[Input(String, "x"), Input(String, "y")], calls=[self.call])
+        w2 = Workflow("wf", inputs=[Input(String, "y"), Input(String, "x")], calls=[self.reversed_call])
+        self.assertEqual(w1.fingerprint(), w2.fingerprint())
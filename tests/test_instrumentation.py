@@ -0,0 +1,65 @@
+import json
+import unittest
+
+from wdlgen import Input, Output, Task, Workflow, WorkflowCall, String
+from wdlgen.instrumentation import (
+    RenderProfiler,
+    add_render_hook,
+    remove_render_hook,
+)
+
+
+class TestRenderProfiler(unittest.TestCase):
+    def setUp(self):
+        self.workflow = Workflow(
+            "wf",
+            inputs=[Input(String, "inp")],
+            calls=[WorkflowCall("tool", inputs_details={"x": {"value": "inp"}})],
+            outputs=[Output(String, "out", "tool.out")],
+        )
+
+    def test_records_node_types(self):
+        w = self.workflow
+        with RenderProfiler() as profiler:
+            rendered = w.get_string()
+
+        stats = profiler.stats
+        self.assertEqual(1, stats["Workflow"].calls)
+        self.assertEqual(len(rendered), stats["Workflow"].bytes)
+        self.assertEqual(1, stats["WorkflowCall"].calls)
+        self.assertEqual(1, stats["StepValueSection.render"].calls)
+        self.assertEqual(2, stats["WdlType"].calls)
+        self.assertGreaterEqual(stats["Workflow"].total_time, stats["WorkflowCall"].total_time)
+
+        exported = json.loads(profiler.to_json())
+        self.assertEqual(1, exported["Input"]["calls"])
+        self.assertIn(
+            "Workflow;WorkflowCall;StepValueSection.render ",
+            profiler.to_collapsed_stacks(),
+        )
+
+    def test_uninstrumented_when_inactive(self):
+        original = Task.get_string
+        with RenderProfiler():
+            self.assertIsNot(original, Task.get_string)
+        self.assertIs(original, Task.get_string)
+
+    def test_trace_allocations(self):
+        with RenderProfiler(trace_allocations=True) as profiler:
+            self.workflow.get_string()
+        self.assertIn("Workflow", profiler.stats)
+
+    def test_hook(self):
+        seen = []
+
+        def hook(node_type, elapsed, nbytes):
+            seen.append(node_type)
+
+        add_render_hook(hook)
+        try:
+            Task("t", runtime=Task.Runtime(cpu=1)).get_string()
+        finally:
+            remove_render_hook(hook)
+        Task("t").get_string()
+
+        self.assertEqual(["Task.Runtime", "Task"], seen)
@@ -0,0 +1,24 @@
+import unittest
+
+from wdlgen.parallel import render_calls
+
+from tests.helpers import chained_workflow
+
+
+class TestParallelRendering(unittest.TestCase):
+    def test_matches_serial(self):
+        w = chained_workflow(60)
+        serial = [c.get_string(indent=1) for c in w.calls]
+        parallel = render_calls(w.calls, workers=2, chunk_size=7, min_calls=0)
+        self.assertEqual(serial, parallel)
+
+    def test_workflow_workers(self):
+        w = chained_workflow(10)
+        self.assertEqual(w.get_string(), w.get_string(workers=None))
+        self.assertEqual(w.get_string(compact=True), w.get_string(compact=True, workers=2))
+
+    def test_workflow_parallel(self):
+        w = chained_workflow(60)
+        self.assertEqual(
+            w.get_string(), w.get_string(workers=2, chunk_size=7, min_calls=0)
+        )
@@ -0,0 +1,313 @@
+import unittest
+
+from wdlgen import (
+    Input,
+    Output,
+    Workflow,
+    WorkflowCall,
+    WorkflowScatter,
+    WorkflowConditional,
+    WdlType,
+    String,
+    File,
+    eliminate_dead_code,
+    hoist_scatter_invariants,
+    fuse_blocks,
+    tree_reduce,
+)
+
+from tests.helpers import call
+
+
+class TestEliminateDeadCode(unittest.TestCase):
+    def test_removes_unreferenced_call_and_input(self):
+        w = Workflow(
+            "wf",
+            inputs=[Input(String, "used"), Input(String, "unused")],
+            calls=[call("a", inp="used"), call("b", inp="unused")],
+            outputs=[Output(File, "out", "a.out")],
+        )
+        report = eliminate_dead_code(w)
+
+        self.assertEqual(["b"], report.removed_calls)
+        self.assertEqual(["unused"], report.removed_inputs)
+        self.assertEqual(["a"], [c.name for c in w.calls])
+        self.assertEqual(["used"], [i.name for i in w.inputs])
+
+    def test_keeps_transitive_dependencies(self):
+        w = Workflow(
+            "wf",
+            calls=[call("a"), call("b", inp="a.out"), call("c", inp="b.out")],
+            outputs=[Output(File, "out", "c.out")],
+        )
+        report = eliminate_dead_code(w)
+        self.assertFalse(report)
+        self.assertEqual(3, len(w.calls))
+
+    def test_scatter_and_conditional(self):
+        w = Workflow(
+            "wf",
+            inputs=[Input(String, "items"), Input(String, "flag")],
+            calls=[
+                WorkflowScatter("i", "items", [call("a", inp="i"), call("dead", inp="i")]),
+                WorkflowConditional("flag", [call("b", inp="a.out")]),
+                WorkflowConditional("flag", [call("dead2")]),
+            ],
+            outputs=["Array[File]? out = b.out"],
+        )
+        report = eliminate_dead_code(w)
+
+        self.assertEqual(["dead", "dead2"], report.removed_calls)
+        self.assertEqual([], report.removed_inputs)
+        self.assertEqual(2, len(w.calls))
+        self.assertEqual(["a"], [c.name for c in w.calls[0].calls])
+
+    def test_keep(self):
+        w = Workflow(
+            "wf",
+            calls=[call("a"), call("side_effect")],
+            outputs=[Output(File, "out", "a.out")],
+        )
+        eliminate_dead_code(w, keep=["side_effect"])
+        self.assertEqual(2, len(w.calls))
+
+    def test_no_outputs_is_untouched(self):
+        w = Workflow("wf", inputs=[Input(String, "x")], calls=[call("a")])
+        self.assertFalse(eliminate_dead_code(w))
+        self.assertEqual(1, len(w.calls))
+
+
+class TestHoistScatterInvariants(unittest.TestCase):
+    def test_hoists_invariant_call(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter(
+                    "i",
+                    "items",
+                    [
+                        call("index", ref="reference"),
+                        call("align", reads="i", index="index.out"),
+                    ],
+                )
+            ],
+            outputs=["Array[File] out = align.out"],
+        )
+        hoisted = hoist_scatter_invariants(w)
+
+        self.assertEqual(["index"], hoisted)
+        self.assertEqual("index", w.calls[0].name)
+        self.assertIsInstance(w.calls[1], WorkflowScatter)
+        self.assertEqual(["align"], [c.name for c in w.calls[1].calls])
+
+    def test_chain_of_invariant_calls(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter(
+                    "i", "items", [call("a"), call("b", inp="a.out"), call("c", x="i")]
+                )
+            ],
+        )
+        self.assertEqual(["a", "b"], hoist_scatter_invariants(w))
+
+    def test_gathered_reference_is_not_hoisted(self):
+        w = Workflow(
+            "wf",
+            calls=[WorkflowScatter("i", "items", [call("a"), call("b", x="i")])],
+            outputs=["Array[File] out = a.out"],
+        )
+        self.assertEqual([], hoist_scatter_invariants(w))
+
+    def test_conditional_and_nested_scatter(self):
+        inner = WorkflowScatter("j", "i.values", [call("b", x="flag")])
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter(
+                    "i",
+                    "items",
+                    [
+                        WorkflowConditional("flag", [call("a"), call("c", x="i")]),
+                        inner,
+                    ],
+                )
+            ],
+        )
+        hoisted = hoist_scatter_invariants(w)
+
+        self.assertEqual(["b", "a"], hoisted)
+        lifted_conditional = w.calls[0]
+        self.assertIsInstance(lifted_conditional, WorkflowConditional)
+        self.assertEqual("flag", lifted_conditional.condition)
+        self.assertEqual(["a"], [c.name for c in lifted_conditional.calls])
+        self.assertEqual("b", w.calls[1].name)
+        # the emptied inner scatter is removed
+        scatter = w.calls[2]
+        self.assertEqual(1, len(scatter.calls))
+        self.assertEqual(["c"], [c.name for c in scatter.calls[0].calls])
+
+    def test_call_referenced_in_its_conditional_is_not_hoisted(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter(
+                    "i",
+                    "items",
+                    [WorkflowConditional("flag", [call("a"), call("b", x="a.out", y="i")])],
+                )
+            ],
+        )
+        self.assertEqual([], hoist_scatter_invariants(w))
+        self.assertEqual(["a", "b"], [c.name for c in w.calls[0].calls[0].calls])
+
+    def test_call_referenced_outside_its_conditional_is_hoisted(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter(
+                    "i",
+                    "items",
+                    [WorkflowConditional("flag", [call("a")]), call("b", x="a.out", y="i")],
+                )
+            ],
+        )
+        # b sees a.out as optional either way
+        self.assertEqual(["a"], hoist_scatter_invariants(w))
+
+
+class TestFuseBlocks(unittest.TestCase):
+    def test_fuses_scatters_and_renames_identifier(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter("i", "items", [call("a", x="i")]),
+                WorkflowScatter("j", "items", [call("b", x="j", y="j.name")]),
+            ],
+        )
+        report = fuse_blocks(w)
+
+        self.assertEqual(1, report.fused_scatters)
+        self.assertEqual(1, len(w.calls))
+        b = w.calls[0].calls[1]
+        self.assertEqual({"x": {"value": "i"}, "y": {"value": "i.name"}}, b.inputs_details)
+
+    def test_dependent_scatters_are_not_fused(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter("i", "items", [call("a", x="i")]),
+                WorkflowScatter("j", "items", [call("b", x="a.out")]),
+            ],
+        )
+        self.assertFalse(fuse_blocks(w))
+        self.assertEqual(2, len(w.calls))
+
+    def test_scatters_depending_through_a_call_are_not_fused(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter("i", "items", [call("a", y="c.out")]),
+                WorkflowScatter("i", "items", [call("b")]),
+                call("c", z="b.out"),
+            ],
+        )
+        self.assertFalse(fuse_blocks(w))
+        self.assertEqual(3, len(w.calls))
+
+    def test_capturing_rename_is_not_fused(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter("i", "items", [call("a", x="i")]),
+                WorkflowScatter("j", "items", [call("b", x="j", y="i")]),
+            ],
+        )
+        self.assertFalse(fuse_blocks(w))
+
+    def test_merges_conditionals_and_nested_blocks(self):
+        w = Workflow(
+            "wf",
+            calls=[
+                WorkflowConditional("flag", [WorkflowScatter("i", "xs", [call("a")])]),
+                WorkflowConditional("flag", [WorkflowScatter("i", "xs", [call("b")])]),
+                WorkflowConditional("other", [call("c")]),
+            ],
+        )
+        report = fuse_blocks(w)
+
+        self.assertEqual(1, report.merged_conditionals)
+        self.assertEqual(1, report.fused_scatters)
+        self.assertEqual(2, len(w.calls))
+        self.assertEqual(1, len(w.calls[0].calls))
+        self.assertEqual(["a", "b"], [c.name for c in w.calls[0].calls[0].calls])
+
+
+class TestPassesOnClones(unittest.TestCase):
+    def test_template_is_unchanged(self):
+        template = Workflow(
+            "wf",
+            calls=[
+                WorkflowScatter("i", "items", [call("a", x="i"), call("dead", x="i"), call("index")]),
+                WorkflowScatter("j", "items", [call("b", x="j")]),
+                WorkflowConditional("flag", [call("c")]),
+                WorkflowConditional("flag", [call("d")]),
+            ],
+            outputs=["Array[File] out = a.out", "Array[File] out2 = b.out", "File? c = c.out", "File? d = d.out"],
+        )
+        before = template.get_string()
+        for optimise in (eliminate_dead_code, hoist_scatter_invariants, fuse_blocks):
+            variant = template.clone(name="variant")
+            self.assertTrue(optimise(variant))
+            self.assertNotEqual(before, variant.get_string().replace("variant", "wf"))
+            self.assertEqual(before, template.get_string())
+
+
+class TestTreeReduce(unittest.TestCase):
+    def merge(self):
+        return WorkflowCall(
+            "tools.merge",
+            alias="merged",
+            inputs_details={"bams": {"value": "align.bam"}, "ref": {"value": "reference"}},
+        )
+
+    def test_levels(self):
+        file = WdlType.parse_type("File")
+        self.assertEqual(1, len(tree_reduce(self.merge(), "bams", "out", file, 10, 10)))
+        self.assertEqual(3, len(tree_reduce(self.merge(), "bams", "out", file, 10, 100)))
+        self.assertEqual(5, len(tree_reduce(self.merge(), "bams", "out", file, 10, 101)))
+
+    def test_reduction(self):
+        items = tree_reduce(
+            self.merge(), "bams", "out", WdlType.parse_type("File"), fan_in=100
+        )
+        declaration, scatter, final = items
+        self.assertEqual("Array[File] merged_level1_inputs = align.bam", declaration.get_string(0))
+        self.assertEqual(
+            "range((length(merged_level1_inputs) + 99) / 100)", scatter.expression
+        )
+        level_call = scatter.calls[1]
+        self.assertEqual("merged_level1", level_call.name)
+        self.assertEqual(
+            "select_all(merged_level1_element)", level_call.inputs_details["bams"]["value"]
+        )
+        self.assertEqual("reference", level_call.inputs_details["ref"]["value"])
+        self.assertEqual("merged", final.name)
+        self.assertEqual("merged_level1.out", final.inputs_details["bams"]["value"])
+
+    def test_passes_keep_the_reduction(self):
+        wf = Workflow(
+            "wf",
+            inputs=[Input(File, "reference"), Input(String, "unused")],
+            calls=[
+                WorkflowScatter("s", "samples", [call("align", x="s")]),
+                *tree_reduce(self.merge(), "bams", "out", WdlType.parse_type("File"), 10, 1000),
+            ],
+            outputs=[Output(File, "out", "merged.out")],
+        )
+        before = wf.get_string()
+        self.assertEqual([], hoist_scatter_invariants(wf))
+        report = eliminate_dead_code(wf)
+        self.assertEqual([], report.removed_calls)
+        self.assertEqual(["unused"], report.removed_inputs)
+        self.assertEqual(before.replace("    String unused\n", ""), wf.get_string())
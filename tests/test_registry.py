@@ -0,0 +1,114 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from wdlgen import WorkflowCall
+from wdlgen.registry import TaskRegistry, read_task_signature, write_task_cache
+from wdlgen.spec import compile_task, write_spec_bundle
+
+TASK_SPEC = {
+    "name": "align",
+    "inputs": [
+        {"name": "bam", "type": "File"},
+        {"name": "counts", "type": "Map[String, Int]", "default": {"a": 1}},
+        {"name": "sample", "type": "Sample?"},
+    ],
+    "outputs": [{"name": "out", "type": "Pair[File, String]", "expression": '(stdout(), "x")'}],
+    "command": "echo '}'\ninput {",
+}
+
+
+class TestTaskSignature(unittest.TestCase):
+    def test_read_rendered_task(self):
+        spec = {"version": "1.0", "structs": {"Sample": {"name": "String"}}, "tasks": [TASK_SPEC]}
+        with tempfile.TemporaryDirectory() as d:
+            write_spec_bundle(spec, d)
+            with open(os.path.join(d, "tools", "align.wdl")) as f:
+                signature = read_task_signature(f.read())
+
+        self.assertEqual("align", signature.name)
+        self.assertEqual(
+            [("File", "bam", None), ("Map[String, Int]", "counts", '{"a": 1}'), ("Sample?", "sample", None)],
+            [(i.type.get_string(), i.name, i.expression) for i in signature.inputs],
+        )
+        self.assertEqual(
+            [("Pair[File, String]", "out")],
+            [(o.type.get_string(), o.name) for o in signature.outputs],
+        )
+
+    def test_no_task(self):
+        self.assertRaises(Exception, read_task_signature, "version 1.0\n")
+
+
+class TestTaskRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        tasks = [
+            compile_task({**TASK_SPEC, "name": f"tool{i}", "inputs": TASK_SPEC["inputs"][:2]})
+            for i in range(3)
+        ]
+        write_task_cache(tasks, self.dir)
+        with open(os.path.join(self.dir, "fromspec.json"), "w") as f:
+            json.dump({**TASK_SPEC, "name": "fromspec", "inputs": []}, f)
+        with open(os.path.join(self.dir, "tool0.wdl"), "w") as f:
+            f.write("version 1.0\ntask other {\n}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_loads_on_demand_within_cache_size(self):
+        registry = TaskRegistry(self.dir, cache_size=2)
+        self.assertEqual(["fromspec", "tool0", "tool1", "tool2"], registry.names())
+        self.assertEqual(0, len(registry.cache))
+
+        refs = [registry.ref(n) for n in registry.names()]
+        self.assertEqual(["bam", "counts"], [i.name for i in refs[1].inputs])
+        for ref in refs:
+            self.assertEqual(["out"], [o.name for o in ref.outputs])
+        self.assertEqual(["tool1", "tool2"], list(registry.cache))
+        # the pickled task is preferred to the .wdl
+        self.assertEqual("tool0", refs[1].resolve().name)
+        self.assertRaises(Exception, registry.ref, "missing")
+
+    def test_call_checks_inputs(self):
+        registry = TaskRegistry(self.dir)
+        call = WorkflowCall(
+            "tool1.tool1", task=registry.ref("tool1"), inputs_details={"bam": {"value": "x"}}
+        )
+        self.assertEqual("Pair[File, String]", call.get_output_type("out").get_string())
+        self.assertRaises(Exception, call.get_output_type, "missing")
+        self.assertRaises(Exception, call.set_input, "unknown", "x")
+        self.assertRaises(Exception, call.clone, input_values={"unknown": "x"})
+        self.assertRaises(
+            Exception,
+            WorkflowCall,
+            "tool1.tool1",
+            task=registry.ref("tool1"),
+            inputs_details={"unknown": {"value": "x"}},
+        )
+
+    def test_call_reads_input_names_once(self):
+        registry = TaskRegistry(self.dir)
+        call = WorkflowCall("tool1.tool1", task=registry.ref("tool1"))
+        call.set_input("bam", "x")
+        variant = call.clone(input_values={"counts": "y"})
+        variant.set_input("bam", "z", position=1)
+        self.assertEqual(1, registry.cache.misses + registry.cache.hits)
+        self.assertIs(call.task_input_names(), variant.task_input_names())
+
+        variant.task = registry.ref("tool2")
+        variant.set_input("counts", "w")
+        self.assertEqual(frozenset({"bam", "counts"}), variant.task_input_names())
+        self.assertEqual(2, registry.cache.misses + registry.cache.hits)
+
+    def test_pickle_drops_loaded_tasks(self):
+        registry = TaskRegistry(self.dir)
+        call = WorkflowCall("tool1.tool1", task=registry.ref("tool1"))
+        call.set_input("bam", "x")
+        copy = pickle.loads(pickle.dumps(call))
+        self.assertEqual(0, len(copy.task.registry.cache))
+        self.assertEqual(call.get_string(), copy.get_string())
+        self.assertEqual(["bam", "counts"], [i.name for i in copy.task.inputs])
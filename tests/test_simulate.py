@@ -0,0 +1,103 @@
+import unittest
+
+from wdlgen import (
+    Task,
+    Workflow,
+    WorkflowConditional,
+    WorkflowScatter,
+    WdlType,
+    tree_reduce,
+)
+from wdlgen.simulate import TaskEstimate, get_task_resources, simulate
+
+from tests.helpers import call
+
+
+class TestSimulate(unittest.TestCase):
+    def workflow(self):
+        return Workflow(
+            "wf",
+            calls=[
+                call("prep"),
+                WorkflowScatter("s", "samples", [call("align", x="s", p="prep.out")]),
+                call("merge", bams="align.bam"),
+            ],
+        )
+
+    def test_unlimited_cores(self):
+        report = simulate(
+            self.workflow(),
+            cores=100,
+            scatter_cardinality={"s": 10},
+            estimates={"prep": TaskEstimate(5), "align": TaskEstimate(100), "merge": TaskEstimate(10)},
+        )
+        self.assertEqual(115, report.makespan)
+        self.assertEqual(12, report.jobs)
+        self.assertEqual(10, report.peak_concurrency)
+        self.assertEqual(["prep", "align[9]", "merge"], report.critical_path)
+
+    def test_limited_resources(self):
+        tasks = [Task("align", runtime=Task.Runtime(cpu=2, memory='"8G"'))]
+        report = simulate(
+            self.workflow(),
+            cores=4,
+            memory=100,
+            tasks=tasks,
+            scatter_cardinality=10,
+            estimates={"prep": TaskEstimate(5), "align": TaskEstimate(100), "merge": TaskEstimate(10)},
+        )
+        # two aligns at a time, in 5 rounds
+        self.assertEqual(5 + 500 + 10, report.makespan)
+        self.assertEqual(2, report.peak_concurrency)
+        self.assertAlmostEqual((5 + 10 * 200 + 10) / (4 * 515), report.cpu_utilisation)
+
+    def test_conditionals_are_seeded(self):
+        wf = Workflow(
+            "wf",
+            calls=[WorkflowScatter("s", "xs", [WorkflowConditional("s > 1", [call("qc")])])],
+        )
+        reports = [simulate(wf, cores=1, scatter_cardinality=100, seed=1) for _ in range(2)]
+        self.assertEqual(reports[0], reports[1])
+        self.assertTrue(0 < reports[0].jobs < 100)
+        self.assertEqual(0, simulate(wf, cores=1, conditional_probability=0).jobs)
+
+    def test_tree_reduce(self):
+        merge = call("merge", bams="align.bam")
+        wf = self.workflow()
+        reduced = wf.clone(
+            calls=[*wf.calls[:2], *tree_reduce(merge, "bams", "out", WdlType.parse_type("File"), 10, 1000)]
+        )
+        estimates = {"prep": TaskEstimate(5), "align": TaskEstimate(100)}
+
+        # merging 1000 files in one call, vs 10 at a time in 3 rounds
+        report = simulate(
+            wf, cores=1000, scatter_cardinality=1000, estimates={**estimates, "merge": TaskEstimate(1000)}
+        )
+        reduced_report = simulate(
+            reduced,
+            cores=1000,
+            scatter_cardinality={"s": 1000, "merge_level1_chunk": 100, "merge_level2_chunk": 10},
+            estimates={**estimates, "merge": TaskEstimate(10)},
+        )
+        self.assertEqual(1105, report.makespan)
+        self.assertEqual(135, reduced_report.makespan)
+        self.assertEqual(1000 + 1 + 100 + 10 + 1, reduced_report.jobs)
+        self.assertEqual(
+            ["prep", "align[999]", "merge_level1[99]", "merge_level2[9]", "merge"],
+            reduced_report.critical_path,
+        )
+
+    def test_task_resources(self):
+        task = Task("t", runtime=Task.Runtime(cpu=4, memory='"512 MiB"'))
+        self.assertEqual((4, 0.5), get_task_resources(task))
+        task = Task("t", requirements=Task.Requirements(cpu="threads", memory='"2 GiB"'))
+        self.assertEqual((None, 2), get_task_resources(task))
+
+    def test_job_too_large(self):
+        self.assertRaises(
+            Exception,
+            simulate,
+            self.workflow(),
+            cores=1,
+            estimates={"align": TaskEstimate(10, cpu=2)},
+        )
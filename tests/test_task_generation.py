@@ -11,6 +11,9 @@ from wdlgen import (
     WorkflowScatter,
     Meta,
     ParameterMeta,
+    StructType,
+    struct_scope,
+    File,
 )
 
 from tests.helpers import non_blank_lines_list
@@ -232,6 +235,46 @@ echo \\
         )
         self.assertEqual("~{sep(\" \", if defined(my_array) then my_array else [])}", t.get_string())
 
+    def test_commandinp_argument_file(self):
+        t = Task.Command.CommandInput.from_fields(
+            name="bams", prefix="--bams", argument_file="lines"
+        )
+        self.assertEqual('~{"--bams " + write_lines(bams)}', t.get_string())
+
+    def test_commandinp_argument_file_threshold(self):
+        t = Task.Command.CommandInput.from_fields(
+            name="bams",
+            prefix="-I",
+            separate_arrays=True,
+            argument_file="json",
+            argument_file_prefix="--inputs",
+            argument_file_threshold=1000,
+        )
+        self.assertEqual(
+            '~{if length(bams) > 1000 then "--inputs " + write_json(bams) '
+            'else sep(" ", prefix("-I ", bams))}',
+            t.get_string(),
+        )
+
+    def test_commandinp_argument_file_optional(self):
+        t = Task.Command.CommandInput.from_fields(
+            name="bams", optional=True, argument_file="lines"
+        )
+        self.assertEqual(
+            '~{if length(select_first([bams, []])) > 0 '
+            'then (write_lines(select_first([bams, []]))) else ""}',
+            t.get_string(),
+        )
+
+    def test_commandinp_argument_file_threshold_needs_inline(self):
+        self.assertRaises(
+            Exception,
+            Task.Command.CommandInput.from_fields,
+            name="bams",
+            argument_file="lines",
+            argument_file_threshold=10,
+        )
+
 
 class TestWorkflowGeneration(unittest.TestCase):
     def test_hello_workflow(self):
@@ -398,3 +441,211 @@ task meta_string {
 }"""
         task_str = '\n'.join(task_lines[1:])
         self.assertEqual(expected, task_str)
+
+
+class TestCompactTaskGeneration(unittest.TestCase):
+    def test_compact(self):
+        task = Task(
+            "compact",
+            inputs=[Input(String, "inp")],
+            command=Task.Command("echo"),
+            meta=Meta(author="illusional"),
+            parameter_meta=ParameterMeta(inp="help"),
+        )
+        expected = """\
+version draft-2
+task compact {
+  input {
+    String inp
+  }
+  command <<<
+    echo
+  >>>
+}"""
+        self.assertEqual(expected, task.get_string(compact=True))
+
+
+class TestStructTaskGeneration(unittest.TestCase):
+    def test_struct_definition(self):
+        sample = StructType("Sample", {"name": String, "bam": "File"})
+        with struct_scope(sample):
+            samples = WdlType.parse_type("Array[Sample]")
+        task = Task(
+            "structs",
+            inputs=[Input(samples, "samples"), Input(WdlType(sample), "sample")],
+            version="1.0",
+        )
+        expected = """\
+version 1.0
+struct Sample {
+  String name
+  File bam
+}
+task structs {
+  input {
+    Array[Sample] samples
+    Sample sample
+  }
+}"""
+        self.assertEqual(expected, task.get_string(compact=True))
+
+
+class TestInputLocalisationHints(unittest.TestCase):
+    def task(self, version, parameter_meta=None):
+        return Task(
+            "hints",
+            inputs=[
+                Input(File, "bam", localization_optional=True, streamable=True),
+                Input(File, "ref"),
+            ],
+            version=version,
+            parameter_meta=parameter_meta,
+        )
+
+    def test_parameter_meta_before_1_1(self):
+        parameter_meta = ParameterMeta(bam="the bam", ref="the reference")
+        task = self.task("1.0", parameter_meta)
+        expected = """\
+version 1.0
+task hints {
+  input {
+    File bam
+    File ref
+  }
+  parameter_meta {
+    bam: {localization_optional: true, stream: true}
+  }
+}"""
+        self.assertEqual(expected, task.get_string(compact=True))
+        self.assertIn(
+            'bam: {help: "the bam", localization_optional: true, stream: true}',
+            task.get_string(),
+        )
+        self.assertIn('ref: "the reference"', task.get_string())
+        # the caller's parameter_meta isn't modified
+        self.assertEqual("the bam", parameter_meta.kwargs["bam"])
+
+    def test_hints_in_1_1(self):
+        expected = """\
+version 1.1
+task hints {
+  input {
+    File bam
+    File ref
+  }
+  runtime {
+    inputs: object { bam: object { localizationOptional: true, streamable: true } }
+  }
+}"""
+        self.assertEqual(expected, self.task("1.1").get_string(compact=True))
+
+    def test_hints_in_1_2(self):
+        expected = """\
+  hints {
+    inputs: input {
+      bam: hints {
+        localizationOptional: true
+        streamable: true
+      }
+    }
+  }"""
+        self.assertIn(expected, self.task("1.2").get_string(compact=True))
+
+
+class TestRequirementsAndHints(unittest.TestCase):
+    def task(self, version):
+        return Task(
+            "resources",
+            runtime=Task.Runtime(preemptible=2),
+            requirements=Task.Requirements(container='"ubuntu:20.04"', cpu=4),
+            hints=Task.Hints(short_task=True, inputs={"bam": {"foo": 1}}),
+            inputs=[Input(File, "bam", localization_optional=True)],
+            version=version,
+        )
+
+    def test_requirements_in_runtime_before_1_2(self):
+        with self.assertLogs("wdlgen.task", level="WARNING"):
+            task_str = self.task("1.0").get_string(compact=True)
+        self.assertIn(
+            "  runtime {\n    cpu: 4\n    docker: \"ubuntu:20.04\"\n    preemptible: 2\n  }",
+            task_str,
+        )
+        self.assertNotIn("hints {", task_str)
+        self.assertNotIn("shortTask", task_str)
+
+    def test_hints_in_runtime_1_1(self):
+        expected = """\
+  runtime {
+    container: "ubuntu:20.04"
+    cpu: 4
+    inputs: object { bam: object { foo: 1, localizationOptional: true } }
+    preemptible: 2
+    shortTask: true
+  }"""
+        task_str = self.task("1.1").get_string(compact=True)
+        self.assertIn(expected, task_str)
+        self.assertNotIn("hints {", task_str)
+
+    def test_requirements_container_replaces_docker_1_1(self):
+        task = Task(
+            "resources",
+            runtime=Task.Runtime(docker='"ubuntu"', cpu=2),
+            requirements=Task.Requirements(container='"img"'),
+            version="1.1",
+        )
+        expected = """\
+  runtime {
+    container: "img"
+    cpu: 2
+  }"""
+        task_str = task.get_string(compact=True)
+        self.assertIn(expected, task_str)
+        self.assertNotIn("docker", task_str)
+
+    def test_requirements_and_hints_1_2(self):
+        expected = """\
+version 1.2
+task resources {
+  input {
+    File bam
+  }
+  requirements {
+    container: "ubuntu:20.04"
+    cpu: 4
+  }
+  hints {
+    preemptible: 2
+    shortTask: true
+    inputs: input {
+      bam: hints {
+        foo: 1
+        localizationOptional: true
+      }
+    }
+  }
+}"""
+        self.assertEqual(expected, self.task("1.2").get_string(compact=True))
+
+    def test_runtime_split_1_2(self):
+        task = Task(
+            "resources",
+            runtime=Task.Runtime(docker='"ubuntu:20.04"', cpu=2, zones='"us-east1-b"'),
+            requirements=Task.Requirements(cpu=4),
+            version="1.2",
+        )
+        expected = """\
+  requirements {
+    container: "ubuntu:20.04"
+    cpu: 4
+  }
+  hints {
+    zones: "us-east1-b"
+  }"""
+        task_str = task.get_string(compact=True)
+        self.assertIn(expected, task_str)
+        self.assertNotIn("runtime", task_str)
+
+    def test_validation(self):
+        self.assertRaises(Exception, Task.Requirements, cpus=4)
+        self.assertRaises(Exception, Task.Requirements, cpu=True)
+        self.assertRaises(Exception, Task.Hints, short_task=1)
@@ -43,3 +43,90 @@ class TestTypes(unittest.TestCase):
         tt = t._type
         self.assertIsInstance(tt, types.ArrayType)
         self.assertTrue(tt._requires_multiple)
+
+
+class TestTypeCompatibility(unittest.TestCase):
+    def test_coercions(self):
+        self.assertTrue(types.is_coercible(types.File, types.String))
+        self.assertTrue(types.is_coercible("Int", "Float"))
+        self.assertTrue(types.is_coercible("Array[File]+", "Array[File]"))
+        self.assertTrue(types.is_coercible("Array[String]", "Array[File]?"))
+        self.assertTrue(types.is_coercible("String", "String?"))
+        self.assertFalse(types.is_coercible("String?", "String"))
+        self.assertFalse(types.is_coercible("Array[File]", "Array[File]+"))
+        self.assertFalse(types.is_coercible("Float", "Int"))
+        self.assertFalse(types.is_coercible("Array[Int]", "Int"))
+
+    def test_unify(self):
+        self.assertEqual("Float?", types.unify("Int", "Float?").get_string())
+        self.assertEqual(
+            "Array[Float]", types.unify("Array[Int]+", "Array[Float]").get_string()
+        )
+        self.assertEqual(
+            "Array[Float]", types.unify("Array[Int]", "Array[Float]+").get_string()
+        )
+        self.assertIsNone(types.unify("Int", "Boolean"))
+
+    def test_many_edges(self):
+        pairs = [
+            (types.WdlType.parse_type(a), types.WdlType.parse_type(b))
+            for a, b in [
+                ("File", "String"),
+                ("Array[File]+", "Array[File]"),
+                ("Int", "Float?"),
+                ("Array[Array[String]]", "Array[Array[File]]"),
+                ("Boolean", "String"),
+            ]
+        ] * 10000
+        results = [types.is_coercible(a, b) for a, b in pairs]
+        self.assertEqual(40000, sum(results))
+
+
+class TestCompoundTypes(unittest.TestCase):
+    def test_parse_pair(self):
+        t = types.WdlType.parse_type("Pair[Int, Array[File]]?")
+        self.assertIsInstance(t._type, types.PairType)
+        self.assertTrue(t.optional)
+        self.assertEqual("Pair[Int, Array[File]]?", t.get_string())
+
+    def test_parse_map(self):
+        t = types.WdlType.parse_type("Map[String,Pair[Int,Int]]")
+        self.assertIsInstance(t._type, types.MapType)
+        self.assertEqual("Map[String, Pair[Int, Int]]", t.get_string())
+
+    def test_parse_struct(self):
+        sample = types.StructType("TestSample", {"name": "String", "reads": "Array[File]"})
+        with types.struct_scope(sample):
+            t = types.WdlType.parse_type("Array[TestSample]")
+            self.assertTrue(types.is_coercible("TestSample", "TestSample?"))
+        self.assertIs(sample, t._type._subtype._type)
+        # already parsed types can still be compared outside the scope
+        self.assertTrue(types.is_coercible(t, types.WdlType(t, optional=True)))
+        self.assertRaises(Exception, types.WdlType.parse_type, "TestSample")
+
+    def test_struct_scopes_are_separate(self):
+        first = types.StructType("TestScoped", {"name": "String"})
+        second = types.StructType("TestScoped", {"bam": "File"})
+        with types.struct_scope(first):
+            self.assertIs(first, types.unify("TestScoped", "TestScoped")._type)
+        with types.struct_scope(second):
+            t = types.WdlType.parse_type("TestScoped")
+            self.assertIs(second, t._type)
+            self.assertIs(second, types.unify("TestScoped", "TestScoped")._type)
+
+    def test_unknown_type(self):
+        self.assertRaises(Exception, types.WdlType.parse_type, "NotAType")
+        self.assertRaises(Exception, types.WdlType.parse_type, "Pair[Int]")
+
+    def test_struct_definitions_once_in_order(self):
+        inner = types.StructType("TestInner", {"x": "Int"})
+        with types.struct_scope(inner):
+            outer = types.StructType("TestOuter", {"a": inner, "b": "Map[String, TestInner]"})
+            structs = types.get_struct_definitions(
+                [types.WdlType(outer), types.WdlType.parse_type("Array[TestInner]")]
+            )
+        self.assertEqual(["TestInner", "TestOuter"], [s.name for s in structs])
+        self.assertEqual(
+            "struct TestOuter {\n  TestInner a\n  Map[String, TestInner] b\n}",
+            outer.get_definition(),
+        )
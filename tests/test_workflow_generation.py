@@ -1,5 +1,17 @@
+import pickle
 import unittest
-from wdlgen import Workflow, Meta, ParameterMeta
+from wdlgen import (
+    Workflow,
+    WorkflowCall,
+    WorkflowConditional,
+    WorkflowScatter,
+    Meta,
+    ParameterMeta,
+    Input,
+    WdlType,
+)
+from wdlgen.spec import compile_workflow
+from wdlgen.util import encode_wdl_literal
 from tests.helpers import non_blank_lines_list
 
 
@@ -128,3 +140,188 @@ workflow meta_scalar {
 }"""
         wf_str = '\n'.join(wf_lines[1:])
         self.assertEqual(expected, wf_str)
+
+
+class TestCompactWorkflowGeneration(unittest.TestCase):
+    def test_compact(self):
+        wf = Workflow(
+            "compact",
+            meta=Meta(author="illusional"),
+            calls=[
+                WorkflowCall(
+                    "tool",
+                    inputs_details={"inp": {"value": "x", "datatype": "String"}},
+                    messages=["a message"],
+                ),
+            ],
+        )
+        expected = """\
+version draft-2
+workflow compact {
+  call tool {
+    input:
+      inp=x
+  }
+}"""
+        self.assertEqual(expected, wf.get_string(compact=True))
+        self.assertIn("# String", wf.get_string())
+
+
+class TestExternaliseLiterals(unittest.TestCase):
+    def setUp(self):
+        samples = [f"sample_{i}.bam" for i in range(100)]
+        self.wf = Workflow(
+            "ext",
+            inputs=[
+                Input(
+                    WdlType.parse_type("Array[String]"),
+                    "samples",
+                    encode_wdl_literal(samples),
+                    requires_quotes=False,
+                ),
+                Input(
+                    WdlType.parse_type("Map[String, Int]"),
+                    "lengths",
+                    encode_wdl_literal({"chr1": 248956422}),
+                    requires_quotes=False,
+                ),
+                Input(
+                    WdlType.parse_type("Array[String]"),
+                    "derived",
+                    "select_all(" + encode_wdl_literal(samples) + ")",
+                    requires_quotes=False,
+                ),
+            ],
+            version="1.0",
+        )
+        self.samples = samples
+
+    def test_externalise(self):
+        wf, inputs = self.wf.externalise_literals(min_length=100)
+        self.assertEqual({"ext.samples": self.samples}, inputs)
+        self.assertIn("    Array[String] samples\n", wf.get_string())
+        self.assertIn('Map[String, Int] lengths = {"chr1": 248956422}', wf.get_string())
+        # not a literal, so stays in the WDL
+        self.assertIn("Array[String] derived = select_all(", wf.get_string())
+        # the original is unchanged
+        self.assertIn("Array[String] samples = [", self.wf.get_string())
+
+    def test_externalise_optional(self):
+        wf, inputs = self.wf.externalise_literals(min_length=10, optional=True)
+        self.assertEqual({"chr1": 248956422}, inputs["ext.lengths"])
+        self.assertIn("    Array[String]? samples\n", wf.get_string())
+        self.assertIn("    Map[String, Int]? lengths\n", wf.get_string())
+
+    def test_nothing_to_externalise(self):
+        wf, inputs = self.wf.externalise_literals(min_length=100000)
+        self.assertEqual({}, inputs)
+        self.assertIs(self.wf, wf)
+
+
+class TestCallInputs(unittest.TestCase):
+    def test_inputs_details_round_trip(self):
+        details = {"b": {"value": "x", "position": 2}, "a": {"value": "y", "datatype": "Int"}}
+        call = WorkflowCall("tool", inputs_details=details)
+        self.assertEqual(details, call.inputs_details)
+        self.assertEqual(["b", "a"], list(call.inputs_details))
+        self.assertIsNone(call.input_columns.prefixes)
+
+    def test_inputs_details_writes_through(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "x", "datatype": "Int"}, "b": {"value": "y"}})
+        call.inputs_details["a"] = {"value": "z"}
+        call.inputs_details["c"] = {"value": "w"}
+        del call.inputs_details["b"]
+        self.assertEqual({"a": {"value": "z"}, "c": {"value": "w"}}, call.inputs_details)
+
+    def test_set_input_reorders(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "1"}, "b": {"value": "2"}})
+        self.assertIn("a=1,\n      b=2", call.get_string(compact=True))
+        call.set_input("a", position=1000)
+        call.set_input("c", "3", datatype="Int")
+        self.assertIn("b=2,\n      c=3,\n      a=1", call.get_string(compact=True))
+
+    def test_inputs_details_ignores_unknown_keys(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "1", "source": "step.out"}, "b": {"value": None}})
+        call.set_input("a", "2", unknown=True)
+        self.assertEqual({"a": {"value": "2"}, "b": {}}, call.inputs_details)
+        self.assertIn("a=2,\n      b=None", call.get_string(compact=True))
+
+    def test_inputs_details_are_read_only(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "1"}})
+        with self.assertRaises(TypeError):
+            call.inputs_details["a"]["value"] = "2"
+        self.assertEqual({"a": {"value": "1"}}, call.inputs_details)
+
+    def test_clone_copies_inputs(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "1"}})
+        variant = call.clone()
+        variant.set_input("a", "2")
+        variant.remove_input("a")
+        self.assertEqual({"a": {"value": "1"}}, call.inputs_details)
+        self.assertEqual({}, variant.inputs_details)
+
+    def test_pickle(self):
+        call = WorkflowCall("tool", inputs_details={"a": {"value": "1", "prefix": "-a"}})
+        self.assertEqual(call.get_string(), pickle.loads(pickle.dumps(call)).get_string())
+
+
+class TestZipCrossScatter(unittest.TestCase):
+    def setUp(self):
+        self.arrays = [("File", "bam", "bams"), ("String", "name", "names"), ("Int", "n", "ns")]
+
+    def test_zip(self):
+        call = WorkflowCall("align", inputs_details={"bam": {"value": "bam"}})
+        scatter = WorkflowScatter.zip("sample", self.arrays[:2], [call])
+        self.assertEqual("zip(bams, names)", scatter.expression)
+        self.assertEqual(
+            [
+                "  scatter (sample in zip(bams, names)) {",
+                "    File bam = sample.left",
+                "    String name = sample.right",
+                "    call align {",
+            ],
+            scatter.get_string().splitlines()[:4],
+        )
+        self.assertEqual("Pair[File, String]", scatter.element_type.get_string())
+
+    def test_nested_cross(self):
+        scatter = WorkflowScatter.cross("x", self.arrays)
+        self.assertEqual("cross(bams, cross(names, ns))", scatter.expression)
+        self.assertEqual(
+            ["x.left", "x.right.left", "x.right.right"],
+            [d.expression for d in scatter.calls],
+        )
+        self.assertEqual(
+            "Pair[File, Pair[String, Int]]", scatter.element_type.get_string()
+        )
+
+    def test_requires_two_arrays(self):
+        self.assertRaises(Exception, WorkflowScatter.zip, "x", self.arrays[:1])
+
+    def test_gathered_type(self):
+        inner = WorkflowScatter.zip("y", self.arrays[1:])
+        scatter = WorkflowScatter.zip(
+            "x", self.arrays[:2], [WorkflowConditional("true", [inner])]
+        )
+        self.assertEqual("Array[File]", scatter.get_gathered_type("bam").get_string())
+        self.assertEqual("Array[Array[Int]?]", scatter.get_gathered_type("n").get_string())
+        self.assertRaises(Exception, scatter.get_gathered_type, "missing")
+
+    def test_spec(self):
+        wf = compile_workflow(
+            {
+                "name": "wf",
+                "calls": [
+                    {
+                        "scatter": "s",
+                        "zip": [
+                            {"name": "bam", "type": "File", "in": "bams"},
+                            {"name": "name", "type": "String", "in": "names"},
+                        ],
+                        "body": [{"call": "align", "inputs": {"bam": "bam"}}],
+                    }
+                ],
+            }
+        )
+        self.assertIn("scatter (s in zip(bams, names))", wf.get_string())
+        self.assertIn("File bam = s.left", wf.get_string())
@@ -3,3 +3,4 @@ from .task import *
 from .types import *
 from .workflow import *
 from .workflowcall import *
+from .passes import *
@@ -0,0 +1,46 @@
+"""
+A least recently used cache, shared by the daemon's render caches and TaskRegistry.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class LruCache(OrderedDict):
+    """
+    A dictionary that evicts the least recently used entries past maxsize.
+    get() and setting an entry are safe to call from multiple threads.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        super().__init__()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self:
+                self.hits += 1
+                self.move_to_end(key)
+                return self[key]
+            self.misses += 1
+            return default
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+
+    def __reduce__(self):
+        # the entries and maxsize, without the lock
+        return LruCache, (self.maxsize,), None, None, iter(list(self.items()))
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"size": len(self), "hits": self.hits, "misses": self.misses}
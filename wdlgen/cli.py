@@ -0,0 +1,217 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .daemon import DEFAULT_CACHE_SIZE, Client, serve
+from .spec import load_spec, write_spec_bundle
+
+STAMP_FILENAME = ".wdlgen-stamp"
+
+
+def get_spec_stamp(spec_path: str, compact: bool) -> str:
+    """
+    Identifies the spec's content and the options it's compiled with,
+    to skip specs that haven't changed since they were last compiled.
+    """
+    with open(spec_path, "rb") as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(json.dumps({"compact": compact}).encode())
+    return digest.hexdigest()
+
+
+def get_spec_output_dir(spec_path: str, output_dir: str) -> str:
+    name = os.path.splitext(os.path.basename(spec_path))[0]
+    return os.path.join(output_dir, name)
+
+
+def check_spec_output_dirs(spec_paths: List[str], output_dir: str):
+    """
+    Raises if two specs would be compiled into the same directory, eg: a/x.json and b/x.json
+    """
+    seen = {}
+    for spec_path in spec_paths:
+        bundle_dir = os.path.normpath(get_spec_output_dir(spec_path, output_dir))
+        if bundle_dir in seen:
+            raise Exception(
+                f"Couldn't compile '{seen[bundle_dir]}' and '{spec_path}', "
+                f"both would be written to '{bundle_dir}'"
+            )
+        seen[bundle_dir] = spec_path
+
+
+def compile_spec_file(
+    spec_path: str, output_dir: str, changed_only: bool = False, compact: bool = False
+) -> Tuple[str, str, float, Optional[str]]:
+    """
+    Compiles one spec into {output_dir}/{spec name}/
+
+    :return: (spec_path, status, elapsed seconds, error message), where status is one of
+        'compiled', 'unchanged' or 'failed'
+    """
+    start = time.perf_counter()
+    bundle_dir = get_spec_output_dir(spec_path, output_dir)
+    stamp_path = os.path.join(bundle_dir, STAMP_FILENAME)
+    try:
+        stamp = get_spec_stamp(spec_path, compact)
+        if changed_only and os.path.exists(stamp_path):
+            with open(stamp_path) as f:
+                if f.read() == stamp:
+                    return spec_path, "unchanged", time.perf_counter() - start, None
+
+        write_spec_bundle(load_spec(spec_path), bundle_dir, compact=compact)
+        with open(stamp_path, "w") as f:
+            f.write(stamp)
+    except Exception as e:
+        return spec_path, "failed", time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    return spec_path, "compiled", time.perf_counter() - start, None
+
+
+def compile_specs(
+    spec_paths: List[str],
+    output_dir: str,
+    jobs: Optional[int] = 1,
+    changed_only: bool = False,
+    compact: bool = False,
+) -> List[Tuple[str, str, float, Optional[str]]]:
+    """
+    Compiles the specs, in a pool of 'jobs' processes (None for one per core).
+    """
+    check_spec_output_dirs(spec_paths, output_dir)
+    args = [(p, output_dir, changed_only, compact) for p in spec_paths]
+    if jobs == 1 or len(spec_paths) <= 1:
+        return [compile_spec_file(*a) for a in args]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(compile_spec_file, *zip(*args)))
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="wdlgen", description="Generate WDL from declarative specs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = subparsers.add_parser(
+        "compile", help="Compile JSON / TOML specs into WDL bundles"
+    )
+    compile_parser.add_argument("specs", nargs="+", help="spec files (.json or .toml)")
+    compile_parser.add_argument(
+        "-o",
+        "--output-dir",
+        default=".",
+        help="each spec is compiled into {output-dir}/{spec name}/",
+    )
+    compile_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes, 0 for one per core",
+    )
+    compile_parser.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="skip specs that haven't changed since they were last compiled",
+    )
+    compile_parser.add_argument(
+        "--timing", action="store_true", help="report how long each spec took"
+    )
+    compile_parser.add_argument(
+        "--compact", action="store_true", help="emit compact (machine-consumed) WDL"
+    )
+    compile_parser.add_argument(
+        "--socket", help="send the specs to a running 'wdlgen serve' daemon instead"
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a generation daemon on a local Unix socket"
+    )
+    serve_parser.add_argument("--socket", required=True, help="path of the Unix socket")
+    serve_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help="number of compiled tasks and rendered bundles to keep",
+    )
+    return parser
+
+
+def compile_specs_with_daemon(
+    spec_paths: List[str], output_dir: str, socket_path: str, compact: bool = False
+) -> List[Tuple[str, str, float, Optional[str]]]:
+    check_spec_output_dirs(spec_paths, output_dir)
+    results = []
+    with Client(socket_path) as client:
+        for spec_path in spec_paths:
+            start = time.perf_counter()
+            try:
+                client.request(
+                    "export",
+                    spec_path=os.path.abspath(spec_path),
+                    output_dir=os.path.abspath(get_spec_output_dir(spec_path, output_dir)),
+                    compact=compact,
+                )
+                results.append((spec_path, "compiled", time.perf_counter() - start, None))
+            except Exception as e:
+                results.append((spec_path, "failed", time.perf_counter() - start, str(e)))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.command == "compile" and args.socket:
+        # the daemon compiles every spec it's sent, one at a time
+        if args.changed_only:
+            parser.error("--changed-only can't be used with --socket")
+        if args.jobs != 1:
+            parser.error("--jobs can't be used with --socket")
+    if args.command == "compile":
+        try:
+            check_spec_output_dirs(args.specs, args.output_dir)
+        except Exception as e:
+            parser.error(str(e))
+
+    if args.command == "serve":
+        serve(args.socket, cache_size=args.cache_size)
+        return 0
+
+    start = time.perf_counter()
+    if args.socket:
+        results = compile_specs_with_daemon(
+            args.specs, args.output_dir, args.socket, compact=args.compact
+        )
+    else:
+        results = compile_specs(
+            args.specs,
+            args.output_dir,
+            jobs=args.jobs or None,
+            changed_only=args.changed_only,
+            compact=args.compact,
+        )
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for spec_path, status, spec_elapsed, error in results:
+        if error:
+            failed += 1
+            print(f"{spec_path}: {error}", file=sys.stderr)
+        if args.timing:
+            print(f"{spec_path}: {status} in {spec_elapsed * 1000:.1f}ms", file=sys.stderr)
+
+    if args.timing:
+        print(
+            f"{len(results)} specs ({failed} failed) in {elapsed * 1000:.1f}ms",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,11 +23,20 @@ class Input(WdlBase):
         name: str,
         expression: str = None,
         requires_quotes=True,
+        localization_optional: bool = False,
+        streamable: bool = False,
     ):
+        """
+        :param localization_optional: the task can read the (File) input from its remote
+            location, so the engine can skip copying it into the container
+        :param streamable: the task reads the input sequentially, so it can be streamed
+        """
         self.type = data_type
         self.name = name
         self.expression = expression
         self.requires_quotes = requires_quotes
+        self.localization_optional = localization_optional
+        self.streamable = streamable
 
         self.format = "{type} {name}{def_w_equals}"
 
@@ -0,0 +1,161 @@
+"""
+A long running generator that serves render / export requests over a local
+Unix socket, so callers don't pay for interpreter startup, importing wdlgen
+and compiling the same tasks on every invocation.
+
+The protocol is one JSON object per line in each direction, eg:
+
+    -> {"op": "render", "spec": {...}, "compact": true}
+    <- {"ok": true, "files": {"wf.wdl": "...", "tools/hello.wdl": "..."}}
+
+Supported ops: ping, render, export (writes the bundle to "output_dir"),
+stats and shutdown. Failures respond with {"ok": false, "error": "..."}.
+"""
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from typing import Any, Dict, List, Optional
+
+from .cache import DEFAULT_CACHE_SIZE, LruCache
+from .spec import load_spec, render_spec_bundle, write_bundle_files
+
+
+def _remove_stale_socket(socket_path: str):
+    """
+    Removes a socket left behind by a previous daemon that didn't shut down cleanly,
+    but not a live daemon's socket or anything that isn't a socket.
+    """
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise Exception(f"Couldn't start the wdlgen daemon, '{socket_path}' isn't a socket")
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise Exception(f"Couldn't start the wdlgen daemon, one is already listening on '{socket_path}'")
+
+
+class GenerationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, GenerationRequestHandler)
+        self.socket_path = socket_path
+        self.task_cache = LruCache(cache_size)
+        self.bundle_cache = LruCache(cache_size)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def render(self, request: Dict[str, Any]) -> Dict[str, str]:
+        spec = request.get("spec")
+        if spec is None:
+            spec = load_spec(request["spec_path"])
+        compact = bool(request.get("compact", False))
+        tools_dir = request.get("tools_dir", "tools/")
+
+        key = hashlib.sha256(
+            json.dumps([spec, compact, tools_dir], sort_keys=True).encode()
+        ).hexdigest()
+        # only the caches are shared, so concurrent requests render in parallel (and
+        # the same spec requested twice at once might be rendered twice)
+        files = self.bundle_cache.get(key)
+        if files is None:
+            files = render_spec_bundle(
+                spec, tools_dir=tools_dir, compact=compact, task_cache=self.task_cache
+            )
+            self.bundle_cache[key] = files
+        return files
+
+    def handle_request_object(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "render":
+            return {"ok": True, "files": self.render(request)}
+        if op == "export":
+            files = self.render(request)
+            return {"ok": True, "paths": write_bundle_files(files, request["output_dir"])}
+        if op == "stats":
+            return {
+                "ok": True,
+                "tasks": self.task_cache.stats(),
+                "bundles": self.bundle_cache.stats(),
+            }
+        if op == "shutdown":
+            # shutdown() blocks until serve_forever returns, so can't be called from this thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        raise Exception(f"Unrecognised op '{op}'")
+
+
+class GenerationRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.handle_request_object(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+def serve(socket_path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+    with GenerationServer(socket_path, cache_size=cache_size) as server:
+        server.serve_forever()
+
+
+class Client:
+    """
+    A thin client for the generation daemon, keeping one connection open for many requests.
+    """
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile("rwb")
+
+    def request(self, op: str, **kwargs) -> Dict[str, Any]:
+        self.file.write(json.dumps({"op": op, **kwargs}).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise Exception("The wdlgen daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise Exception(f"The wdlgen daemon couldn't complete '{op}': {response.get('error')}")
+        return response
+
+    def render(self, spec: Dict[str, Any], compact: bool = False) -> Dict[str, str]:
+        return self.request("render", spec=spec, compact=compact)["files"]
+
+    def export(self, spec: Dict[str, Any], output_dir: str, compact: bool = False) -> List[str]:
+        return self.request("export", spec=spec, output_dir=output_dir, compact=compact)["paths"]
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,173 @@
+import asyncio
+import functools
+import io
+import os
+import zipfile
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from .task import Task
+from .util import WdlBase
+from .workflow import Workflow
+
+
+class BundleSink(ABC):
+    """
+    Somewhere a rendered bundle is written to, eg: the local filesystem or object storage.
+    Paths are relative to the root of the bundle, and always use '/'.
+    """
+
+    @abstractmethod
+    async def write(self, path: str, content: str):
+        raise Exception("Subclass must override .write(path, content) method")
+
+
+class LocalFileSink(BundleSink):
+    def __init__(self, directory: str, executor: Optional[Executor] = None):
+        self.directory = directory
+        self.executor = executor
+
+    def write_sync(self, path: str, content: str):
+        full_path = os.path.join(self.directory, *path.split("/"))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+
+    async def write(self, path: str, content: str):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.write_sync, path, content)
+
+
+class InMemorySink(BundleSink):
+    """
+    Keeps the written files in a dictionary of path -> content,
+    a stand in for object storage in tests.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, str] = {}
+
+    async def write(self, path: str, content: str):
+        self.files[path] = content
+
+
+def get_bundle_paths(
+    workflow: Optional[Workflow] = None,
+    tasks: Iterable[WdlBase] = (),
+    tools_dir: str = "tools/",
+) -> List[Tuple[str, WdlBase]]:
+    """
+    Where each document lives within a bundle, the workflow at the root
+    and each task (or subworkflow) in the tools_dir, which matches the
+    default paths of a Workflow.WorkflowImport.
+    """
+    if tools_dir and not tools_dir.endswith("/"):
+        tools_dir += "/"
+    paths = []
+    if workflow is not None:
+        paths.append((f"{workflow.name}.wdl", workflow))
+    paths.extend((f"{tools_dir or ''}{t.name}.wdl", t) for t in tasks)
+    return paths
+
+
+async def export_bundle(
+    destination: Union[str, BundleSink],
+    workflow: Optional[Workflow] = None,
+    tasks: Iterable[Union[Task, Workflow]] = (),
+    tools_dir: str = "tools/",
+    max_concurrency: int = 8,
+    executor: Optional[Executor] = None,
+    compact: bool = False,
+) -> List[str]:
+    """
+    Renders the workflow and tasks in an executor (so the event loop isn't blocked),
+    and writes them to the destination with at most max_concurrency files in flight.
+
+    :param destination: a directory on the local filesystem, or a BundleSink
+    :param executor: used for rendering, defaults to the loop's default executor
+    :return: the paths written, relative to the destination
+    """
+    sink = LocalFileSink(destination) if isinstance(destination, str) else destination
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def export(path: str, node: WdlBase):
+        async with semaphore:
+            content = await loop.run_in_executor(
+                executor, functools.partial(node.get_string, compact=compact)
+            )
+            await sink.write(path, content)
+        return path
+
+    paths = get_bundle_paths(workflow, tasks, tools_dir=tools_dir)
+    return list(await asyncio.gather(*(export(p, n) for p, n in paths)))
+
+
+# zip entries get fixed timestamps and permissions,
+# so identical models produce byte identical archives
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644
+
+
+def write_imports_zip(
+    tasks: Iterable[Union[Task, Workflow]],
+    destination: Union[str, BinaryIO, None] = None,
+    tools_dir: str = "tools/",
+    compact: bool = False,
+    workflow: Optional[Workflow] = None,
+) -> Optional[bytes]:
+    """
+    Streams each rendered task (or subworkflow) straight into a zip archive, sorted
+    by path, as Cromwell expects for the 'workflowDependencies' of a submission.
+
+    :param destination: path or writable binary file, or None to return the zip as bytes
+    :param workflow: if provided, checks every one of its imports is in the archive
+    :return: the zip as bytes when destination is None
+    """
+    entries = sorted(get_bundle_paths(tasks=tasks, tools_dir=tools_dir), key=lambda e: e[0])
+
+    paths = [p for p, _ in entries]
+    duplicates = sorted({a for a, b in zip(paths, paths[1:]) if a == b})
+    if duplicates:
+        raise Exception(
+            "Couldn't package imports, multiple documents have the paths: "
+            + ", ".join(duplicates)
+        )
+    if workflow is not None:
+        missing = [i.path for i in workflow.imports if i.path not in paths]
+        if missing:
+            raise Exception(
+                f"Couldn't package imports for workflow '{workflow.name}', "
+                f"missing: {', '.join(missing)}"
+            )
+
+    buffer = io.BytesIO() if destination is None else None
+    with zipfile.ZipFile(
+        buffer if destination is None else destination, "w", zipfile.ZIP_DEFLATED
+    ) as zf:
+        for path, node in entries:
+            info = zipfile.ZipInfo(path, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3  # unix, regardless of the machine
+            info.external_attr = ZIP_FILE_MODE << 16
+            with zf.open(info, "w") as f:
+                f.write(node.get_string(compact=compact).encode())
+
+    return buffer.getvalue() if buffer is not None else None
+
+
+def package_for_submission(
+    workflow: Workflow,
+    tasks: Iterable[Union[Task, Workflow]],
+    destination: Union[str, BinaryIO, None] = None,
+    tools_dir: str = "tools/",
+    compact: bool = False,
+) -> Tuple[str, Optional[bytes]]:
+    """
+    :return: (main workflow source, zip of its imports as bytes or None if a destination was given)
+    """
+    imports_zip = write_imports_zip(
+        tasks, destination, tools_dir=tools_dir, compact=compact, workflow=workflow
+    )
+    return workflow.get_string(compact=compact), imports_zip
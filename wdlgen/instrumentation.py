@@ -0,0 +1,195 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Tuple
+
+from .types import ArrayType, MapType, PairType, PrimitiveType, StructType, WdlType
+from .util import WdlBase
+from .workflowcall import StepValueSection
+
+# The render methods are only wrapped while a profiler is active or a hook is
+# registered, so there's no overhead on get_string() otherwise.
+
+RenderHook = Callable[[str, float, int], None]
+
+_lock = threading.RLock()
+_local = threading.local()
+_profilers: List["RenderProfiler"] = []
+_hooks: List[RenderHook] = []
+_originals: Dict[Tuple[type, str], Callable] = {}
+_started_tracemalloc = False
+
+
+@dataclass
+class NodeStats:
+    calls: int = 0
+    total_time: float = 0.0
+    self_time: float = 0.0
+    bytes: int = 0
+    allocated: int = 0
+
+
+class RenderProfiler:
+    """
+    Records per node type call counts, cumulative and self time (seconds), and bytes
+    produced for every get_string() called while the profiler is active, eg:
+
+        with RenderProfiler() as profiler:
+            workflow.get_string()
+        print(profiler.to_json())
+
+    When trace_allocations is set, the net memory allocated while rendering
+    each node type is recorded through tracemalloc (which is much slower).
+    Profiling is process wide, renders on other threads are recorded too.
+    """
+
+    def __init__(self, trace_allocations: bool = False):
+        self.trace_allocations = trace_allocations
+        self.stats: Dict[str, NodeStats] = {}
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+
+    def __enter__(self):
+        with _lock:
+            _profilers.append(self)
+            _update_instrumentation()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with _lock:
+            _profilers.remove(self)
+            _update_instrumentation()
+
+    def record(
+        self,
+        path: Tuple[str, ...],
+        elapsed: float,
+        self_time: float,
+        nbytes: int,
+        allocated: int,
+    ):
+        stats = self.stats.get(path[-1])
+        if stats is None:
+            stats = self.stats[path[-1]] = NodeStats()
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.self_time += self_time
+        stats.bytes += nbytes
+        stats.allocated += allocated
+        self.stacks[path] = self.stacks.get(path, 0.0) + self_time
+
+    def to_dict(self) -> dict:
+        return {k: asdict(v) for k, v in self.stats.items()}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_collapsed_stacks(self) -> str:
+        """
+        The self time (in microseconds) of each render stack, in the collapsed
+        format read by flamegraph.pl and speedscope: "Workflow;WorkflowCall 1234"
+        """
+        return "\n".join(
+            f"{';'.join(path)} {round(t * 1e6)}"
+            for path, t in sorted(self.stacks.items())
+        )
+
+
+def add_render_hook(hook: RenderHook):
+    """
+    Registers a callback that's called with (node_type, elapsed_seconds, bytes_produced)
+    after every get_string(), until it's removed with remove_render_hook.
+    """
+    with _lock:
+        _hooks.append(hook)
+        _update_instrumentation()
+
+
+def remove_render_hook(hook: RenderHook):
+    with _lock:
+        _hooks.remove(hook)
+        _update_instrumentation()
+
+
+def _instrumented_classes() -> List[type]:
+    classes = [WdlType, PrimitiveType, ArrayType, PairType, MapType, StructType]
+    pending = [WdlBase]
+    while pending:
+        cls = pending.pop()
+        classes.append(cls)
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+def _update_instrumentation():
+    global _started_tracemalloc
+
+    active = bool(_profilers or _hooks)
+    if active and not _originals:
+        targets = [(cls, "get_string") for cls in _instrumented_classes()]
+        targets.append((StepValueSection, "render"))
+        for cls, attr in targets:
+            func = cls.__dict__.get(attr)
+            if func is None or getattr(func, "__isabstractmethod__", False):
+                continue
+            _originals[(cls, attr)] = func
+            setattr(cls, attr, _wrap(func, "." + attr if attr != "get_string" else ""))
+    elif not active and _originals:
+        for (cls, attr), func in _originals.items():
+            setattr(cls, attr, func)
+        _originals.clear()
+
+    trace = any(p.trace_allocations for p in _profilers)
+    if trace and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    elif not trace and _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def _count_bytes(result) -> int:
+    if isinstance(result, str):
+        return len(result.encode())
+    if isinstance(result, list):
+        return sum(_count_bytes(r) for r in result)
+    return 0
+
+
+def _wrap(func, suffix: str):
+    @functools.wraps(func)
+    def instrumented(self, *args, **kwargs):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack and stack[-1][1] is self:
+            # a super() call, or another render method on the same node
+            return func(self, *args, **kwargs)
+
+        frame = [type(self).__qualname__ + suffix, self, 0.0]
+        stack.append(frame)
+        tracing = tracemalloc.is_tracing()
+        memory_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        try:
+            result = func(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            path = tuple(f[0] for f in stack)
+            stack.pop()
+        allocated = (tracemalloc.get_traced_memory()[0] - memory_before) if tracing else 0
+        if stack:
+            stack[-1][2] += elapsed
+
+        nbytes = _count_bytes(result)
+        with _lock:
+            for profiler in _profilers:
+                profiler.record(path, elapsed, elapsed - frame[2], nbytes, allocated)
+            hooks = list(_hooks)
+        for hook in hooks:
+            hook(path[-1], elapsed, nbytes)
+        return result
+
+    return instrumented
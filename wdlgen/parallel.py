@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .workflowcall import WorkflowCallBase, WorkflowScatter
+
+# Below this many calls, starting a process pool (and pickling the calls
+# across to it) costs more than rendering them serially.
+DEFAULT_MIN_CALLS = 2000
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _render_chunk(chunk: List[Tuple[WorkflowCallBase, int]], compact: bool) -> List[str]:
+    return [c.get_string(indent=indent, compact=compact) for c, indent in chunk]
+
+
+def render_calls(
+    calls: List[WorkflowCallBase],
+    indent: int = 1,
+    compact: bool = False,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    min_calls: int = DEFAULT_MIN_CALLS,
+) -> List[str]:
+    """
+    Renders each of the calls, in order, splitting them into chunks across a process pool.
+    The bodies of scatters with at least 'chunk_size' calls are split up too, so one
+    large scatter doesn't end up rendered by one process.
+
+    :param workers: number of processes, None uses every core (serial on a single core)
+    :param min_calls: fall back to rendering serially below this many calls
+    :return: the rendered string of each call
+    """
+    # (call, indent) units of work, where a large scatter contributes its body calls instead
+    units: List[Tuple[WorkflowCallBase, int]] = []
+    # per call: (scatter, start, end) of the units the call was split into
+    layout: List[Tuple[Optional[WorkflowScatter], int, int]] = []
+    for c in calls:
+        start = len(units)
+        if isinstance(c, WorkflowScatter) and len(c.calls) >= chunk_size:
+            units.extend((cc, indent + 1) for cc in c.calls)
+            layout.append((c, start, len(units)))
+        else:
+            units.append((c, indent))
+            layout.append((None, start, len(units)))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(units) < max(min_calls, 1):
+        rendered = _render_chunk(units, compact)
+    else:
+        chunks = [units[i : i + chunk_size] for i in range(0, len(units), chunk_size)]
+        rendered = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(_render_chunk, chunks, [compact] * len(chunks)):
+                rendered.extend(result)
+
+    out = []
+    for scatter, start, end in layout:
+        if scatter is None:
+            out.append(rendered[start])
+        else:
+            body = "\n".join(rendered[start:end])
+            out.append(scatter.get_string_from_body(body, indent))
+    return out
@@ -0,0 +1,573 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .common import Input, Output
+from .types import ArrayType, WdlType
+from .util import get_referenced_identifiers, rename_identifiers
+from .workflow import Workflow
+from .workflowcall import (
+    WorkflowCall,
+    WorkflowCallBase,
+    WorkflowConditional,
+    WorkflowDeclaration,
+    WorkflowScatter,
+)
+
+
+def get_item_references(item) -> Set[str]:
+    """
+    The identifiers a single call references through its input values,
+    or a declaration through its expression.
+    """
+    if isinstance(item, WorkflowDeclaration):
+        return get_referenced_identifiers(item.expression)
+    refs = set()
+    for value in item.input_columns.values:
+        refs.update(get_referenced_identifiers(value))
+    return refs
+
+
+def get_block_references(block) -> Set[str]:
+    """
+    The identifiers a scatter or conditional references in its header.
+    """
+    if isinstance(block, WorkflowScatter):
+        return get_referenced_identifiers(block.expression)
+    if isinstance(block, WorkflowConditional):
+        return get_referenced_identifiers(block.condition)
+    return set()
+
+
+def _walk_calls(
+    items: Iterable[WorkflowCallBase], blocks: Tuple[WorkflowCallBase, ...] = ()
+) -> Iterable[Tuple[WorkflowCall, Tuple[WorkflowCallBase, ...]]]:
+    """
+    Yields every WorkflowCall (and WorkflowDeclaration), paired with the
+    scatters / conditionals that enclose it.
+    """
+    for item in items:
+        if isinstance(item, (WorkflowScatter, WorkflowConditional)):
+            yield from _walk_calls(item.calls, (*blocks, item))
+        else:
+            yield item, blocks
+
+
+def _with_calls(block, calls: List[WorkflowCallBase]):
+    """
+    The block with these calls, a clone where they've changed, as blocks can be
+    shared with other workflows (eg: the template a workflow was cloned from).
+    """
+    if len(calls) == len(block.calls) and all(a is b for a, b in zip(calls, block.calls)):
+        return block
+    return block.clone(calls=calls)
+
+
+def _defined_names(items: Iterable[WorkflowCallBase]) -> Set[str]:
+    return {c.name for c, _ in _walk_calls(items)}
+
+
+def _count_references(items: Iterable[WorkflowCallBase]) -> Counter:
+    """
+    Counts references per identifier, once for every call or block header that mentions it.
+    """
+    counts = Counter()
+    for item in items:
+        if isinstance(item, (WorkflowScatter, WorkflowConditional)):
+            counts.update(get_block_references(item))
+            counts.update(_count_references(item.calls))
+        else:
+            counts.update(get_item_references(item))
+    return counts
+
+
+def _output_references(outputs) -> Set[str]:
+    refs = set()
+    for o in outputs:
+        if isinstance(o, Output):
+            refs.update(get_referenced_identifiers(o.expression))
+        else:
+            # a raw string, eg: "File out = task.out"
+            refs.update(get_referenced_identifiers(str(o)))
+    return refs
+
+
+def _input_references(inp: Input) -> Set[str]:
+    if inp.requires_quotes and isinstance(inp.expression, str):
+        # the expression is rendered as a string literal
+        return set()
+    return get_referenced_identifiers(inp.expression)
+
+
+@dataclass
+class DeadCodeReport:
+    removed_calls: List[str] = field(default_factory=list)
+    removed_inputs: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.removed_calls or self.removed_inputs)
+
+
+def eliminate_dead_code(
+    workflow: Workflow, keep: Optional[Iterable[str]] = None
+) -> DeadCodeReport:
+    """
+    Removes the calls whose outputs never reach the workflow outputs (directly or
+    through other calls), and the workflow inputs nothing reads. Scatters and
+    conditionals left without calls are removed too.
+
+    A workflow without outputs is left alone, as draft-2 treats every call output
+    as a workflow output in that case.
+
+    :param workflow: modified in place, the scatters and conditionals it changes are
+        replaced with clones, so a workflow it was cloned from is left as it was
+    :param keep: names of calls or inputs that must be kept, eg: calls run for their side effects
+    :return: DeadCodeReport of the removed call and input names
+    """
+    report = DeadCodeReport()
+    if not workflow.outputs:
+        return report
+
+    calls_by_name: Dict[str, List[Tuple[WorkflowCall, Tuple]]] = {}
+    for call, blocks in _walk_calls(workflow.calls):
+        calls_by_name.setdefault(call.name, []).append((call, blocks))
+    inputs_by_name = {i.name: i for i in workflow.inputs}
+
+    live: Set[str] = set()
+    pending = [*_output_references(workflow.outputs), *(keep or [])]
+    while pending:
+        name = pending.pop()
+        if name in live:
+            continue
+        live.add(name)
+        for call, blocks in calls_by_name.get(name, []):
+            pending.extend(get_item_references(call))
+            for block in blocks:
+                pending.extend(get_block_references(block))
+        if name in inputs_by_name:
+            pending.extend(_input_references(inputs_by_name[name]))
+
+    def prune(items: List[WorkflowCallBase]) -> List[WorkflowCallBase]:
+        retained = []
+        for item in items:
+            if isinstance(item, (WorkflowScatter, WorkflowConditional)):
+                calls = prune(item.calls)
+                if calls:
+                    retained.append(_with_calls(item, calls))
+            elif item.name in live:
+                retained.append(item)
+            else:
+                report.removed_calls.append(item.name)
+        return retained
+
+    workflow.calls = prune(workflow.calls)
+
+    retained_inputs = []
+    for inp in workflow.inputs:
+        if inp.name in live:
+            retained_inputs.append(inp)
+        else:
+            report.removed_inputs.append(inp.name)
+    workflow.inputs = retained_inputs
+
+    return report
+
+
+def hoist_scatter_invariants(workflow: Workflow) -> List[str]:
+    """
+    Moves calls that don't depend on a scatter's identifier, or on any call that
+    stays inside the scatter, out in front of the scatter so they run once instead
+    of once per shard. Calls within conditionals in the scatter are hoisted inside
+    an equivalent conditional when the condition is also invariant. Nested scatters
+    are processed innermost first, so a call can move out through several levels.
+
+    Calls whose gathered (array) outputs are referenced from outside the scatter are
+    left alone, as hoisting them would change the type of those references. So are
+    calls in a conditional that something staying in that conditional references,
+    which would see their outputs as optional once they're hoisted.
+
+    :param workflow: modified in place, the scatters and conditionals it changes are
+        replaced with clones, so a workflow it was cloned from is left as it was
+    :return: names of the hoisted calls
+    """
+    hoisted: List[str] = []
+    total_references = _count_references(workflow.calls)
+    total_references.update(_output_references(workflow.outputs))
+    for inp in workflow.inputs:
+        total_references.update(_input_references(inp))
+
+    workflow.calls = _hoist_from_items(workflow.calls, total_references, hoisted)
+    return hoisted
+
+
+def _hoist_from_items(
+    items: List[WorkflowCallBase], total_references: Counter, hoisted: List[str]
+) -> List[WorkflowCallBase]:
+    out = []
+    for item in items:
+        if isinstance(item, (WorkflowScatter, WorkflowConditional)):
+            item = _with_calls(item, _hoist_from_items(item.calls, total_references, hoisted))
+        if isinstance(item, WorkflowScatter):
+            lifted, calls = _hoist_from_scatter(item, total_references, hoisted)
+            out.extend(lifted)
+            if not calls:
+                continue
+            item = _with_calls(item, calls)
+        out.append(item)
+    return out
+
+
+def _hoist_from_scatter(
+    scatter: WorkflowScatter, total_references: Counter, hoisted: List[str]
+) -> Tuple[List[WorkflowCallBase], List[WorkflowCallBase]]:
+    """
+    Finds the invariant calls of the scatter.
+
+    :return: (the invariant calls, wrapped in their conditionals, to be placed before
+        the scatter, the scatter's calls without them)
+    """
+    outside_references = total_references - _count_references(scatter.calls)
+
+    # candidates are the direct calls, and calls within (nested) conditionals
+    candidates: List[Tuple[WorkflowCall, Tuple[WorkflowConditional, ...]]] = []
+
+    def collect(items, conditionals):
+        for item in items:
+            if isinstance(item, WorkflowConditional):
+                collect(item.calls, (*conditionals, item))
+            elif isinstance(item, WorkflowCall):
+                candidates.append((item, conditionals))
+
+    collect(scatter.calls, ())
+
+    defined = _defined_names(scatter.calls)
+    references = list(_walk_references(scatter.calls))
+    # calls that can't move, as a call staying in their conditional references them
+    pinned: Set[str] = set()
+    while True:
+        invariant = _find_invariant(scatter.identifier, candidates, defined, pinned, outside_references)
+        conflicts = {
+            call.name
+            for call, conditionals in candidates
+            if call.name in invariant
+            and conditionals
+            and _referenced_in_conditionals(call.name, conditionals, references, invariant)
+        }
+        if not conflicts:
+            break
+        pinned.update(conflicts)
+
+    if not invariant:
+        return [], scatter.calls
+
+    def remove(items):
+        retained = []
+        for item in items:
+            if isinstance(item, WorkflowConditional):
+                calls = remove(item.calls)
+                if calls:
+                    retained.append(_with_calls(item, calls))
+            elif not (isinstance(item, WorkflowCall) and item.name in invariant):
+                retained.append(item)
+        return retained
+
+    # rebuild the enclosing conditionals outside of the scatter, in the original order
+    lifted: List[WorkflowCallBase] = []
+    wrappers: Dict[int, WorkflowConditional] = {}
+    for call, conditionals in candidates:
+        if call.name not in invariant:
+            continue
+        if call.name not in hoisted:
+            # could have already moved out of a nested scatter
+            hoisted.append(call.name)
+        container = lifted
+        for conditional in conditionals:
+            wrapper = wrappers.get(id(conditional))
+            if wrapper is None:
+                wrapper = WorkflowConditional(conditional.condition)
+                wrappers[id(conditional)] = wrapper
+                container.append(wrapper)
+            container = wrapper.calls
+        container.append(call)
+
+    return lifted, remove(scatter.calls)
+
+
+def _find_invariant(
+    identifier: str,
+    candidates: List[Tuple[WorkflowCall, Tuple[WorkflowConditional, ...]]],
+    defined: Set[str],
+    pinned: Set[str],
+    outside_references: Counter,
+) -> Set[str]:
+    invariant: Set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        local = {identifier, *(defined - invariant)}
+        for call, conditionals in candidates:
+            if call.name in invariant or call.name in pinned or outside_references[call.name] > 0:
+                continue
+            refs = get_item_references(call)
+            for conditional in conditionals:
+                refs.update(get_block_references(conditional))
+            if not refs & local:
+                invariant.add(call.name)
+                changed = True
+    return invariant
+
+
+def _walk_references(
+    items: Iterable[WorkflowCallBase], blocks: Tuple[WorkflowCallBase, ...] = ()
+) -> Iterable[Tuple[Optional[WorkflowCallBase], Set[str], Tuple[WorkflowCallBase, ...]]]:
+    """
+    Yields (call or None for a block header, its references, the enclosing blocks)
+    for every call, declaration and block header.
+    """
+    for item in items:
+        if isinstance(item, (WorkflowScatter, WorkflowConditional)):
+            yield None, get_block_references(item), blocks
+            yield from _walk_references(item.calls, (*blocks, item))
+        else:
+            yield item, get_item_references(item), blocks
+
+
+def _referenced_in_conditionals(name, conditionals, references, invariant) -> bool:
+    """
+    Whether anything staying in the scatter, inside all of the conditionals, references
+    the call, as it sees the call's outputs as T there but T? once the call is hoisted.
+    """
+    for item, refs, blocks in references:
+        if name not in refs or (item is not None and item.name in invariant):
+            continue
+        if all(any(b is c for b in blocks) for c in conditionals):
+            return True
+    return False
+
+
+@dataclass
+class FusionReport:
+    fused_scatters: int = 0
+    merged_conditionals: int = 0
+
+    def __bool__(self):
+        return bool(self.fused_scatters or self.merged_conditionals)
+
+
+def fuse_blocks(workflow: Workflow) -> FusionReport:
+    """
+    Fuses adjacent scatters over the same expression, and merges adjacent
+    conditionals with the same condition, so the engine tracks one set of shards.
+
+    Blocks are only combined when neither references a call in the other, as
+    moving a call into the same block changes the type it's seen as
+    (eg: per shard 'T' vs gathered 'Array[T]'), nor depends on a call outside them
+    that (transitively) depends on the other, as the combined block would be part of
+    a cycle. The second scatter's identifier is renamed to the first's where they differ.
+
+    :param workflow: modified in place, the scatters and conditionals it changes are
+        replaced with clones, so a workflow it was cloned from is left as it was
+    :return: FusionReport of how many blocks were combined
+    """
+    report = FusionReport()
+    workflow.calls = _fuse_items(workflow.calls, report, _call_dependencies(workflow.calls))
+    return report
+
+
+def _call_dependencies(items: Iterable[WorkflowCallBase]) -> Dict[str, Set[str]]:
+    """
+    The identifiers each call (or declaration) depends on, including its blocks' headers.
+    """
+    dependencies: Dict[str, Set[str]] = {}
+    for call, blocks in _walk_calls(items):
+        refs = dependencies.setdefault(call.name, set())
+        refs.update(get_item_references(call))
+        for block in blocks:
+            refs.update(get_block_references(block))
+    return dependencies
+
+
+def _fuse_items(
+    items: List[WorkflowCallBase], report: FusionReport, dependencies: Dict[str, Set[str]]
+) -> List[WorkflowCallBase]:
+    out: List[WorkflowCallBase] = []
+    for item in items:
+        previous = out[-1] if out else None
+        if _can_fuse_scatters(previous, item, dependencies):
+            calls = item.calls
+            if item.identifier != previous.identifier:
+                calls = _rename_in_items(calls, {item.identifier: previous.identifier})
+            out[-1] = previous.clone(calls=[*previous.calls, *calls])
+            report.fused_scatters += 1
+        elif _can_merge_conditionals(previous, item, dependencies):
+            out[-1] = previous.clone(calls=[*previous.calls, *item.calls])
+            report.merged_conditionals += 1
+        else:
+            out.append(item)
+
+    return [
+        _with_calls(item, _fuse_items(item.calls, report, dependencies))
+        if isinstance(item, (WorkflowScatter, WorkflowConditional))
+        else item
+        for item in out
+    ]
+
+
+def _blocks_are_independent(first, second, dependencies: Dict[str, Set[str]]) -> bool:
+    first_names, second_names = _defined_names(first.calls), _defined_names(second.calls)
+    for block, other_names in ((first, second_names), (second, first_names)):
+        # follow the block's references through the calls outside the pair
+        pending = list(_count_references([block]))
+        seen: Set[str] = set()
+        while pending:
+            name = pending.pop()
+            if name in other_names:
+                return False
+            if name in seen or name in first_names or name in second_names:
+                continue
+            seen.add(name)
+            pending.extend(dependencies.get(name, ()))
+    return True
+
+
+def _can_fuse_scatters(first, second, dependencies: Dict[str, Set[str]]) -> bool:
+    if not (isinstance(first, WorkflowScatter) and isinstance(second, WorkflowScatter)):
+        return False
+    if first.expression.strip() != second.expression.strip():
+        return False
+    if not _blocks_are_independent(first, second, dependencies):
+        return False
+    if first.identifier != second.identifier:
+        # renaming would capture an existing reference to the first identifier
+        if first.identifier in _count_references(second.calls):
+            return False
+        if first.identifier in _nested_scatter_identifiers(second.calls):
+            return False
+    return True
+
+
+def _can_merge_conditionals(first, second, dependencies: Dict[str, Set[str]]) -> bool:
+    if not (
+        isinstance(first, WorkflowConditional)
+        and isinstance(second, WorkflowConditional)
+    ):
+        return False
+    return first.condition.strip() == second.condition.strip() and _blocks_are_independent(
+        first, second, dependencies
+    )
+
+
+def _nested_scatter_identifiers(items: Iterable[WorkflowCallBase]) -> Set[str]:
+    identifiers = set()
+    for item in items:
+        if isinstance(item, WorkflowScatter):
+            identifiers.add(item.identifier)
+        if isinstance(item, (WorkflowScatter, WorkflowConditional)):
+            identifiers.update(_nested_scatter_identifiers(item.calls))
+    return identifiers
+
+
+def _rename_in_items(
+    items: Iterable[WorkflowCallBase], renames: Dict[str, str]
+) -> List[WorkflowCallBase]:
+    """
+    Clones of the items, with the identifiers renamed.
+    """
+    renamed = []
+    for item in items:
+        if isinstance(item, WorkflowScatter):
+            # a nested scatter can shadow the identifier being renamed
+            inner = {k: v for k, v in renames.items() if k != item.identifier}
+            item = item.clone(
+                expression=rename_identifiers(item.expression, renames),
+                calls=_rename_in_items(item.calls, inner),
+            )
+        elif isinstance(item, WorkflowConditional):
+            item = item.clone(
+                condition=rename_identifiers(item.condition, renames),
+                calls=_rename_in_items(item.calls, renames),
+            )
+        elif isinstance(item, WorkflowDeclaration):
+            item = item.clone(expression=rename_identifiers(item.expression, renames))
+        else:
+            columns = item.input_columns
+            item = item.clone(
+                input_values={
+                    tag: rename_identifiers(value, renames)
+                    for tag, value in zip(columns.tags, columns.values)
+                }
+            )
+        renamed.append(item)
+    return renamed
+
+
+def tree_reduce(
+    merge: WorkflowCall,
+    input_tag: str,
+    output: str,
+    data_type: WdlType,
+    fan_in: int = 100,
+    expected_size: int = 10000,
+) -> List[WorkflowCallBase]:
+    """
+    Replaces a single merge call over a large (gathered) array with a hierarchical
+    reduction: each level scatters over chunks of at most fan_in elements and merges
+    each chunk, until a final merge of at most fan_in elements (for up to expected_size
+    elements, larger arrays still work with bigger final merges). The merge runs in
+    O(log N) parallel rounds rather than one call localising every file.
+
+    The merge task must accept an Array[T] input (input_tag) and produce a T output,
+    where T is the data_type of each element (eg: File). The final call keeps the merge's
+    name, so references to its outputs are unchanged.
+
+    :param merge: the call to replace, its input_tag value is the array to reduce
+    :return: the items to put in place of the merge call
+    """
+    if fan_in < 2:
+        raise Exception(f"Couldn't tree reduce '{merge.name}', fan_in must be at least 2")
+    if input_tag not in merge.input_columns:
+        raise Exception(f"Couldn't tree reduce '{merge.name}', it has no input '{input_tag}'")
+
+    levels, size = 0, expected_size
+    while size > fan_in:
+        size = -(-size // fan_in)
+        levels += 1
+
+    items: List[WorkflowCallBase] = []
+    source = merge.input_columns.get(input_tag)["value"]
+    array_type = WdlType(ArrayType(data_type, requires_multiple=False))
+    for level in range(1, levels + 1):
+        prefix = f"{merge.name}_level{level}"
+        inputs, chunk, index, element = (
+            f"{prefix}_inputs",
+            f"{prefix}_chunk",
+            f"{prefix}_index",
+            f"{prefix}_element",
+        )
+        position = f"{chunk} * {fan_in} + {index}"
+        # each shard picks out its chunk, as there's no chunking function before WDL 1.1
+        select_chunk = WorkflowScatter(
+            index,
+            f"range({fan_in})",
+            [
+                WorkflowConditional(
+                    f"{position} < length({inputs})",
+                    [WorkflowDeclaration(data_type, element, f"{inputs}[{position}]")],
+                )
+            ],
+        )
+        merge_chunk = merge.clone(
+            alias=prefix, input_values={input_tag: f"select_all({element})"}
+        )
+        items.append(WorkflowDeclaration(array_type, inputs, source))
+        items.append(
+            WorkflowScatter(
+                chunk,
+                f"range((length({inputs}) + {fan_in - 1}) / {fan_in})",
+                [select_chunk, merge_chunk],
+            )
+        )
+        source = f"{prefix}.{output}"
+
+    items.append(merge.clone(input_values={input_tag: source}))
+    return items
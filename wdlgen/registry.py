@@ -0,0 +1,264 @@
+"""
+Tasks referenced by name and loaded on demand, so a generator wiring thousands of
+tools only keeps the most recently used ones in memory, eg:
+
+    registry = TaskRegistry.from_bundle("bundle/")
+    align = registry.ref("align")
+    call = WorkflowCall("align.align", task=align, inputs_details={"bam": {"value": "bam"}})
+    call.get_output_type("out")
+
+A registry reads a directory of {name}.pickle (see write_task_cache), {name}.json
+(a task spec, see wdlgen.spec) or {name}.wdl files. A .wdl file is only read for
+the task's signature (its inputs and outputs), as wdlgen can't load a task's WDL.
+"""
+import json
+import os
+import pickle
+import re
+from typing import Dict, Iterable, List, Optional, Union
+
+from .cache import DEFAULT_CACHE_SIZE, LruCache
+from .common import Input, Output
+from .spec import compile_task
+from .task import Task
+from .types import StructType, WdlType, struct_scope
+
+# in order of preference, when a directory has more than one file for a task
+TASK_EXTENSIONS = (".pickle", ".json", ".wdl")
+
+_TASK_HEADER = re.compile(r"^task\s+(\w+)\s*\{\s*$")
+_STRUCT_HEADER = re.compile(r"^struct\s+(\w+)\s*\{\s*$")
+_SECTION_HEADER = re.compile(r"^\s*(input|output)\s*\{\s*$")
+
+
+class TaskSignature:
+    """
+    The name, inputs and outputs of a task, enough to wire calls to it.
+    """
+
+    def __init__(self, name: str, inputs: List[Input] = None, outputs: List[Output] = None):
+        self.name = name
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+
+
+class TaskRef:
+    """
+    A handle on a task in a TaskRegistry, that loads (and caches) the task when
+    its inputs or outputs are used, rather than holding on to it.
+    """
+
+    __slots__ = ("name", "registry")
+
+    def __init__(self, name: str, registry: "TaskRegistry"):
+        self.name = name
+        self.registry = registry
+
+    def resolve(self) -> Union[Task, TaskSignature]:
+        return self.registry.get(self.name)
+
+    @property
+    def inputs(self) -> List[Input]:
+        return self.resolve().inputs
+
+    @property
+    def outputs(self) -> List[Output]:
+        return self.resolve().outputs
+
+    def __getstate__(self):
+        return self.name, self.registry
+
+    def __setstate__(self, state):
+        self.name, self.registry = state
+
+    def __repr__(self):
+        return f"TaskRef({self.name!r})"
+
+
+class TaskRegistry:
+    """
+    Tasks by name, indexed from a directory up front but loaded when they're first
+    used, keeping at most cache_size loaded tasks (least recently used are evicted).
+    """
+
+    def __init__(
+        self, directory: str, cache_size: int = DEFAULT_CACHE_SIZE, version: str = "draft-2"
+    ):
+        """
+        :param version: for task specs (.json) that don't have their own
+        """
+        if not os.path.isdir(directory):
+            raise Exception(f"Couldn't load tasks from '{directory}', it isn't a directory")
+        self.directory = directory
+        self.version = version
+        self.paths: Dict[str, str] = {}
+        for filename in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(filename)
+            if extension not in TASK_EXTENSIONS:
+                continue
+            current = self.paths.get(name)
+            if current is None or TASK_EXTENSIONS.index(extension) < TASK_EXTENSIONS.index(
+                os.path.splitext(current)[1]
+            ):
+                self.paths[name] = os.path.join(directory, filename)
+
+        self.cache = LruCache(cache_size)
+
+    @staticmethod
+    def from_bundle(
+        bundle_dir: str, tools_dir: str = "tools/", cache_size: int = DEFAULT_CACHE_SIZE
+    ) -> "TaskRegistry":
+        """
+        The tasks of a bundle written by wdlgen (eg: 'wdlgen compile'), ie: {tools_dir}/{name}.wdl
+        """
+        return TaskRegistry(os.path.join(bundle_dir, tools_dir), cache_size=cache_size)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def names(self) -> List[str]:
+        return list(self.paths)
+
+    def ref(self, name: str) -> TaskRef:
+        if name not in self.paths:
+            raise Exception(f"Couldn't find task '{name}' in '{self.directory}'")
+        return TaskRef(name, self)
+
+    def get(self, name: str) -> Union[Task, TaskSignature]:
+        task = self.cache.get(name)
+        if task is not None:
+            return task
+
+        path = self.paths.get(name)
+        if path is None:
+            raise Exception(f"Couldn't find task '{name}' in '{self.directory}'")
+        task = load_task_file(path, version=self.version)
+        self.cache[name] = task
+        return task
+
+    def __getstate__(self):
+        # loaded tasks aren't carried across to other processes
+        state = dict(self.__dict__)
+        state["cache"] = LruCache(self.cache.maxsize)
+        return state
+
+
+def write_task_cache(tasks: Iterable[Task], directory: str) -> List[str]:
+    """
+    Serialises each task to {directory}/{name}.pickle, for a TaskRegistry to load
+    later, returning the paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for task in tasks:
+        path = os.path.join(directory, f"{task.name}.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(task, f, protocol=pickle.HIGHEST_PROTOCOL)
+        paths.append(path)
+    return paths
+
+
+def load_task_file(path: str, version: str = "draft-2") -> Union[Task, TaskSignature]:
+    extension = os.path.splitext(path)[1]
+    if extension == ".pickle":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    if extension == ".json":
+        with open(path) as f:
+            return compile_task(json.load(f), version)
+    if extension == ".wdl":
+        with open(path) as f:
+            return read_task_signature(f.read())
+    raise Exception(
+        f"Couldn't load task from '{path}', expected one of: {', '.join(TASK_EXTENSIONS)}"
+    )
+
+
+def _split_declaration(line: str):
+    """
+    'Map[String, Int] counts = {...}' -> ('Map[String, Int]', 'counts', '{...}')
+    """
+    depth = 0
+    for i, c in enumerate(line):
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+        elif c.isspace() and depth == 0:
+            break
+    else:
+        raise Exception(f"Couldn't read the declaration '{line}'")
+    data_type, rest = line[:i], line[i:].strip()
+    name, _, expression = rest.partition("=")
+    return data_type, name.strip(), expression.strip() or None
+
+
+def read_task_signature(wdl: str) -> TaskSignature:
+    """
+    Reads the name, inputs and outputs of a task rendered by wdlgen, resolving
+    struct types with the struct definitions in the file.
+    """
+    name = None
+    structs: List[StructType] = []
+    sections: Dict[str, List[str]] = {"input": [], "output": []}
+    section: Optional[str] = None
+    struct: Optional[str] = None
+    struct_members: Dict[str, str] = {}
+    # the line that closes the command, while in it
+    command_end: Optional[str] = None
+
+    for line in wdl.splitlines():
+        stripped = line.strip()
+        if command_end is not None:
+            if stripped == command_end:
+                command_end = None
+            continue
+        if struct is not None:
+            if stripped == "}":
+                with struct_scope(*structs):
+                    structs.append(StructType(struct, struct_members))
+                struct, struct_members = None, {}
+            elif stripped:
+                data_type, member, _ = _split_declaration(stripped)
+                struct_members[member] = data_type
+            continue
+        if section is not None:
+            if stripped == "}":
+                section = None
+            elif stripped and not stripped.startswith("#"):
+                sections[section].append(stripped)
+            continue
+
+        if name is None:
+            match = _STRUCT_HEADER.match(stripped)
+            if match:
+                struct = match.group(1)
+                continue
+            match = _TASK_HEADER.match(stripped)
+            if match:
+                name = match.group(1)
+            continue
+        if stripped in ("command <<<", "command {"):
+            command_end = ">>>" if stripped.endswith("<<<") else "}"
+            continue
+        match = _SECTION_HEADER.match(line)
+        if match:
+            section = match.group(1)
+
+    if name is None:
+        raise Exception("Couldn't read the task's signature, there's no task in the WDL")
+
+    inputs, outputs = [], []
+    with struct_scope(*structs):
+        for line in sections["input"]:
+            data_type, input_name, expression = _split_declaration(line)
+            inputs.append(
+                Input(WdlType.parse_type(data_type), input_name, expression, requires_quotes=False)
+            )
+        for line in sections["output"]:
+            data_type, output_name, expression = _split_declaration(line)
+            outputs.append(Output(WdlType.parse_type(data_type), output_name, expression))
+    return TaskSignature(name, inputs, outputs)
@@ -0,0 +1,299 @@
+"""
+An offline, discrete-event estimate of how a generated workflow would run:
+every call (and scatter shard) is a job with a duration and cpu / memory
+requirement, scheduled as soon as its dependencies finish and there are
+enough free resources, eg:
+
+    report = simulate(workflow, tasks=tasks, cores=64, memory=256,
+                      scatter_cardinality={"sample": 500},
+                      estimates={"align": TaskEstimate(duration=3600)})
+    report.makespan, report.critical_path
+"""
+import heapq
+import random
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .passes import get_block_references, get_item_references
+from .task import Task
+from .workflow import Workflow
+from .workflowcall import WorkflowConditional, WorkflowDeclaration, WorkflowScatter
+
+_RANGE_LITERAL = re.compile(r"^\s*range\(\s*(\d+)\s*\)\s*$")
+_MEMORY = re.compile(r"^\s*([\d.]+)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+_MEMORY_UNITS_IN_GB = {"": 1 / 1024 ** 3, "K": 1 / 1024 ** 2, "M": 1 / 1024, "G": 1, "T": 1024}
+
+
+@dataclass
+class TaskEstimate:
+    """
+    How long a call takes (in seconds), and the cores / memory (in GB) it occupies.
+    cpu and memory left as None are read from the task's runtime / requirements.
+    """
+
+    duration: float
+    cpu: Optional[float] = None
+    memory: Optional[float] = None
+
+
+@dataclass
+class SimulationReport:
+    makespan: float
+    jobs: int
+    peak_concurrency: int
+    cpu_utilisation: float
+    memory_utilisation: float
+    # the chain of jobs (eg: "align[3]") that determined the makespan, in order
+    critical_path: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Job:
+    name: str
+    item: object
+    scatters: Tuple
+    shard: Tuple[int, ...]
+    references: set
+    duration: float = 0
+    cpu: float = 0
+    memory: float = 0
+    dependencies: List[int] = field(default_factory=list)
+
+
+def _parse_number(value) -> Optional[float]:
+    try:
+        return float(str(value).strip().strip("\"'"))
+    except ValueError:
+        return None
+
+
+def _parse_memory(value) -> Optional[float]:
+    match = _MEMORY.match(str(value).strip().strip("\"'"))
+    if not match:
+        return None
+    return float(match.group(1)) * _MEMORY_UNITS_IN_GB[match.group(2).upper()]
+
+
+def get_task_resources(task: Task) -> Tuple[Optional[float], Optional[float]]:
+    """
+    The (cpu, memory in GB) of a task from its runtime and requirements,
+    None where they're missing or an expression that can't be evaluated offline.
+    """
+    kwargs = {}
+    if task.runtime:
+        kwargs.update(task.runtime.kwargs)
+    if getattr(task, "requirements", None):
+        kwargs.update(task.requirements.kwargs)
+    cpu = _parse_number(kwargs["cpu"]) if "cpu" in kwargs else None
+    memory = _parse_memory(kwargs["memory"]) if "memory" in kwargs else None
+    return cpu, memory
+
+
+def simulate(
+    workflow: Workflow,
+    cores: float,
+    memory: float = float("inf"),
+    tasks: Iterable[Task] = (),
+    estimates: Optional[Mapping[str, TaskEstimate]] = None,
+    scatter_cardinality: Union[int, Mapping[str, int]] = 10,
+    conditional_probability: Union[float, Mapping[str, float]] = 0.5,
+    default_estimate: TaskEstimate = TaskEstimate(duration=60, cpu=1, memory=0),
+    seed: Optional[int] = 0,
+) -> SimulationReport:
+    """
+    Simulates running the workflow on a machine (or cluster) of 'cores' cores and
+    'memory' GB of memory.
+
+    :param tasks: the tasks the workflow calls, for their runtime cpu / memory
+    :param estimates: by call name (alias) or task name
+    :param scatter_cardinality: shards per scatter, by scatter identifier or expression,
+        defaulting to 10. Scatters over range(<literal>) use the literal.
+    :param conditional_probability: chance each conditional runs, by condition
+    :param seed: for which conditionals run, so reruns give the same report
+    """
+    estimates = estimates or {}
+    resources = {t.name: get_task_resources(t) for t in tasks}
+    rng = random.Random(seed)
+
+    def cardinality(scatter: WorkflowScatter) -> int:
+        match = _RANGE_LITERAL.match(scatter.expression)
+        if match:
+            return int(match.group(1))
+        if isinstance(scatter_cardinality, int):
+            return scatter_cardinality
+        for key in (scatter.identifier, scatter.expression.strip()):
+            if key in scatter_cardinality:
+                return scatter_cardinality[key]
+        return 10
+
+    def probability(conditional: WorkflowConditional) -> float:
+        if isinstance(conditional_probability, (int, float)):
+            return conditional_probability
+        return conditional_probability.get(conditional.condition.strip(), 0.5)
+
+    jobs: List[_Job] = []
+
+    def expand(items, scatters: Tuple, shard: Tuple[int, ...], references: frozenset):
+        for item in items:
+            if isinstance(item, WorkflowScatter):
+                inner = references | get_block_references(item)
+                for i in range(cardinality(item)):
+                    expand(item.calls, (*scatters, item), (*shard, i), inner)
+            elif isinstance(item, WorkflowConditional):
+                if rng.random() < probability(item):
+                    expand(item.calls, scatters, shard, references | get_block_references(item))
+            else:
+                name = item.name + "".join(f"[{i}]" for i in shard)
+                jobs.append(
+                    _Job(name, item, scatters, shard, set(references | get_item_references(item)))
+                )
+
+    expand(workflow.calls, (), (), frozenset())
+
+    for job in jobs:
+        if isinstance(job.item, WorkflowDeclaration):
+            # evaluated by the engine, takes no time or resources
+            continue
+        task_name = job.item.namespaced_identifier.split(".")[-1]
+        estimate = estimates.get(job.item.name) or estimates.get(task_name) or default_estimate
+        runtime_cpu, runtime_memory = resources.get(task_name, (None, None))
+        job.duration = estimate.duration
+        job.cpu = next(
+            v for v in (estimate.cpu, runtime_cpu, default_estimate.cpu, 1) if v is not None
+        )
+        job.memory = next(
+            v
+            for v in (estimate.memory, runtime_memory, default_estimate.memory, 0)
+            if v is not None
+        )
+        if job.cpu > cores or job.memory > memory:
+            raise Exception(
+                f"Couldn't simulate workflow '{workflow.name}', '{job.name}' requires "
+                f"{job.cpu} cores and {job.memory}GB, more than the {cores} cores and {memory}GB available"
+            )
+
+    _resolve_dependencies(jobs)
+    return _schedule(jobs, cores, memory)
+
+
+def _resolve_dependencies(jobs: List[_Job]):
+    """
+    A job depends on the instances of each call it references that share its
+    shard of every scatter they're both in, ie: the same shard of a sibling call,
+    or every shard of a call in a scatter it isn't in (a gather).
+    """
+    by_name: Dict[str, List[int]] = {}
+    for index, job in enumerate(jobs):
+        by_name.setdefault(job.item.name, []).append(index)
+
+    groups: Dict[Tuple[str, int], Dict[Tuple[int, ...], List[int]]] = {}
+    for index, job in enumerate(jobs):
+        for name in job.references:
+            instances = by_name.get(name)
+            if not instances or name == job.item.name:
+                # a workflow input, scatter identifier, or a call that didn't run
+                continue
+            their_scatters = jobs[instances[0]].scatters
+            common = 0
+            while (
+                common < min(len(job.scatters), len(their_scatters))
+                and job.scatters[common] is their_scatters[common]
+            ):
+                common += 1
+            group = groups.get((name, common))
+            if group is None:
+                group = groups[(name, common)] = {}
+                for i in instances:
+                    group.setdefault(jobs[i].shard[:common], []).append(i)
+            job.dependencies.extend(group.get(job.shard[:common], []))
+
+
+def _schedule(jobs: List[_Job], cores: float, memory: float) -> SimulationReport:
+    remaining = [len(job.dependencies) for job in jobs]
+    dependents: List[List[int]] = [[] for _ in jobs]
+    for index, job in enumerate(jobs):
+        for d in job.dependencies:
+            dependents[d].append(index)
+
+    finish = [0.0] * len(jobs)
+    # the dependency that finished last, ie: the one the job was waiting on
+    waited_on: List[Optional[int]] = [None] * len(jobs)
+    running: List[Tuple[float, int]] = []
+    resource_jobs = [j for j in jobs if j.cpu or j.memory]
+    min_cpu = min((j.cpu for j in resource_jobs), default=0)
+    min_memory = min((j.memory for j in resource_jobs), default=0)
+
+    now, free_cpu, free_memory = 0.0, cores, memory
+    peak, concurrency, busy_cpu, busy_memory = 0, 0, 0.0, 0.0
+    ready = deque()
+
+    def make_ready(i: int):
+        if jobs[i].cpu or jobs[i].memory:
+            ready.append(i)
+        else:
+            # eg: a declaration, doesn't wait for resources
+            heapq.heappush(running, (now + jobs[i].duration, i))
+
+    for i, r in enumerate(remaining):
+        if r == 0:
+            make_ready(i)
+
+    while ready or running:
+        # start everything that fits, in the order it became ready
+        waiting = deque()
+        while ready:
+            if free_cpu < min_cpu or free_memory < min_memory:
+                waiting.extend(ready)
+                break
+            i = ready.popleft()
+            job = jobs[i]
+            if job.cpu > free_cpu or job.memory > free_memory:
+                waiting.append(i)
+                continue
+            free_cpu -= job.cpu
+            free_memory -= job.memory
+            busy_cpu += job.cpu * job.duration
+            busy_memory += job.memory * job.duration
+            concurrency += 1
+            heapq.heappush(running, (now + job.duration, i))
+        ready = waiting
+        peak = max(peak, concurrency)
+
+        now, i = heapq.heappop(running)
+        finished = [i]
+        while running and running[0][0] == now:
+            finished.append(heapq.heappop(running)[1])
+        for i in finished:
+            finish[i] = now
+            if jobs[i].cpu or jobs[i].memory:
+                concurrency -= 1
+                free_cpu += jobs[i].cpu
+                free_memory += jobs[i].memory
+            for d in dependents[i]:
+                remaining[d] -= 1
+                if remaining[d] == 0:
+                    waited_on[d] = i
+                    make_ready(d)
+
+    critical_path = []
+    if jobs:
+        current = max(range(len(jobs)), key=lambda i: finish[i])
+        while current is not None:
+            if not isinstance(jobs[current].item, WorkflowDeclaration):
+                critical_path.append(jobs[current].name)
+            current = waited_on[current]
+        critical_path.reverse()
+
+    makespan = max(finish, default=0.0)
+    return SimulationReport(
+        makespan=makespan,
+        jobs=sum(1 for j in jobs if not isinstance(j.item, WorkflowDeclaration)),
+        peak_concurrency=peak,
+        cpu_utilisation=busy_cpu / (cores * makespan) if makespan else 0.0,
+        memory_utilisation=busy_memory / (memory * makespan)
+        if makespan and memory != float("inf")
+        else 0.0,
+        critical_path=critical_path,
+    )
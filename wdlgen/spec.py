@@ -0,0 +1,267 @@
+"""
+A declarative spec of tasks and workflows, as JSON or TOML, eg:
+
+{
+  "version": "1.0",
+  "structs": {"Sample": {"name": "String", "bam": "File"}},
+  "tasks": [{
+    "name": "hello",
+    "inputs": [{"name": "greeting", "type": "String", "default": "hi"}],
+    "outputs": [{"name": "out", "type": "File", "expression": "stdout()"}],
+    "command": {"base": "echo", "inputs": [{"name": "greeting", "prefix": "-g"}]},
+    "runtime": {"docker": "\"ubuntu:20.04\""}
+  }],
+  "workflows": [{
+    "name": "wf",
+    "inputs": [{"name": "items", "type": "Array[String]"}],
+    "calls": [{"scatter": "i", "in": "items", "body": [
+      {"call": "hello.hello", "inputs": {"greeting": "i"}}
+    ]}],
+    "outputs": [{"name": "outs", "type": "Array[File]", "expression": "hello.out"}]
+  }]
+}
+
+Workflows import every task in the spec (as tools/{name}.wdl, aliased by name)
+unless they list their own "imports".
+"""
+
+import json
+import re
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple
+
+from .common import Input, Output
+from .export import LocalFileSink, get_bundle_paths
+from .task import Task
+from .types import StructType, WdlType, struct_scope
+from .util import Meta, ParameterMeta, encode_wdl_literal
+from .workflow import Workflow
+from .workflowcall import (
+    WorkflowCall,
+    WorkflowCallBase,
+    WorkflowConditional,
+    WorkflowScatter,
+)
+
+_WORD = re.compile(r"\w+")
+
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise Exception(
+                f"Couldn't load '{path}', reading TOML specs requires python 3.11+ or 'tomli'"
+            )
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _compile_input(d: Dict[str, Any]) -> Input:
+    data_type = WdlType.parse_type(d["type"])
+    hints = {
+        k: d[k] for k in ("localization_optional", "streamable") if k in d
+    }
+    if "expression" in d:
+        return Input(data_type, d["name"], d["expression"], requires_quotes=False, **hints)
+    if "default" in d:
+        return Input(
+            data_type,
+            d["name"],
+            encode_wdl_literal(d["default"]),
+            requires_quotes=False,
+            **hints,
+        )
+    return Input(data_type, d["name"], **hints)
+
+
+def _compile_output(d: Dict[str, Any]) -> Output:
+    return Output(WdlType.parse_type(d["type"]), d["name"], d.get("expression"))
+
+
+def _compile_command(command) -> Task.Command:
+    if isinstance(command, str):
+        return Task.Command(command)
+
+    inputs = [
+        Task.Command.CommandInput.from_fields(**ci) for ci in command.get("inputs", [])
+    ]
+    arguments = [
+        Task.Command.CommandArgument.from_fields(**ca)
+        for ca in command.get("arguments", [])
+    ]
+    return Task.Command(command.get("base"), inputs=inputs, arguments=arguments)
+
+
+def compile_task(d: Dict[str, Any], version: str = "draft-2") -> Task:
+    return Task(
+        d["name"],
+        inputs=[_compile_input(i) for i in d.get("inputs", [])],
+        outputs=[_compile_output(o) for o in d.get("outputs", [])],
+        command=_compile_command(d["command"]) if d.get("command") else None,
+        runtime=Task.Runtime(**d["runtime"]) if d.get("runtime") else None,
+        requirements=Task.Requirements(**d["requirements"])
+        if d.get("requirements")
+        else None,
+        hints=Task.Hints(**d["hints"]) if d.get("hints") else None,
+        version=d.get("version", version),
+        meta=Meta(**d["meta"]) if d.get("meta") else None,
+        parameter_meta=ParameterMeta(**d["parameter_meta"])
+        if d.get("parameter_meta")
+        else None,
+    )
+
+
+def _compile_call(d: Dict[str, Any]) -> WorkflowCallBase:
+    if "scatter" in d and ("zip" in d or "cross" in d):
+        # eg: {"scatter": "sample", "zip": [{"name": "bam", "type": "File", "in": "bams"}, ...]}
+        function = "zip" if "zip" in d else "cross"
+        arrays = [(a["type"], a["name"], a["in"]) for a in d[function]]
+        calls = [_compile_call(c) for c in d.get("body", [])]
+        return getattr(WorkflowScatter, function)(d["scatter"], arrays, calls)
+    if "scatter" in d:
+        return WorkflowScatter(
+            d["scatter"], d["in"], [_compile_call(c) for c in d.get("body", [])]
+        )
+    if "if" in d:
+        return WorkflowConditional(d["if"], [_compile_call(c) for c in d.get("body", [])])
+    if "call" in d:
+        inputs_details = {
+            tag: (v if isinstance(v, dict) else {"value": v})
+            for tag, v in d.get("inputs", {}).items()
+        }
+        return WorkflowCall(
+            d["call"],
+            alias=d.get("alias"),
+            inputs_details=inputs_details,
+            messages=d.get("messages"),
+        )
+    raise Exception(
+        f"Couldn't compile workflow call {d}, expected one of 'call', 'scatter' or 'if'"
+    )
+
+
+def compile_workflow(
+    d: Dict[str, Any], tasks: List[Task] = (), version: str = "draft-2"
+) -> Workflow:
+    if "imports" in d:
+        imports = [
+            Workflow.WorkflowImport(i["name"], i.get("alias"), i.get("tools_dir", "tools/"))
+            for i in d["imports"]
+        ]
+    else:
+        imports = [Workflow.WorkflowImport(t.name, t.name) for t in tasks]
+
+    return Workflow(
+        d["name"],
+        inputs=[_compile_input(i) for i in d.get("inputs", [])],
+        outputs=[_compile_output(o) for o in d.get("outputs", [])],
+        calls=[_compile_call(c) for c in d.get("calls", [])],
+        imports=imports,
+        version=d.get("version", version),
+        meta=Meta(**d["meta"]) if d.get("meta") else None,
+        parameter_meta=ParameterMeta(**d["parameter_meta"])
+        if d.get("parameter_meta")
+        else None,
+    )
+
+
+def compile_spec(
+    spec: Dict[str, Any], task_cache: Optional[MutableMapping[str, Task]] = None
+) -> Tuple[List[Workflow], List[Task]]:
+    """
+    :param task_cache: compiled tasks by their (JSON) spec, to share tasks between specs
+    """
+    structs = []
+    for name, members in spec.get("structs", {}).items():
+        # a struct can use the structs defined before it
+        with struct_scope(*structs):
+            structs.append(StructType(name, members))
+
+    with struct_scope(*structs):
+        return _compile_spec(spec, structs, task_cache)
+
+
+def _referenced_struct_definitions(d: Dict[str, Any], structs: List[StructType]) -> List[str]:
+    """
+    The definitions of the structs a (task) spec might use, including the structs
+    those use, so tasks are only shared between specs that define them the same way.
+    """
+    by_name = {s.name: s for s in structs}
+    definitions = {}
+    pending = set(_WORD.findall(json.dumps(d)))
+    while pending:
+        name = pending.pop()
+        if name in by_name and name not in definitions:
+            definitions[name] = by_name[name].get_definition()
+            pending.update(_WORD.findall(definitions[name]))
+    return [definitions[name] for name in sorted(definitions)]
+
+
+def _compile_spec(
+    spec: Dict[str, Any],
+    structs: List[StructType],
+    task_cache: Optional[MutableMapping[str, Task]],
+) -> Tuple[List[Workflow], List[Task]]:
+    version = spec.get("version", "draft-2")
+    tasks = []
+    for t in spec.get("tasks", []):
+        if task_cache is None:
+            tasks.append(compile_task(t, version))
+            continue
+        key = json.dumps(
+            [t, version, _referenced_struct_definitions(t, structs)], sort_keys=True
+        )
+        task = task_cache.get(key)
+        if task is None:
+            task = task_cache[key] = compile_task(t, version)
+        tasks.append(task)
+
+    workflows = [compile_workflow(w, tasks, version) for w in spec.get("workflows", [])]
+    return workflows, tasks
+
+
+def render_spec_bundle(
+    spec: Dict[str, Any],
+    tools_dir: str = "tools/",
+    compact: bool = False,
+    task_cache: Optional[MutableMapping[str, Task]] = None,
+) -> Dict[str, str]:
+    """
+    Compiles the spec, and renders each workflow (at the root of the bundle)
+    and task (in the tools_dir).
+
+    :return: path within the bundle -> rendered WDL
+    """
+    workflows, tasks = compile_spec(spec, task_cache=task_cache)
+    paths = get_bundle_paths(tasks=tasks, tools_dir=tools_dir)
+    paths.extend((f"{w.name}.wdl", w) for w in workflows)
+    return {path: node.get_string(compact=compact) for path, node in paths}
+
+
+def write_bundle_files(files: Dict[str, str], directory: str) -> List[str]:
+    sink = LocalFileSink(directory)
+    for path, content in files.items():
+        sink.write_sync(path, content)
+    return list(files)
+
+
+def write_spec_bundle(
+    spec: Dict[str, Any], directory: str, tools_dir: str = "tools/", compact: bool = False
+) -> List[str]:
+    """
+    Compiles the spec, and writes the bundle to the directory,
+    returning the paths written relative to the directory.
+    """
+    return write_bundle_files(
+        render_spec_bundle(spec, tools_dir=tools_dir, compact=compact), directory
+    )
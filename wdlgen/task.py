@@ -1,7 +1,56 @@
-from typing import List, Optional
+import logging
+from typing import Any, Dict, List, Optional, Tuple
 
 from .common import Input, Output
-from .util import WdlBase, KvClass, Meta, ParameterMeta
+from .types import get_struct_definitions
+from .util import (
+    WdlBase,
+    KvClass,
+    Meta,
+    ParameterMeta,
+    is_canonical_rendering,
+    clone_with_input_defaults,
+    encode_wdl_literal,
+    externalise_input_literals,
+    is_version_at_least,
+)
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _validate_fields(cls, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Checks the keys and value types of a Task.Requirements / Task.Hints,
+    and returns them keyed by their WDL names.
+    """
+    validated = {}
+    for k, v in kwargs.items():
+        if v is None:
+            continue
+        if k not in cls.fields:
+            raise Exception(
+                f"Couldn't create {cls.__qualname__}, unrecognised key '{k}' "
+                f"(expected one of: {', '.join(cls.fields)})"
+            )
+        wdl_key, types = cls.fields[k]
+        if not isinstance(v, types) or (isinstance(v, bool) and bool not in types):
+            raise Exception(
+                f"Couldn't create {cls.__qualname__}, '{k}' must be one of: "
+                + ", ".join(t.__name__ for t in types)
+                + f" (got {type(v).__name__})"
+            )
+        validated[wdl_key] = v
+    return validated
+
+
+def _encode_values(kwargs: Dict[str, Any], skip=()) -> Dict[str, str]:
+    # strings are already WDL expressions
+    return {
+        k: v if isinstance(v, str) else encode_wdl_literal(v)
+        for k, v in kwargs.items()
+        if k not in skip and v is not None
+    }
 
 
 class Task(WdlBase):
@@ -40,6 +89,97 @@ class Task(WdlBase):
         def add_gcp_boot_disk(self, disk_size_gb: int):
             self.kwargs["bootDiskSizeGb"] = int(disk_size_gb)
 
+    class Requirements(KvClass):
+        """
+        The resources a task requires, rendered as the 'requirements' section from
+        WDL 1.2, and merged into the 'runtime' section before that.
+
+        Strings are WDL expressions (as with Runtime, so string literals need quotes),
+        other python values are encoded as literals, eg: Requirements(cpu=4, memory='"8 GiB"')
+        """
+
+        # python name -> WDL key, and the python types each accepts
+        fields = {
+            "container": ("container", (str, list)),
+            "cpu": ("cpu", (int, float, str)),
+            "memory": ("memory", (int, str)),
+            "gpu": ("gpu", (bool, str)),
+            "fpga": ("fpga", (bool, str)),
+            "disks": ("disks", (int, str, list)),
+            "max_retries": ("maxRetries", (int, str)),
+            "return_codes": ("returnCodes", (int, str, list)),
+        }
+
+        def __init__(self, **kwargs):
+            super().__init__(**_validate_fields(type(self), kwargs))
+
+        def get_string(self, indent=0):
+            return KvClass(**_encode_values(self.kwargs)).get_string(indent=indent)
+
+    class Hints(KvClass):
+        """
+        Hints an engine may use to schedule the task, eg: Hints(max_cpu=16, short_task=True).
+        Rendered into the 'runtime' section in WDL 1.1, as the 'hints' section from 1.2,
+        and dropped with a warning for earlier versions.
+
+        :param inputs: input name -> hint name -> value, merged with the localisation
+            hints of the task's inputs, see Input.localization_optional
+        :param outputs: output name -> hint name -> value
+        """
+
+        fields = {
+            "max_cpu": ("maxCpu", (int, float, str)),
+            "max_memory": ("maxMemory", (int, str)),
+            "short_task": ("shortTask", (bool, str)),
+            "localization_optional": ("localizationOptional", (bool, str)),
+            "inputs": ("inputs", (dict,)),
+            "outputs": ("outputs", (dict,)),
+        }
+
+        def __init__(self, **kwargs):
+            super().__init__(**_validate_fields(type(self), kwargs))
+
+        def get_string(self, indent=0):
+            tb = "  "
+            lines = []
+            for k, v in sorted(_encode_values(self.kwargs, skip=("inputs", "outputs")).items()):
+                lines.append(indent * tb + f"{k}: {v}")
+            for key, kind in (("inputs", "input"), ("outputs", "output")):
+                declarations = self.kwargs.get(key)
+                if not declarations:
+                    continue
+                lines.append(indent * tb + f"{key}: {kind} {{")
+                if is_canonical_rendering():
+                    declarations = dict(sorted(declarations.items()))
+                for name, hints in declarations.items():
+                    lines.append((indent + 1) * tb + f"{name}: hints {{")
+                    lines.extend(
+                        (indent + 2) * tb + f"{k}: {v}"
+                        for k, v in _encode_values(hints).items()
+                    )
+                    lines.append((indent + 1) * tb + "}")
+                lines.append(indent * tb + "}")
+            return "\n".join(lines)
+
+        def get_runtime_kwargs(self) -> Dict[str, str]:
+            """
+            The hints as WDL 1.1 runtime attributes, where the input and output hints are
+            objects, eg: inputs: object { bam: object { localizationOptional: true } }
+            """
+            kwargs = _encode_values(self.kwargs, skip=("inputs", "outputs"))
+            for key in ("inputs", "outputs"):
+                declarations = self.kwargs.get(key)
+                if not declarations:
+                    continue
+                if is_canonical_rendering():
+                    declarations = dict(sorted(declarations.items()))
+                entries = []
+                for name, hints in declarations.items():
+                    values = ", ".join(f"{k}: {v}" for k, v in _encode_values(hints).items())
+                    entries.append(f"{name}: object {{ {values} }}")
+                kwargs[key] = f"object {{ {', '.join(entries)} }}"
+            return kwargs
+
     class Command(WdlBase):
         """
         Past the regular attributes, I've built the command generation here, because that's where
@@ -101,7 +241,18 @@ class Task(WdlBase):
                 separator=None,
                 true=None,
                 false=None,
-                separate_arrays=None):
+                separate_arrays=None,
+                argument_file: str = None,
+                argument_file_prefix: str = None,
+                argument_file_threshold: int = None):
+                """
+                :param argument_file: 'lines' or 'json', pass an array as a file (from write_lines /
+                    write_json) rather than on the command line, for arrays too large for ARG_MAX
+                :param argument_file_prefix: precedes the argument file's path, defaults to prefix
+                :param argument_file_threshold: only arrays with more elements than this use the
+                    argument file (decided at runtime), smaller arrays are expanded as per
+                    separate_arrays or separator. None to always use the argument file.
+                """
 
                 name, array_sep, default, true, false = (
                     name,
@@ -114,6 +265,20 @@ class Task(WdlBase):
                 pr = prefix if prefix else ""
                 bc = pr + (" " if separate_value_from_prefix and prefix else "")
 
+                if argument_file:
+                    return Task.Command.CommandInput._argument_file_input(
+                        name,
+                        optional,
+                        bc,
+                        position,
+                        argument_file,
+                        argument_file_prefix if argument_file_prefix is not None else pr,
+                        separate_value_from_prefix,
+                        argument_file_threshold,
+                        separator,
+                        separate_arrays,
+                    )
+
                 if separate_arrays:
                     if separate_arrays or default or true or false:
                         print(
@@ -161,6 +326,47 @@ class Task(WdlBase):
                 else:
                     return Task.Command.CommandInput(bc + f"~{{{value}}}", position=position)
 
+            @staticmethod
+            def _argument_file_input(
+                name,
+                optional,
+                bc,
+                position,
+                argument_file,
+                file_prefix,
+                separate_value_from_prefix,
+                threshold,
+                separator,
+                separate_arrays,
+            ):
+                if argument_file not in ("lines", "json"):
+                    raise Exception(
+                        f"Couldn't generate an argument file for '{name}', "
+                        f"expected 'lines' or 'json', got '{argument_file}'"
+                    )
+                # length / write_lines etc require a non-optional array
+                array = f"select_first([{name}, []])" if optional else name
+                fbc = file_prefix + (" " if separate_value_from_prefix and file_prefix else "")
+                value = f"write_{argument_file}({array})"
+                if fbc:
+                    value = f'"{fbc}" + {value}'
+
+                if threshold is not None:
+                    if separate_arrays:
+                        inline = f'sep(" ", prefix("{bc}", {array}))'
+                    elif separator:
+                        inline = f'"{bc}" + sep("{separator}", {array})'
+                    else:
+                        raise Exception(
+                            f"Couldn't generate an argument_file_threshold for '{name}', "
+                            "smaller arrays need either separate_arrays or a separator"
+                        )
+                    value = f"if length({array}) > {threshold} then {value} else {inline}"
+
+                if optional:
+                    value = f'if length({array}) > 0 then ({value}) else ""'
+                return Task.Command.CommandInput(f"~{{{value}}}", position=position)
+
         def __init__(
             self,
             command,
@@ -203,12 +409,16 @@ class Task(WdlBase):
         version="draft-2",
         meta: Meta = None,
         parameter_meta: ParameterMeta = None,
+        requirements: Requirements = None,
+        hints: Hints = None,
     ):
         self.name = name
         self.inputs = inputs if inputs else []
         self.outputs = outputs if outputs else []
         self.command = command
         self.runtime = runtime
+        self.requirements = requirements
+        self.hints = hints
         self.version = version
 
         self.meta = meta
@@ -217,21 +427,164 @@ class Task(WdlBase):
         self.format = """
 version {version}
 
-task {name} {{
+{structs_block}task {name} {{
 {blocks}
 }}
         """.strip()
 
-    def get_string(self):
+    def clone(self, input_defaults: Optional[Dict[str, Any]] = None, **overrides):
+        """
+        See WdlBase.clone, eg: task.clone(runtime={"memory": '"8G"'}, input_defaults={"threads": 4})
+
+        :param input_defaults: input name -> new expression, only these inputs are copied
+        """
+        return clone_with_input_defaults(super().clone(**overrides), input_defaults)
+
+    def externalise_literals(
+        self, min_length: int = 1024, optional: bool = False
+    ) -> Tuple["Task", Dict[str, Any]]:
+        """
+        See Workflow.externalise_literals, the inputs JSON is keyed by "{task}.{input}"
+        """
+        return externalise_input_literals(self, min_length, optional)
+
+    def get_input_hints(self, inputs: List[Input]) -> Dict[str, Dict[str, bool]]:
+        """
+        The localisation hints of each input (that has any), named as the task's
+        version expects: parameter_meta keys before 1.1, hints afterwards.
+        """
+        if is_version_at_least(self.version, "1.1"):
+            localization_optional, streamable = "localizationOptional", "streamable"
+        else:
+            localization_optional, streamable = "localization_optional", "stream"
+
+        hints = {}
+        for i in inputs:
+            h = {}
+            if i.localization_optional:
+                h[localization_optional] = True
+            if i.streamable:
+                h[streamable] = True
+            if h:
+                hints[i.name] = h
+        return hints
+
+    @staticmethod
+    def get_param_meta_with_hints(
+        param_meta: Optional[ParameterMeta], input_hints: Dict[str, Dict[str, bool]]
+    ) -> ParameterMeta:
+        """
+        A copy of the parameter_meta with the input hints merged into each input's entry,
+        leaving the original (and its attributes) unchanged.
+        """
+        kwargs = dict(param_meta.kwargs) if param_meta else {}
+        for name, hints in input_hints.items():
+            existing = kwargs.get(name)
+            if isinstance(existing, ParameterMeta.ParamMetaAttribute):
+                kwargs[name] = existing.clone(kwargs={**existing.kwargs, **hints})
+            elif isinstance(existing, dict):
+                kwargs[name] = {**existing, **hints}
+            elif existing is not None:
+                # eg: a description string
+                kwargs[name] = ParameterMeta.ParamMetaAttribute(help=existing, **hints)
+            else:
+                kwargs[name] = ParameterMeta.ParamMetaAttribute(**hints)
+        return ParameterMeta(**kwargs)
+
+    def get_hints(self, input_hints: Dict[str, Dict[str, bool]]) -> Optional[Hints]:
+        """
+        The task's hints (WDL 1.1+), with the localisation hints of its inputs merged in,
+        and from WDL 1.2 the runtime's keys that aren't requirements.
+        """
+        kwargs = {}
+        if is_version_at_least(self.version, "1.2"):
+            kwargs.update(self._split_runtime()[1])
+        if self.hints:
+            kwargs.update(self.hints.kwargs)
+        if input_hints:
+            inputs = dict(kwargs.get("inputs") or {})
+            for name, hints in input_hints.items():
+                inputs[name] = {**inputs.get(name, {}), **hints}
+            kwargs["inputs"] = inputs
+        if not kwargs:
+            return None
+        if self.hints:
+            return self.hints.clone(kwargs=kwargs)
+        # the runtime's keys aren't hint fields, so can't go through Hints' validation
+        hints = Task.Hints()
+        hints.kwargs = kwargs
+        return hints
+
+    def _split_runtime(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        The runtime's (requirements, hints) for WDL 1.2, where the runtime section is
+        deprecated: its requirement keys (with docker as container) and the rest.
+        """
+        requirements, hints = {}, {}
+        requirement_keys = {wdl_key for wdl_key, _ in Task.Requirements.fields.values()}
+        for k, v in (self.runtime.kwargs if self.runtime else {}).items():
+            if v is None:
+                continue
+            if hasattr(v, "get_string"):
+                v = v.get_string()
+            if k == "docker":
+                k = "container"
+            if k in requirement_keys:
+                requirements[k] = v
+            else:
+                hints[k] = v
+        return requirements, hints
+
+    def get_requirements(self) -> Optional[KvClass]:
+        """
+        The requirements section (WDL 1.2+), with the requirement keys of the runtime merged in.
+        """
+        requirements = self._split_runtime()[0]
+        if self.requirements:
+            requirements.update(self.requirements.kwargs)
+        return KvClass(**_encode_values(requirements)) if requirements else None
+
+    def get_runtime(self, hints: Optional[Hints] = None) -> Optional[KvClass]:
+        """
+        The runtime section before WDL 1.2 (where it's replaced by the requirements and
+        hints sections), with the requirements merged in (where docker is the container
+        key before WDL 1.1), and in WDL 1.1 the hints.
+        """
+        if is_version_at_least(self.version, "1.2"):
+            return None
+        runtime_hints = {}
+        if hints and is_version_at_least(self.version, "1.1"):
+            runtime_hints = hints.get_runtime_kwargs()
+        if not self.requirements and not runtime_hints:
+            return self.runtime
+        runtime = dict(self.runtime.kwargs) if self.runtime else {}
+        requirements = _encode_values(self.requirements.kwargs) if self.requirements else {}
+        if "container" in requirements:
+            if is_version_at_least(self.version, "1.1"):
+                # docker is an alias of container, which the requirement replaces
+                runtime.pop("docker", None)
+            else:
+                requirements["docker"] = requirements.pop("container")
+        return KvClass(**{**runtime, **runtime_hints, **requirements})
+
+    def get_string(self, compact: bool = False):
+        """
+        :param compact: emit machine-consumed WDL, skipping the meta and parameter_meta
+            sections and the blank lines between sections.
+        """
         tb = "  "
 
         name = self.name
         blocks = []
+        inputs, outputs = self.inputs, self.outputs
+        if is_canonical_rendering():
+            inputs = sorted(inputs, key=lambda i: i.name)
+            outputs = sorted(outputs, key=lambda o: o.name)
 
-        if self.inputs:
+        if inputs:
             blocks.append(
                 f"{tb}input {{\n"
-                + "\n".join(2 * tb + i.get_string() for i in self.inputs)
+                + "\n".join(2 * tb + i.get_string() for i in inputs)
                 + f"\n{tb}}}\n"
             )
 
@@ -243,8 +596,11 @@ task {name} {{
                 com = self.command.get_string(indent=2)
             blocks.append("{tb}command <<<\n{args}\n{tb}>>>\n".format(tb=tb, args=com))
 
-        if self.runtime:
-            rt = self.runtime.get_string(indent=2)
+        input_hints = self.get_input_hints(inputs)
+        hints = self.get_hints(input_hints) if is_version_at_least(self.version, "1.1") else None
+        runtime = self.get_runtime(hints)
+        if runtime:
+            rt = runtime.get_string(indent=2)
             blocks.append(
                 "{tb}runtime {{\n{args}\n{tb}}}\n".format(
                     tb=tb,
@@ -252,7 +608,29 @@ task {name} {{
                 )
             )
 
-        if self.meta:
+        if is_version_at_least(self.version, "1.2"):
+            requirements = self.get_requirements()
+            if requirements:
+                blocks.append(
+                    "{tb}requirements {{\n{args}\n{tb}}}\n".format(
+                        tb=tb, args=requirements.get_string(indent=2)
+                    )
+                )
+            if hints:
+                blocks.append(
+                    "{tb}hints {{\n{args}\n{tb}}}\n".format(
+                        tb=tb, args=hints.get_string(indent=2)
+                    )
+                )
+        elif self.hints and not is_version_at_least(self.version, "1.1"):
+            _LOGGER.warning(
+                f"Dropping the hints of task '{self.name}', "
+                f"hints require WDL 1.1+ (not {self.version})"
+            )
+
+        hints_in_param_meta = input_hints and not is_version_at_least(self.version, "1.1")
+
+        if self.meta and not compact:
             mt = self.meta.get_string(indent=2)
             if mt:
                 blocks.append(
@@ -261,8 +639,13 @@ task {name} {{
                     )
                 )
 
-        if self.param_meta:
-            pmt = self.param_meta.get_string(indent=2)
+        param_meta = self.param_meta if not compact else None
+        if hints_in_param_meta:
+            # localisation hints affect how the task runs, so are kept when compact
+            param_meta = self.get_param_meta_with_hints(param_meta, input_hints)
+
+        if param_meta:
+            pmt = param_meta.get_string(indent=2)
             if pmt:
                 blocks.append(
                     "{tb}parameter_meta {{\n{args}\n{tb}}}\n".format(
@@ -271,14 +654,35 @@ task {name} {{
                     )
                 )
 
-        if self.outputs:
+        if outputs:
             blocks.append(
                 "{tb}output {{\n{outs}\n{tb}}}\n".format(
                     tb=tb,
-                    outs="\n".join((2 * tb) + o.get_string() for o in self.outputs),
+                    outs="\n".join((2 * tb) + o.get_string() for o in outputs),
                 )
             )
 
+        structs = [
+            s.get_definition()
+            for s in get_struct_definitions(
+                [*(i.type for i in inputs), *(o.type for o in outputs)]
+            )
+        ]
+
+        if compact:
+            return "\n".join(
+                [
+                    f"version {self.version}",
+                    *structs,
+                    f"task {name} {{",
+                    *(b.rstrip("\n") for b in blocks),
+                    "}",
+                ]
+            )
+
         return self.format.format(
-            name=name, blocks="\n".join(blocks), version=self.version
+            name=name,
+            blocks="\n".join(blocks),
+            version=self.version,
+            structs_block="".join(st + "\n\n" for st in structs),
         )
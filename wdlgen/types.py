@@ -1,6 +1,9 @@
 # Documentation: https://github.com/openwdl/wdl/blob/master/versions/draft-2/SPEC.md#types
 import logging
-from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
 
 logging.basicConfig(level=logging.INFO)
 _LOGGER = logging.getLogger(__name__)
@@ -85,7 +88,145 @@ class ArrayType:
         return ArrayType(t[6:-1], requires_multiple)
 
 
-# class CompoundTypes(ArrayType, PrimitiveType):
+def _split_type_arguments(t: str) -> List[str]:
+    """
+    Splits the arguments of a compound type on the top level commas,
+    eg: "Int, Pair[String, File]" -> ["Int", "Pair[String, File]"]
+    """
+    args = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(t):
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+        elif c == "," and depth == 0:
+            args.append(t[start:i].strip())
+            start = i + 1
+    args.append(t[start:].strip())
+    return args
+
+
+def _parse_compound_arguments(t: str, kind: str, nargs: int) -> Optional[List[str]]:
+    if not (t.startswith(kind + "[") and t.endswith("]")):
+        return None
+    args = _split_type_arguments(t[len(kind) + 1 : -1])
+    if len(args) != nargs or not all(args):
+        raise Exception(f"Expected {nargs} type arguments for '{t}'")
+    return args
+
+
+class PairType:
+
+    kPair = "Pair"
+
+    def __init__(self, left, right):
+        self._left: WdlType = WdlType.parse_type(left, requires_type=True)
+        self._right: WdlType = WdlType.parse_type(right, requires_type=True)
+
+    def get_string(self):
+        return "{kind}[{left}, {right}]".format(
+            kind=PairType.kPair,
+            left=self._left.get_string(),
+            right=self._right.get_string(),
+        )
+
+    @staticmethod
+    def parse(t: str):
+        args = _parse_compound_arguments(t, PairType.kPair, 2)
+        return PairType(*args) if args else None
+
+
+class MapType:
+
+    kMap = "Map"
+
+    def __init__(self, key, value):
+        self._key: WdlType = WdlType.parse_type(key, requires_type=True)
+        self._value: WdlType = WdlType.parse_type(value, requires_type=True)
+
+    def get_string(self):
+        return "{kind}[{key}, {value}]".format(
+            kind=MapType.kMap, key=self._key.get_string(), value=self._value.get_string()
+        )
+
+    @staticmethod
+    def parse(t: str):
+        args = _parse_compound_arguments(t, MapType.kMap, 2)
+        return MapType(*args) if args else None
+
+
+class StructType:
+    """
+    A WDL 1.0 struct, referenced by name. WdlType.parse_type only finds structs
+    by name within a struct_scope (eg: of one spec), and the definitions of
+    structs with members are emitted once in each Task / Workflow that uses them.
+    """
+
+    def __init__(self, name: str, members: Optional[Dict[str, Union["WdlType", str]]] = None):
+        self.name = name
+        self.members: Optional[Dict[str, WdlType]] = None
+        if members is not None:
+            self.members = {
+                k: WdlType.parse_type(v, requires_type=True) for k, v in members.items()
+            }
+
+    def get_string(self):
+        return self.name
+
+    def get_definition(self):
+        if self.members is None:
+            raise Exception(f"Can't define struct '{self.name}' without its members")
+        tb = "  "
+        members = "\n".join(
+            f"{tb}{t.get_string()} {k}" for k, t in self.members.items()
+        )
+        return f"struct {self.name} {{\n{members}\n}}"
+
+    @staticmethod
+    def parse(t: str):
+        struct = _struct_scope.get()[0].get(t)
+        if struct is None and _struct_references.get() and t.isidentifier():
+            return StructType(t)
+        return struct
+
+
+# The structs WdlType.parse_type resolves by name, see struct_scope(),
+# with a key identifying their definitions for the memoised type functions
+_struct_scope: ContextVar[Tuple[Dict[str, StructType], tuple]] = ContextVar(
+    "struct_scope", default=({}, ())
+)
+# Set while parsing types that are only compared by name (eg: for is_coercible),
+# where a struct outside the scope is parsed as a reference to it
+_struct_references: ContextVar[bool] = ContextVar("struct_references", default=False)
+
+
+@contextmanager
+def struct_scope(*structs: StructType):
+    """
+    Within this context, WdlType.parse_type resolves these structs (and those of any
+    enclosing scope) by name, eg: the structs of one spec or WDL document, so a struct
+    of the same name elsewhere isn't picked up, eg:
+
+        with struct_scope(StructType("Sample", {"name": "String"})):
+            WdlType.parse_type("Array[Sample]")
+    """
+    outer, _ = _struct_scope.get()
+    scope = dict(outer)
+    for struct in structs:
+        if struct.members is None:
+            raise Exception(f"Couldn't add struct '{struct.name}' to the scope without its members")
+        scope[struct.name] = struct
+    key = tuple(sorted((name, s.get_definition()) for name, s in scope.items()))
+    token = _struct_scope.set((scope, key))
+    try:
+        yield
+    finally:
+        _struct_scope.reset(token)
+
+
+_TYPE_CLASSES = (PrimitiveType, ArrayType, PairType, MapType, StructType)
 
 
 class WdlType:
@@ -96,16 +237,13 @@ class WdlType:
         "+",  # can only be applied to Array types, the array is required to have one or more values in it
     ]
 
-    types = [*PrimitiveType.types, ArrayType.kArray]
+    types = [*PrimitiveType.types, ArrayType.kArray, PairType.kPair, MapType.kMap]
 
     def __init__(self, type_obj, optional=False):
-        if not (
-            isinstance(type_obj, PrimitiveType)
-            or isinstance(type_obj, ArrayType)
-            or isinstance(type_obj, WdlType)
-        ):
+        if not isinstance(type_obj, (*_TYPE_CLASSES, WdlType)):
             raise Exception(
-                "Must initialise WdlType with PrimitiveType, ArrayType or WdlType"
+                "Must initialise WdlType with PrimitiveType, ArrayType, PairType, "
+                "MapType, StructType or WdlType"
             )
 
         self._type = type_obj
@@ -137,7 +275,7 @@ class WdlType:
 
         if isinstance(t, WdlType):
             return t
-        if isinstance(t, PrimitiveType) or isinstance(t, ArrayType):
+        if isinstance(t, _TYPE_CLASSES):
             return WdlType(t)
 
         if isinstance(t, str):
@@ -157,6 +295,11 @@ class WdlType:
             if parse_attempt2:
                 return WdlType(parse_attempt2, optional=optional_quantifier)
 
+            for compound in (PairType, MapType, StructType):
+                parse_attempt = compound.parse(t)
+                if parse_attempt:
+                    return WdlType(parse_attempt, optional=optional_quantifier)
+
         if requires_type:
             raise Exception("Couldn't pass '{t}'".format(t=t_orig))
 
@@ -190,3 +333,178 @@ Float = WdlType(PrimitiveType(PrimitiveType.kFloat))
 File = WdlType(PrimitiveType(PrimitiveType.kFile))
 String = WdlType(PrimitiveType(PrimitiveType.kString))
 Directory = WdlType(PrimitiveType(PrimitiveType.kDirectory))
+
+
+# Documentation: https://github.com/openwdl/wdl/blob/main/versions/1.0/SPEC.md#type-coercion
+_PRIMITIVE_COERCIONS = {
+    (PrimitiveType.kInt, PrimitiveType.kFloat),
+    (PrimitiveType.kString, PrimitiveType.kFile),
+    (PrimitiveType.kFile, PrimitiveType.kString),
+    (PrimitiveType.kString, PrimitiveType.kDirectory),
+    (PrimitiveType.kDirectory, PrimitiveType.kString),
+}
+
+
+def _intern_type(key: str) -> WdlType:
+    """
+    One parsed WdlType per type string (and struct scope), only used internally as they're mutable.
+    """
+    return _intern_scoped_type(key, _struct_scope.get()[1])
+
+
+@lru_cache(maxsize=None)
+def _intern_scoped_type(key: str, scope: tuple) -> WdlType:
+    # the key is the string of an already parsed type, or normalised in this scope
+    token = _struct_references.set(True)
+    try:
+        return WdlType.parse_type(key)
+    finally:
+        _struct_references.reset(token)
+
+
+@lru_cache(maxsize=4096)
+def _normalise_type_string(t: str, scope: tuple) -> str:
+    return WdlType.parse_type(t).get_string()
+
+
+def _type_key(t: Union[WdlType, str]) -> str:
+    if isinstance(t, str):
+        return _normalise_type_string(t, _struct_scope.get()[1])
+    key = t.get_string()
+    if isinstance(key, list):
+        raise Exception(
+            f"Can't check the compatibility of a type with multiple representations: {key}"
+        )
+    return key
+
+
+def _unwrap(t: WdlType):
+    """
+    :return: (PrimitiveType | ArrayType | PairType | MapType | StructType, optional)
+    """
+    optional = t.optional
+    inner = t._type
+    while isinstance(inner, WdlType):
+        optional = optional or inner.optional
+        inner = inner._type
+    return inner, optional
+
+
+def is_coercible(src: Union[WdlType, str], dst: Union[WdlType, str]) -> bool:
+    """
+    Whether a value of type 'src' can be passed where 'dst' is expected,
+    eg: File -> String, Array[File]+ -> Array[File], T -> T?, but not T? -> T.
+    Results are memoised on the type strings, so repeated checks are dictionary lookups.
+    """
+    return _is_coercible_key(_type_key(src), _type_key(dst))
+
+
+@lru_cache(maxsize=None)
+def _is_coercible_key(src: str, dst: str) -> bool:
+    if src == dst:
+        return True
+
+    s, s_optional = _unwrap(_intern_type(src))
+    d, d_optional = _unwrap(_intern_type(dst))
+    if s_optional and not d_optional:
+        return False
+
+    if isinstance(s, PrimitiveType) and isinstance(d, PrimitiveType):
+        st, dt = s.get_string(), d.get_string()
+        return st == dt or (st, dt) in _PRIMITIVE_COERCIONS
+
+    if isinstance(s, ArrayType) and isinstance(d, ArrayType):
+        if d._requires_multiple and not s._requires_multiple:
+            return False
+        return _is_coercible_key(_type_key(s._subtype), _type_key(d._subtype))
+
+    if isinstance(s, PairType) and isinstance(d, PairType):
+        return _is_coercible_key(
+            _type_key(s._left), _type_key(d._left)
+        ) and _is_coercible_key(_type_key(s._right), _type_key(d._right))
+
+    if isinstance(s, MapType) and isinstance(d, MapType):
+        return _is_coercible_key(
+            _type_key(s._key), _type_key(d._key)
+        ) and _is_coercible_key(_type_key(s._value), _type_key(d._value))
+
+    if isinstance(s, StructType) and isinstance(d, StructType):
+        return s.name == d.name
+
+    return False
+
+
+def unify(a: Union[WdlType, str], b: Union[WdlType, str]) -> Optional[WdlType]:
+    """
+    The most specific type that both 'a' and 'b' can be coerced to, or None if there isn't one,
+    eg: unify(Int, Float?) -> Float?, unify(Array[File]+, Array[File]) -> Array[File]
+    """
+    key = _unify_key(_type_key(a), _type_key(b))
+    return WdlType.parse_type(key) if key is not None else None
+
+
+@lru_cache(maxsize=None)
+def _unify_key(a: str, b: str) -> Optional[str]:
+    if _is_coercible_key(a, b):
+        return b
+    if _is_coercible_key(b, a):
+        return a
+
+    at, a_optional = _unwrap(_intern_type(a))
+    bt, b_optional = _unwrap(_intern_type(b))
+    optional = "?" if a_optional or b_optional else ""
+
+    if isinstance(at, ArrayType) and isinstance(bt, ArrayType):
+        subtype = _unify_key(_type_key(at._subtype), _type_key(bt._subtype))
+        if subtype is None:
+            return None
+        multiple = "+" if at._requires_multiple and bt._requires_multiple else ""
+        return f"{ArrayType.kArray}[{subtype}]{multiple}{optional}"
+
+    if optional:
+        # eg: String? and File, compare as both optional
+        a_opt = a if a_optional else a + "?"
+        b_opt = b if b_optional else b + "?"
+        if _is_coercible_key(a_opt, b_opt):
+            return b_opt
+        if _is_coercible_key(b_opt, a_opt):
+            return a_opt
+
+    return None
+
+
+def get_struct_definitions(types) -> List[StructType]:
+    """
+    The structs (with their members) used by any of the types, including structs used
+    within other structs, each once, and ordered so a struct comes after those it uses.
+    A struct referenced without its members is looked up in the current struct_scope.
+    """
+    structs: Dict[str, StructType] = {}
+
+    def visit(t):
+        if t is None:
+            return
+        if isinstance(t, list):
+            for tt in t:
+                visit(tt)
+        elif isinstance(t, WdlType):
+            visit(t._type)
+        elif isinstance(t, ArrayType):
+            visit(t._subtype)
+        elif isinstance(t, PairType):
+            visit(t._left)
+            visit(t._right)
+        elif isinstance(t, MapType):
+            visit(t._key)
+            visit(t._value)
+        elif isinstance(t, StructType) and t.name not in structs:
+            struct = t if t.members is not None else StructType.parse(t.name)
+            if struct is None:
+                return
+            for member in struct.members.values():
+                visit(member)
+            structs[struct.name] = struct
+
+    for t in types:
+        visit(t)
+    return list(structs.values())
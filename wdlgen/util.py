@@ -1,8 +1,150 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+import copy
+from functools import lru_cache
+import hashlib
 import json
+import re
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+# Set while rendering the canonical form of a node, see canonical_rendering()
+_canonical_rendering: ContextVar[bool] = ContextVar("canonical_rendering", default=False)
+
+
+@contextmanager
+def canonical_rendering():
+    """
+    Within this context, get_string() renders the canonical form of every node:
+    without comments or call messages, and with meta keys, call inputs and
+    declarations in a stable order, so logically identical models render to
+    identical bytes regardless of the order they were constructed in.
+    """
+    token = _canonical_rendering.set(True)
+    try:
+        yield
+    finally:
+        _canonical_rendering.reset(token)
+
+
+def is_canonical_rendering() -> bool:
+    return _canonical_rendering.get()
+
+
+# control characters without a shorter escape than \xHH (\n and \t are replaced first)
+_CONTROL_CHARACTER = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+
+# strings up to this length are memoised, so repeated values (eg: the same
+# sample name across many defaults) are only escaped once
+_MEMOISE_MAX_LENGTH = 256
+
+
+def _quote_string(val: str, escape_placeholders: bool = True) -> str:
+    # str.replace runs in C, much faster on large strings than a python level
+    # translate / re.sub callback, the regex only runs if there's a control character
+    escaped = val.replace("\\", "\\\\").replace('"', '\\"')
+    if not val.isprintable():
+        escaped = escaped.replace("\n", "\\n").replace("\t", "\\t")
+        escaped = _CONTROL_CHARACTER.sub(lambda m: f"\\x{ord(m.group()):02x}", escaped)
+    if escape_placeholders and "{" in escaped:
+        # otherwise the engine would interpolate the placeholder
+        escaped = escaped.replace("~{", "\\~{").replace("${", "\\${")
+    return f'"{escaped}"'
+
+
+@lru_cache(maxsize=8192)
+def _quote_string_memoised(val: str) -> str:
+    return _quote_string(val)
+
+
+def _encode_string(val: str) -> str:
+    if len(val) <= _MEMOISE_MAX_LENGTH:
+        return _quote_string_memoised(val)
+    return _quote_string(val)
+
+
+def _encode_float(val: float) -> str:
+    if val != val or val in (float("inf"), float("-inf")):
+        raise Exception(f"Couldn't encode {val} as a WDL literal, it isn't a finite number")
+    return repr(val)
+
+
+def _encode_array(val) -> str:
+    if all(type(v) is str for v in val):
+        return "[" + ", ".join(map(_encode_string, val)) + "]"
+    return "[" + ", ".join(map(encode_wdl_literal, val)) + "]"
+
+
+def _encode_pair(val: tuple) -> str:
+    if len(val) != 2:
+        raise Exception(
+            f"Couldn't encode a tuple of {len(val)} values as a WDL literal, only pairs are supported"
+        )
+    return f"({encode_wdl_literal(val[0])}, {encode_wdl_literal(val[1])})"
+
+
+def _encode_map(val: dict) -> str:
+    return (
+        "{"
+        + ", ".join(
+            f"{encode_wdl_literal(k)}: {encode_wdl_literal(v)}" for k, v in val.items()
+        )
+        + "}"
+    )
+
+
+# by exact type, bool before int for the isinstance fallback
+_LITERAL_ENCODERS = {
+    bool: lambda val: "true" if val else "false",
+    int: str,
+    float: _encode_float,
+    str: _encode_string,
+    list: _encode_array,
+    tuple: _encode_pair,
+    dict: _encode_map,
+    type(None): lambda val: "None",
+}
+
+
+def encode_wdl_literal(val) -> str:
+    """
+    Encodes a python value as a WDL literal expression: bools, numbers, strings,
+    lists as arrays, tuples as pairs, dicts as maps, nested to any depth, and
+    None as the WDL 1.1 None. Nodes with a get_string are rendered as is.
+    """
+    encoder = _LITERAL_ENCODERS.get(type(val))
+    if encoder is not None:
+        return encoder(val)
+    if hasattr(val, "get_string"):
+        return val.get_string()
+    # subclasses, eg: IntEnum, OrderedDict, namedtuple
+    for t, encoder in _LITERAL_ENCODERS.items():
+        if isinstance(val, t):
+            return encoder(val)
+    raise Exception(f"Couldn't encode value of type '{type(val).__name__}' as a WDL literal")
+
+
+def is_version_at_least(version: str, minimum: str) -> bool:
+    """
+    Compares WDL versions, eg: is_version_at_least("1.0", "1.1") is False.
+    draft versions come before 1.0, and development after every release.
+    """
+
+    def key(v: str):
+        if v == "development":
+            return (float("inf"),)
+        if v.startswith("draft-"):
+            return (0, int(v[len("draft-"):]))
+        return tuple(int(p) for p in v.split("."))
+
+    return key(version) >= key(minimum)
 
 
 def convert_python_value_to_wdl_literal(val) -> str:
+    """
+    Converts a python value to a meta (or parameter_meta) value,
+    see encode_wdl_literal for expressions.
+    """
     if val is None:
         # there is no NULL value yet
         return ""
@@ -14,21 +156,385 @@ def convert_python_value_to_wdl_literal(val) -> str:
     if isinstance(val, bool):
         return "true" if val else "false"
     if isinstance(val, str):
-        # sanitise string here
-        sanitised = val\
-            .replace("\\", "\\\\")\
-            .replace("\n", "\\n")\
-            .replace('"', '\\"')
-        return f'"{sanitised}"'
+        # meta strings aren't interpolated, so placeholders stay as they are
+        return _quote_string(val, escape_placeholders=False)
+    if isinstance(val, (list, tuple)):
+        return "[" + ", ".join(convert_python_value_to_wdl_literal(v) for v in val) + "]"
 
     return str(val)
 
 
+_LITERAL_NUMBER = re.compile(r"-?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+_STRING_UNESCAPES = {"n": "\n", "t": "\t", "r": "\r"}
+_STRING_SPECIAL = re.compile(r"[\\\"']|[~$]\{")
+
+
+class _LiteralParser:
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.pos = 0
+
+    def fail(self, reason: str):
+        raise Exception(
+            f"Couldn't parse '{self.expression[:50]}' as a WDL literal, {reason} at {self.pos}"
+        )
+
+    def skip_whitespace(self):
+        while self.pos < len(self.expression) and self.expression[self.pos].isspace():
+            self.pos += 1
+
+    def expect(self, c: str):
+        self.skip_whitespace()
+        if not self.expression.startswith(c, self.pos):
+            self.fail(f"expected '{c}'")
+        self.pos += len(c)
+
+    def parse_sequence(self, end: str, parse_item):
+        items = []
+        self.skip_whitespace()
+        if self.expression.startswith(end, self.pos):
+            self.pos += 1
+            return items
+        while True:
+            items.append(parse_item())
+            self.skip_whitespace()
+            if self.expression.startswith(end, self.pos):
+                self.pos += 1
+                return items
+            self.expect(",")
+
+    def parse_string(self, quote: str) -> str:
+        expression, chars = self.expression, []
+        pos = self.pos
+        while True:
+            # skips straight over (long) runs without escapes or placeholders
+            match = _STRING_SPECIAL.search(expression, pos)
+            if not match:
+                self.fail("unterminated string")
+            chars.append(expression[pos : match.start()])
+            c, pos = match.group(), match.end()
+            if c == quote:
+                self.pos = pos
+                return "".join(chars)
+            if c in ("~{", "${"):
+                self.pos = match.start()
+                self.fail("strings with placeholders aren't literals")
+            if c != "\\":
+                # the other quote character
+                chars.append(c)
+                continue
+            e = expression[pos : pos + 1]
+            if e == "x":
+                chars.append(chr(int(expression[pos + 1 : pos + 3], 16)))
+                pos += 3
+            elif e in ("u", "U"):
+                width = 4 if e == "u" else 8
+                chars.append(chr(int(expression[pos + 1 : pos + 1 + width], 16)))
+                pos += 1 + width
+            elif e.isdigit():
+                chars.append(chr(int(expression[pos : pos + 3], 8)))
+                pos += 3
+            else:
+                chars.append(_STRING_UNESCAPES.get(e, e))
+                pos += 1
+
+    def parse_value(self) -> Any:
+        self.skip_whitespace()
+        expression, pos = self.expression, self.pos
+        c = expression[pos : pos + 1]
+        if c in ('"', "'"):
+            self.pos += 1
+            return self.parse_string(c)
+        if c == "[":
+            self.pos += 1
+            return self.parse_sequence("]", self.parse_value)
+        if c == "{":
+            self.pos += 1
+            return dict(self.parse_sequence("}", self.parse_map_entry))
+        if c == "(":
+            self.pos += 1
+            left = self.parse_value()
+            self.expect(",")
+            right = self.parse_value()
+            self.expect(")")
+            return {"left": left, "right": right}
+        for keyword, value in (("true", True), ("false", False), ("None", None)):
+            if expression.startswith(keyword, pos) and not _is_identifier_char(
+                expression[pos + len(keyword) : pos + len(keyword) + 1] or " "
+            ):
+                self.pos += len(keyword)
+                return value
+        match = _LITERAL_NUMBER.match(expression, pos)
+        if match:
+            self.pos = match.end()
+            number = match.group()
+            return float(number) if any(c in number for c in ".eE") else int(number)
+        self.fail("expected a literal value")
+
+    def parse_map_entry(self) -> Tuple[Any, Any]:
+        key = self.parse_value()
+        if isinstance(key, (dict, list)):
+            self.fail("map keys must be primitive")
+        self.expect(":")
+        return str(key) if not isinstance(key, str) else key, self.parse_value()
+
+
+def parse_wdl_literal(expression: str) -> Any:
+    """
+    Parses a WDL literal expression to its value in an inputs JSON: strings, numbers,
+    bools, arrays, maps (as objects) and pairs (as {"left": .., "right": ..}).
+    Raises if the expression isn't a literal, eg: it references an identifier.
+    """
+    parser = _LiteralParser(expression)
+    value = parser.parse_value()
+    parser.skip_whitespace()
+    if parser.pos != len(expression):
+        parser.fail("unexpected trailing characters")
+    return value
+
+
+def _is_identifier_start(c: str) -> bool:
+    return c.isalpha() or c == "_"
+
+
+def _is_identifier_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+def _find_placeholder_end(expression: str, start: int) -> int:
+    """
+    Returns the index of the '}' closing the placeholder whose '{' is at 'start',
+    skipping over any nested braces or string literals.
+    """
+    depth = 0
+    i = start
+    n = len(expression)
+    while i < n:
+        c = expression[i]
+        if c in "\"'":
+            i = _find_string_end(expression, i) + 1
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return n - 1
+
+
+def _find_string_end(expression: str, start: int) -> int:
+    quote = expression[start]
+    i = start + 1
+    n = len(expression)
+    while i < n:
+        c = expression[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote:
+            return i
+        if c in "~$" and i + 1 < n and expression[i + 1] == "{":
+            i = _find_placeholder_end(expression, i + 1) + 1
+            continue
+        i += 1
+    return n - 1
+
+
+def _identifier_spans(expression: str, offset: int = 0) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yields (start, end, identifier) for every identifier in a WDL expression that is
+    not a member access (the 'out' in 'task.out') and not inside a string literal,
+    although identifiers within placeholders of string literals are included.
+    """
+    i = 0
+    n = len(expression)
+    previous = ""
+    while i < n:
+        c = expression[i]
+        if c in "\"'":
+            end = _find_string_end(expression, i)
+            j = i + 1
+            while j < end:
+                if expression[j] == "\\":
+                    j += 2
+                    continue
+                if expression[j] in "~$" and expression[j + 1 : j + 2] == "{":
+                    close = _find_placeholder_end(expression, j + 1)
+                    yield from _identifier_spans(
+                        expression[j + 2 : close], offset=offset + j + 2
+                    )
+                    j = close + 1
+                    continue
+                j += 1
+            i = end + 1
+            previous = c
+        elif _is_identifier_start(c):
+            j = i + 1
+            while j < n and _is_identifier_char(expression[j]):
+                j += 1
+            if previous != ".":
+                yield offset + i, offset + j, expression[i:j]
+            i = j
+            previous = "a"
+        elif c.isdigit():
+            j = i + 1
+            while j < n and (_is_identifier_char(expression[j]) or expression[j] == "."):
+                j += 1
+            i = j
+            previous = "0"
+        else:
+            if not c.isspace():
+                previous = c
+            i += 1
+
+
+def get_referenced_identifiers(expression) -> Set[str]:
+    """
+    Returns the root identifiers an expression references, eg: "task1.out + x" -> {"task1", "x"}.
+    This may include function names and keywords, which callers are expected to ignore.
+    """
+    if expression is None or isinstance(expression, (bool, int, float)):
+        return set()
+    if hasattr(expression, "get_string"):
+        expression = expression.get_string()
+    return {name for _, _, name in _identifier_spans(str(expression))}
+
+
+def rename_identifiers(expression: str, renames: Dict[str, str]) -> str:
+    """
+    Renames root identifiers within an expression, leaving member accesses
+    and string literal contents (other than placeholders) untouched.
+    """
+    if not renames or not isinstance(expression, str):
+        return expression
+    parts = []
+    last = 0
+    for start, end, name in _identifier_spans(expression):
+        if name in renames:
+            parts.append(expression[last:start])
+            parts.append(renames[name])
+            last = end
+    if not parts:
+        return expression
+    parts.append(expression[last:])
+    return "".join(parts)
+
+
 class WdlBase(ABC):
     @abstractmethod
     def get_string(self):
         raise Exception("Subclass must override .get_string() method")
 
+    def get_canonical_string(self) -> str:
+        with canonical_rendering():
+            s = self.get_string()
+        return "\n".join(s) if isinstance(s, list) else s
+
+    def fingerprint(self) -> str:
+        """
+        A stable hash (sha256 hex digest) of the canonical form of this node,
+        usable as a cache key across runs and machines. It isn't cached, as a
+        node can't tell when one of its children is modified.
+        """
+        return hashlib.sha256(self.get_canonical_string().encode()).hexdigest()
+
+    def clone(self, **overrides):
+        """
+        A shallow copy of this node with some attributes replaced, where the unchanged
+        children are shared with this node rather than copied. Lists and dicts are
+        copied (but not their contents), so appending to the clone's inputs won't change
+        this node, but shared children should be treated as immutable (or cloned too).
+
+        A KvClass attribute (eg: Task.runtime) can be overridden with a dict,
+        which is merged into a clone of it, eg: task.clone(runtime={"cpu": 4})
+
+        :param overrides: attribute name -> new value
+        """
+        new = copy.copy(self)
+        attributes = new.__dict__
+        for k, v in attributes.items():
+            if isinstance(v, list):
+                attributes[k] = list(v)
+            elif isinstance(v, dict):
+                attributes[k] = dict(v)
+
+        for k, v in overrides.items():
+            if k not in attributes:
+                raise Exception(
+                    f"Couldn't clone {type(self).__name__}, it has no attribute '{k}' to override"
+                )
+            current = getattr(self, k)
+            if isinstance(current, KvClass) and isinstance(v, dict):
+                v = current.clone(kwargs={**current.kwargs, **v})
+            attributes[k] = v
+
+        return new
+
+
+def clone_with_input_defaults(node, input_defaults: Optional[Dict[str, Any]]):
+    """
+    Replaces (with clones) the inputs of an already cloned Task / Workflow
+    that have a new default expression.
+    """
+    if not input_defaults:
+        return node
+    missing = set(input_defaults) - {i.name for i in node.inputs}
+    if missing:
+        raise Exception(
+            f"Couldn't override the defaults of unknown inputs: {', '.join(sorted(missing))}"
+        )
+    node.inputs = [
+        i.clone(expression=input_defaults[i.name]) if i.name in input_defaults else i
+        for i in node.inputs
+    ]
+    return node
+
+
+def externalise_input_literals(node, min_length: int, optional: bool):
+    """
+    Moves the literal defaults (of at least min_length characters) of a Task / Workflow's
+    inputs into an inputs JSON, see Workflow.externalise_literals.
+
+    :return: (clone of the node without those defaults, inputs JSON)
+    """
+    inputs_json = {}
+    new_inputs = []
+    for i in node.inputs:
+        expression = i.expression
+        if hasattr(expression, "get_string"):
+            expression = expression.get_string()
+        if not isinstance(expression, str) or len(expression) < min_length:
+            # numbers and bools are never large
+            new_inputs.append(i)
+            continue
+
+        if i.requires_quotes:
+            if "~{" in expression or "${" in expression:
+                # interpolated when rendered, so not a literal
+                new_inputs.append(i)
+                continue
+            value = expression
+        else:
+            try:
+                value = parse_wdl_literal(expression)
+            except Exception:
+                # an expression rather than a literal, which has to stay in the WDL
+                new_inputs.append(i)
+                continue
+
+        inputs_json[f"{node.name}.{i.name}"] = value
+        data_type = i.type
+        if optional and not data_type.optional:
+            data_type = copy.copy(data_type)
+            data_type.optional = True
+        new_inputs.append(i.clone(expression=None, type=data_type))
+
+    if not inputs_json:
+        return node, inputs_json
+    return node.clone(inputs=new_inputs), inputs_json
+
 
 class KvClass(WdlBase):
     def __init__(self, **kwargs):
@@ -58,7 +564,10 @@ class KvClass(WdlBase):
 class WrappedKvClass(KvClass):
     def get_string(self, indent=0):
         l = []
-        for k, v in self.kwargs.items():
+        items = self.kwargs.items()
+        if is_canonical_rendering():
+            items = sorted(items)
+        for k, v in items:
             val = convert_python_value_to_wdl_literal(v)
             l.append("  " * indent + "{k}: {v}".format(k=k, v=val))
         return "\n".join(l)
@@ -1,7 +1,16 @@
-from typing import List, Any
+from typing import List, Any, Optional, Dict, Tuple
 
 from .common import Input, Output
-from .util import WdlBase, Meta, ParameterMeta
+from .parallel import DEFAULT_CHUNK_SIZE, DEFAULT_MIN_CALLS, render_calls
+from .types import get_struct_definitions
+from .util import (
+    WdlBase,
+    Meta,
+    ParameterMeta,
+    is_canonical_rendering,
+    clone_with_input_defaults,
+    externalise_input_literals,
+)
 from .workflowcall import WorkflowCallBase
 
 
@@ -49,16 +58,59 @@ workflow {name} {{
 
 }}""".strip()
 
-    def get_string(self):
+    def clone(self, input_defaults: Optional[Dict[str, Any]] = None, **overrides):
+        """
+        See WdlBase.clone, eg: workflow.clone(name="variant", input_defaults={"threads": 4})
+
+        :param input_defaults: input name -> new expression, only these inputs are copied
+        """
+        return clone_with_input_defaults(super().clone(**overrides), input_defaults)
+
+    def externalise_literals(
+        self, min_length: int = 1024, optional: bool = False
+    ) -> Tuple["Workflow", Dict[str, Any]]:
+        """
+        Moves large literal input defaults (eg: sample lists, reference maps) out of
+        the WDL and into an inputs JSON, keyed by "{workflow}.{input}", so the WDL
+        stays small and doesn't change when only the data does.
+
+        :param min_length: only defaults that render to at least this many characters
+        :param optional: make the externalised inputs optional, rather than required
+        :return: (clone of this workflow without those defaults, inputs JSON)
+        """
+        return externalise_input_literals(self, min_length, optional)
+
+    def get_string(
+        self,
+        compact: bool = False,
+        workers: Optional[int] = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        min_calls: int = DEFAULT_MIN_CALLS,
+    ):
+        """
+        :param compact: emit machine-consumed WDL, skipping comments, input alignment,
+            the meta and parameter_meta sections and the blank lines between sections.
+        :param workers: render the calls across this many processes (None for every core),
+            large workflows only, see wdlgen.parallel.render_calls.
+        :param chunk_size: calls per unit of work when rendering in parallel
+        :param min_calls: render serially below this many calls
+        """
         tb = "  "
 
         name = self.name
         imports_block = ""
         blocks = []
-
-        if self.inputs:
+        inputs, outputs, imports = self.inputs, self.outputs, self.imports
+        if is_canonical_rendering():
+            inputs = sorted(inputs, key=lambda i: i.name)
+            outputs = sorted(outputs, key=lambda o: o.name if isinstance(o, Output) else str(o))
+            imports = sorted(imports, key=lambda i: i.get_string())
+            # the canonical context doesn't carry across to other processes
+            workers = 1
+
+        if inputs:
             ins = []
-            for i in self.inputs:
+            for i in inputs:
                 wd = i.get_string()
                 if isinstance(wd, list):
                     ins.extend(2 * tb + ii for ii in wd)
@@ -67,12 +119,35 @@ workflow {name} {{
             blocks.append(f"\n{tb}input {{\n" + "\n".join(ins) + f"\n{tb}}}")
 
         if self.calls:
-            blocks.append("\n" + "\n\n".join(c.get_string(indent=1) for c in self.calls))
+            call_separator = "\n" if compact else "\n\n"
+            blocks.append(
+                "\n"
+                + call_separator.join(
+                    render_calls(
+                        self.calls,
+                        indent=1,
+                        compact=compact,
+                        workers=workers,
+                        chunk_size=chunk_size,
+                        min_calls=min_calls,
+                    )
+                )
+            )
+
+        if imports:
+            imports_block = "\n".join(i.get_string() for i in imports)
 
-        if self.imports:
-            imports_block = "\n".join(i.get_string() for i in self.imports)
+        structs = [
+            s.get_definition()
+            for s in get_struct_definitions(
+                [
+                    *(i.type for i in inputs),
+                    *(o.type for o in outputs if isinstance(o, Output)),
+                ]
+            )
+        ]
 
-        if self.meta:
+        if self.meta and not compact:
             mt = self.meta.get_string(indent=2)
             if mt:
                 blocks.append(
@@ -81,7 +156,7 @@ workflow {name} {{
                     )
                 )
 
-        if self.param_meta:
+        if self.param_meta and not compact:
             pmt = self.param_meta.get_string(indent=2)
             if pmt:
                 blocks.append(
@@ -91,10 +166,10 @@ workflow {name} {{
                     )
                 )
 
-        if self.outputs:
+        if outputs:
             outs = []
             # either str | Output | list[str | Output]
-            for o in self.outputs:
+            for o in outputs:
                 if isinstance(o, Output):
                     wd = o.get_string()
                     if isinstance(wd, list):
@@ -107,9 +182,21 @@ workflow {name} {{
                 "\n{tb}output {{\n{outs}\n{tb}}}".format(tb=tb, outs="\n".join(outs))
             )
 
+        if compact:
+            return "\n".join(
+                [
+                    f"version {self.version}",
+                    *([imports_block] if imports_block else []),
+                    *structs,
+                    f"workflow {name} {{",
+                    *(b.strip("\n") for b in blocks),
+                    "}",
+                ]
+            )
+
         return self.format.format(
             name=name,
-            imports_block=imports_block,
+            imports_block="\n\n".join([imports_block, *structs]).strip("\n"),
             blocks="\n".join(blocks),
             version=self.version,
         )
@@ -123,10 +210,12 @@ workflow {name} {{
             if tools_dir and not self.tools_dir.endswith("/"):
                 tools_dir += "/"
 
+        @property
+        def path(self) -> str:
+            return "{tools_dir}{tool}.wdl".format(
+                tools_dir=self.tools_dir if self.tools_dir else "", tool=self.name
+            )
+
         def get_string(self):
             as_alias = " as " + self.alias if self.alias else ""
-            return 'import "{tools_dir}{tool}.wdl"{as_alias}'.format(
-                tools_dir=self.tools_dir if self.tools_dir else "",
-                tool=self.name,
-                as_alias=as_alias,
-            )
+            return 'import "{path}"{as_alias}'.format(path=self.path, as_alias=as_alias)
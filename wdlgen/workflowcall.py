@@ -1,92 +1,358 @@
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, List, Optional
+from collections.abc import Mapping, MutableMapping
+from types import MappingProxyType
+from typing import Any, List, Optional, Tuple
 
-from .util import WdlBase
+from .types import ArrayType, PairType, WdlType
+from .util import WdlBase, is_canonical_rendering
 
 
 
-@dataclass
 class StepValueLine:
-    tag: str
-    value: str
-    position: int = 999
-    special: Optional[str] = None
-    prefix: Optional[str] = None
-    default: Optional[str] = None
-    datatype: Optional[str] = None
+    """
+    One input of a call, a row of StepValueColumns.
+    """
+
+    __slots__ = ("tag", "value", "position", "special", "prefix", "default", "datatype")
+
+    def __init__(
+        self,
+        tag: str,
+        value: str,
+        position: int = 999,
+        special: Optional[str] = None,
+        prefix: Optional[str] = None,
+        default: Optional[str] = None,
+        datatype: Optional[str] = None,
+    ):
+        self.tag = tag
+        self.value = value
+        self.position = position
+        self.special = special
+        self.prefix = prefix
+        self.default = default
+        self.datatype = datatype
+
+    def __eq__(self, other):
+        if not isinstance(other, StepValueLine):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"StepValueLine({fields})"
 
     @property
     def tag_and_value(self) -> str:
         return f'{self.tag}={self.value}'
 
-    
+
+class StepValueColumns:
+    """
+    The inputs of a call, stored as parallel columns (one entry per input) rather than
+    a dict per input, with the render order cached until the inputs change. A detail
+    column (eg: datatypes) is only allocated once an input sets it, so it's None
+    until then, and unset details are left out of to_details().
+    """
+
+    __slots__ = (
+        "tags", "values", "positions", "specials", "prefixes", "defaults", "datatypes",
+        "_rows", "_order", "_canonical_order",
+    )
+
+    # detail key -> column
+    details = {
+        "value": "values",
+        "position": "positions",
+        "special": "specials",
+        "prefix": "prefixes",
+        "default": "defaults",
+        "datatype": "datatypes",
+    }
+
+    def __init__(self, inputs_details: Optional[dict[str, dict[str, Any]]] = None):
+        self.tags: list[str] = []
+        self.values: list[Any] = []
+        self.positions = self.specials = self.prefixes = self.defaults = self.datatypes = None
+        # tag -> row, built on the first lookup by tag
+        self._rows: Optional[dict[str, int]] = None
+        self._order = self._canonical_order = None
+        for tag, d in (inputs_details or {}).items():
+            # the tags of a dict are already unique
+            self._append(tag, d)
+
+    @staticmethod
+    def from_lines(lines: list[StepValueLine]) -> 'StepValueColumns':
+        columns = StepValueColumns()
+        for ln in lines:
+            columns.set(
+                ln.tag, ln.value, position=ln.position, special=ln.special,
+                prefix=ln.prefix, default=ln.default, datatype=ln.datatype,
+            )
+        return columns
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __contains__(self, tag):
+        return tag in self.rows
+
+    def __getstate__(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    @property
+    def rows(self) -> dict[str, int]:
+        if self._rows is None:
+            self._rows = {t: i for i, t in enumerate(self.tags)}
+        return self._rows
+
+    def copy(self) -> 'StepValueColumns':
+        new = StepValueColumns.__new__(StepValueColumns)
+        for k in self.__slots__:
+            v = getattr(self, k)
+            setattr(new, k, v.copy() if isinstance(v, (list, dict)) else v)
+        return new
+
+    def _known_details(self, details: dict[str, Any]) -> dict[str, Any]:
+        # like the dicts of inputs_details, keys that aren't a detail are ignored
+        return {k: v for k, v in details.items() if k in self.details}
+
+    def _append(self, tag: str, details: dict[str, Any]):
+        row = len(self.tags)
+        self.tags.append(tag)
+        self.values.append(None)
+        for column in ("positions", "specials", "prefixes", "defaults", "datatypes"):
+            cells = getattr(self, column)
+            if cells is not None:
+                cells.append(None)
+        if self._rows is not None:
+            self._rows[tag] = row
+        self._order = self._canonical_order = None
+        self._set_details(row, self._known_details(details))
+
+    def _set_details(self, row: int, details: dict[str, Any]):
+        for k, v in details.items():
+            column = self.details[k]
+            if column == "values":
+                self.values[row] = v
+                continue
+            cells = getattr(self, column)
+            if cells is None:
+                if v is None:
+                    continue
+                cells = [None] * len(self.tags)
+                setattr(self, column, cells)
+            cells[row] = v
+
+    def set(self, tag: str, value: Any = None, **details):
+        """
+        Adds the input, or updates the given details of an existing one.
+        """
+        if value is not None:
+            details["value"] = value
+        self.update(tag, details)
+
+    def update(self, tag: str, details: dict[str, Any]):
+        """
+        Adds the input, or sets the details given (including to None) of an existing one.
+        """
+        row = self.rows.get(tag)
+        if row is None:
+            self._append(tag, details)
+            return
+        details = self._known_details(details)
+        if "position" in details or "special" in details:
+            # the order only depends on the tags, positions and specials
+            self._order = self._canonical_order = None
+        self._set_details(row, details)
+
+    def remove(self, tag: str):
+        row = self.rows[tag]
+        for column in ("tags", *self.details.values()):
+            cells = getattr(self, column)
+            if cells is not None:
+                del cells[row]
+        self._rows = None
+        self._order = self._canonical_order = None
+
+    def get(self, tag: str) -> dict[str, Any]:
+        row = self.rows[tag]
+        details = {}
+        for k, column in self.details.items():
+            cells = getattr(self, column)
+            if cells is not None and cells[row] is not None:
+                details[k] = cells[row]
+        return details
+
+    def to_details(self) -> dict[str, dict[str, Any]]:
+        return {tag: self.get(tag) for tag in self.tags}
+
+    def cell(self, column: str, row: int) -> Any:
+        cells = getattr(self, column)
+        return cells[row] if cells is not None else None
+
+    def line(self, row: int) -> StepValueLine:
+        position = self.cell("positions", row)
+        return StepValueLine(
+            self.tags[row], self.values[row], 999 if position is None else position,
+            *(self.cell(c, row) for c in ("specials", "prefixes", "defaults", "datatypes")),
+        )
+
+    def order(self) -> list[int]:
+        """
+        The rows in render order: 'special' priority, then position (then tag when canonical).
+        """
+        canonical = is_canonical_rendering()
+        order = self._canonical_order if canonical else self._order
+        if order is not None:
+            return order
+
+        specials, positions, tags = self.specials, self.positions, self.tags
+        if specials is None and positions is None:
+            # all in the default position
+            order = sorted(range(len(tags)), key=tags.__getitem__) if canonical else list(range(len(tags)))
+        else:
+            def key(i):
+                position = positions[i] if positions is not None else None
+                special = specials[i] if specials is not None else None
+                position = 999 if position is None else position
+                if canonical:
+                    return (special == '', position, tags[i])
+                return (special == '', position)
+
+            order = sorted(range(len(tags)), key=key)
+
+        if canonical:
+            self._canonical_order = order
+        else:
+            self._order = order
+        return order
+
+
 class StepValueSection:
-    def __init__(self, lines: list[StepValueLine]):
-        self.lines = self.order_lines(lines)
+    def __init__(
+        self,
+        lines: Optional[list[StepValueLine]] = None,
+        columns: Optional[StepValueColumns] = None,
+    ):
+        self.columns = columns if columns is not None else StepValueColumns.from_lines(lines or [])
         self.padding = 2
 
+    @property
+    def lines(self) -> list[StepValueLine]:
+        return [self.columns.line(i) for i in self.columns.order()]
+
     def order_lines(self, lines: list[StepValueLine]) -> list[StepValueLine]:
-        lines.sort(key=lambda x: x.position)                    # normal position
-        lines.sort(key=lambda x: x.special != '', reverse=True) # 'special' priority
-        return lines
+        # 'special' priority, then normal position. Returns a new list
+        # so the caller's lines aren't reordered underneath them.
+        columns = StepValueColumns()
+        for ln in lines:
+            # appended rather than set, so lines with the same tag are all kept
+            columns._append(ln.tag, {"position": ln.position, "special": ln.special})
+        return [lines[i] for i in columns.order()]
 
     @property
     def tag_value_width(self) -> int:
-        width = max([len(f'{x.tag_and_value},') for x in self.lines])
+        c = self.columns
+        width = max([len(f'{t}={v},') for t, v in zip(c.tags, c.values)])
         return self.add_padding(width)
 
     @property
     def datatype_width(self) -> int:
-        lines = [x for x in self.lines if x.datatype is not None]
-        if not lines:
-            return 0
-        width = max([len(x.datatype) for x in lines]) # type: ignore
-        return self.add_padding(width)
-    
+        return self.column_width(self.columns.datatypes)
+
     @property
     def prefix_width(self) -> int:
-        lines = [x for x in self.lines if x.prefix is not None]
-        if not lines:
+        return self.column_width(self.columns.prefixes)
+
+    def column_width(self, column: Optional[list]) -> int:
+        widths = [len(x) for x in column or () if x is not None]
+        if not widths:
             return 0
-        width = max([len(x.prefix) for x in lines]) # type: ignore
-        return self.add_padding(width)
-    
+        return self.add_padding(max(widths))
+
     def add_padding(self, width: int) -> int:
         if width > 0:
             width += self.padding
         return width
 
     def render(self, indent: int, tb: str, render_comments: bool=True) -> str:
+        c = self.columns
         str_lines: list[str] = []
         ind = (indent + 1) * tb
-        
-        # generate string representation of each line
-        for i, ln in enumerate(self.lines):
-            comma = ',' if i < len(self.lines) - 1 else ''   # ignore comma for last line
-            datatype = f'{ln.datatype:<{self.datatype_width}}' if ln.datatype else ''
-            prefix = f'{ln.prefix:<{self.prefix_width}}' if ln.prefix else ''
-            default = ln.default if ln.default else ''
-            special = ln.special if ln.special else ''
-            
+        last = len(c) - 1
+
+        if render_comments and len(c):
+            tag_value_width = self.tag_value_width
+            datatype_width = self.datatype_width
+            prefix_width = self.prefix_width
+
+        # generate string representation of each line, straight from the columns
+        for i, row in enumerate(c.order()):
+            comma = ',' if i < last else ''   # ignore comma for last line
+            tag_and_value = f'{c.tags[row]}={c.values[row]}'
+
             if render_comments:
-                tag_value = f'{ln.tag_and_value + comma:<{self.tag_value_width}}'
+                datatype, prefix = c.cell('datatypes', row), c.cell('prefixes', row)
+                datatype = f'{datatype:<{datatype_width}}' if datatype else ''
+                prefix = f'{prefix:<{prefix_width}}' if prefix else ''
+                default = c.cell('defaults', row) or ''
+                special = c.cell('specials', row) or ''
+                tag_value = f'{tag_and_value + comma:<{tag_value_width}}'
                 str_line = f'{ind}{tb}{tag_value}# {datatype}{prefix}{default}  {special}'
             else:
-                tag_value = f'{ln.tag_and_value + comma}'
-                str_line = f'{ind}{tb}{tag_value}'
+                str_line = f'{ind}{tb}{tag_and_value}{comma}'
             str_lines.append(str_line)
-        
+
         # join lines and return body segment
         inputs = '\n'.join(str_lines)
         return f"{{\n{ind}input:\n{inputs}"
 
 
+class _InputsDetailsView(MutableMapping):
+    """
+    WorkflowCall.inputs_details as a dict of tag -> details, writing through to the
+    columns. Each input's details are read-only, so set them with call.inputs_details[tag] = {...}
+    (or call.set_input) rather than changing them in place.
+    """
+
+    def __init__(self, columns: StepValueColumns):
+        self.columns = columns
+
+    def __getitem__(self, tag):
+        return MappingProxyType(self.columns.get(tag))
+
+    def __setitem__(self, tag, details):
+        # replaces every detail (but keeps the input's place), like assigning to a dict
+        self.columns.update(tag, {**dict.fromkeys(StepValueColumns.details), **details})
+
+    def __delitem__(self, tag):
+        self.columns.remove(tag)
+
+    def __iter__(self):
+        return iter(list(self.columns.tags))
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.columns.to_details())
+
+
 class WorkflowCallBase(WdlBase, ABC):
     @abstractmethod
-    def get_string(self, indent: int=1):
-        raise Exception("Must override 'get_string(indent:int)'")
+    def get_string(self, indent: int=1, compact: bool=False):
+        raise Exception("Must override 'get_string(indent:int, compact:bool)'")
 
 
 class WorkflowCall(WorkflowCallBase):
@@ -95,55 +361,159 @@ class WorkflowCall(WorkflowCallBase):
         self,
         namespaced_identifier: str,
         alias: Optional[str] = None,
-        inputs_details: dict[str, dict[str, Any]] = {},
+        inputs_details: Optional[dict[str, dict[str, Any]]] = None,
         messages: Optional[list[str]] = None,
-        render_comments: bool = True
+        render_comments: bool = True,
+        task: Any = None,
     ):
         """
         would prefer the 'inputs_details' to be an object, but 
         don't want to have a shared dependency between janis-core and wdlgen.
         """
         """
-        :param task:
+        :param task: the Task being called, or a handle on it (eg: a wdlgen.registry.TaskRef,
+            loaded on demand), anything with inputs and outputs. If given, input tags are
+            checked against the task's inputs, and get_output_type can be used.
         :param namespaced_identifier: Required if task is imported. The workflow might take care of this later?
         :param alias:
         :param inputs_details:
         """
         self.namespaced_identifier = namespaced_identifier
         self.alias = alias
-        self.inputs_details = inputs_details
+        self.task = task
+        # (task, the names of its inputs), computed on the first check against the task
+        self._task_input_names: Optional[Tuple[Any, frozenset]] = None
+        self.input_columns = StepValueColumns(inputs_details)
         self.messages: list[str] = messages if messages else []
         self.render_comments = render_comments
+        self._check_input_tags(self.input_columns.tags)
+
+    @property
+    def inputs_details(self) -> MutableMapping:
+        """
+        The inputs as tag -> {value, position, special, prefix, default, datatype},
+        a view over input_columns, see set_input to add or update an input.
+        """
+        return _InputsDetailsView(self.input_columns)
+
+    @inputs_details.setter
+    def inputs_details(self, inputs_details: Optional[dict[str, dict[str, Any]]]):
+        columns = StepValueColumns(inputs_details)
+        self._check_input_tags(columns.tags)
+        self.input_columns = columns
+
+    def set_input(self, tag: str, value: Any = None, **details):
+        """
+        Adds the input, or updates the given details of an existing one,
+        eg: call.set_input("threads", "4", datatype="Int")
+        """
+        if tag not in self.input_columns:
+            self._check_input_tags([tag])
+        self.input_columns.set(tag, value, **details)
+
+    def _check_input_tags(self, tags):
+        if self.task is None or not tags:
+            return
+        known = self.task_input_names()
+        unknown = [t for t in tags if t not in known]
+        if unknown:
+            raise Exception(
+                f"Couldn't set the inputs {', '.join(unknown)} of call '{self.name}', "
+                f"the task '{self.task.name}' doesn't have them"
+            )
+
+    def task_input_names(self) -> frozenset:
+        """
+        The names of the task's inputs, kept (and shared with clones) until the task is replaced.
+        """
+        cached = self._task_input_names
+        if cached is None or cached[0] is not self.task:
+            cached = self._task_input_names = (self.task, frozenset(i.name for i in self.task.inputs))
+        return cached[1]
+
+    def get_output_type(self, output: str):
+        """
+        The type of one of the task's outputs, ie: of '{call name}.{output}', requires the task.
+        """
+        if self.task is None:
+            raise Exception(f"Couldn't get the type of '{self.name}.{output}', the call has no task")
+        for o in self.task.outputs:
+            if o.name == output:
+                return o.type
+        raise Exception(
+            f"Couldn't get the type of '{self.name}.{output}', the task '{self.task.name}' has no such output"
+        )
+
+    def remove_input(self, tag: str):
+        self.input_columns.remove(tag)
 
-    def get_string(self, indent: int=1):
-        self.tb: str = '  '
-        self.indent: int = indent
-        ind = self.indent * self.tb
+    def clone(self, input_values: Optional[dict[str, Any]] = None, **overrides):
+        """
+        See WdlBase.clone, eg: call.clone(alias="variant", input_values={"threads": "4"})
+
+        :param input_values: input tag -> new value, merged into a copy of the inputs
+        """
+        if "inputs_details" in overrides:
+            overrides["input_columns"] = StepValueColumns(overrides.pop("inputs_details"))
+        new = super().clone(**overrides)
+        if "input_columns" not in overrides:
+            new.input_columns = self.input_columns.copy()
+        if "input_columns" in overrides:
+            new._check_input_tags(new.input_columns.tags)
+        for tag, value in (input_values or {}).items():
+            new.set_input(tag, value)
+        return new
+
+    @property
+    def name(self) -> str:
+        """
+        The name other calls and outputs use to reference this call, ie: the alias,
+        or the last component of the namespaced identifier.
+        """
+        return self.alias if self.alias else self.namespaced_identifier.split(".")[-1]
+
+    def get_string(self, indent: int=1, compact: bool=False):
+        """
+        :param compact: skip the messages, and the aligned comments on each input
+        """
+        tb = '  '
+        ind = indent * tb
         name = self.namespaced_identifier
         alias = ' as ' + self.alias if self.alias else ''
-        body = self.get_body()
-        if self.render_comments and self.messages:
+        # comments and messages aren't part of the canonical form
+        render_comments = self.render_comments and not (compact or is_canonical_rendering())
+        body = self.get_body(indent, render_comments, tb)
+        if render_comments and self.messages:
             msgs = '\n'.join([f'{ind}#{msg}' for msg in self.messages]) + '\n'
         else:
             msgs = ''
         return f'{msgs}{ind}call {name}{alias} {body}\n{ind}}}'
 
-    def get_body(self) -> str:
-        value_lines = self.init_known_input_lines()
-        value_section = StepValueSection(value_lines)
-        return value_section.render(indent=self.indent, tb=self.tb, render_comments=self.render_comments)
+    def get_body(self, indent: int=1, render_comments: bool=True, tb: str='  ') -> str:
+        value_section = StepValueSection(columns=self.input_columns)
+        return value_section.render(indent=indent, tb=tb, render_comments=render_comments)
 
     def init_known_input_lines(self) -> list[StepValueLine]:
-        out: list[StepValueLine] = []
-        for tag, d in self.inputs_details.items():
-            # init line
-            line = StepValueLine(tag=tag, value=d['value'])
-            # set optional info
-            for key, val in d.items():
-                if hasattr(line, key):
-                    setattr(line, key, val)
-            out.append(line)
-        return out
+        return [self.input_columns.line(i) for i in range(len(self.input_columns))]
+
+
+class WorkflowDeclaration(WorkflowCallBase):
+    """
+    A (non-input) declaration in the body of a workflow, scatter or conditional,
+    eg: 'Int n = length(samples)'. Within a scatter or conditional it's gathered
+    like a call output.
+    """
+
+    def __init__(self, data_type, name: str, expression: str):
+        """
+        :param data_type: WdlType
+        """
+        self.type = data_type
+        self.name = name
+        self.expression = expression
+
+    def get_string(self, indent: int=1, compact: bool=False):
+        return f'{indent * "  "}{self.type.get_string()} {self.name} = {self.expression}'
 
 
 class WorkflowConditional(WorkflowCallBase):
@@ -151,12 +521,24 @@ class WorkflowConditional(WorkflowCallBase):
         self.condition = condition
         self.calls = calls or []
 
-    def get_string(self, indent=1):
-        body = "\n".join(c.get_string(indent=indent + 1) for c in self.calls)
+    def get_string(self, indent=1, compact=False):
+        body = "\n".join(
+            c.get_string(indent=indent + 1, compact=compact) for c in self.calls
+        )
         return "{ind}if ({condition}) {{\n {body}\n{ind}}}".format(
             ind=indent * "  ", condition=self.condition, body=body
         )
 
+    def get_gathered_type(self, name: str) -> WdlType:
+        """
+        The type of a declaration in this conditional (or nested within it)
+        when referenced after it, ie: optional.
+        """
+        data_type = _get_gathered_type(self, name)
+        if data_type is None:
+            raise Exception(f"Couldn't find a declaration '{name}' in the conditional")
+        return data_type
+
 
 class WorkflowScatter(WorkflowCallBase):
     def __init__(
@@ -165,14 +547,120 @@ class WorkflowScatter(WorkflowCallBase):
         self.identifier: str = identifier
         self.expression: str = expression
         self.calls: List[WorkflowCall] = calls if calls else []
+        # the type of the identifier, when known (eg: a zip or cross scatter)
+        self.element_type: Optional[WdlType] = None
+
+    @staticmethod
+    def zip(
+        identifier: str, arrays: List[Tuple[Any, str, str]], calls: List[WorkflowCall] = None
+    ) -> "WorkflowScatter":
+        """
+        Scatters jointly over parallel arrays (of the same length), eg:
+
+            WorkflowScatter.zip("sample", [("File", "bam", "bams"), ("String", "name", "names")])
+
+            scatter (sample in zip(bams, names)) {
+              File bam = sample.left
+              String name = sample.right
+              ...
+
+        Three or more arrays are nested on the right, ie: zip(a, zip(b, c)).
+
+        :param arrays: (element type, binding name, array expression), each element type
+            a WdlType or its string (eg: "File"), and each element
+            is bound to its name at the top of the body for the calls to reference
+        """
+        return WorkflowScatter._from_pairs("zip", identifier, arrays, calls)
+
+    @staticmethod
+    def cross(
+        identifier: str, arrays: List[Tuple[Any, str, str]], calls: List[WorkflowCall] = None
+    ) -> "WorkflowScatter":
+        """
+        Scatters over every combination of the arrays' elements, as one scatter
+        rather than nested scatters, see WorkflowScatter.zip.
+        """
+        return WorkflowScatter._from_pairs("cross", identifier, arrays, calls)
+
+    @staticmethod
+    def _from_pairs(
+        function: str, identifier: str, arrays: List[Tuple[Any, str, str]], calls
+    ) -> "WorkflowScatter":
+        if len(arrays) < 2:
+            raise Exception(
+                f"Couldn't {function} scatter '{identifier}', it requires at least 2 arrays"
+            )
+        element_types = [WdlType.parse_type(t) for t, _, _ in arrays]
+
+        expression = arrays[-1][2]
+        for _, _, array in reversed(arrays[:-1]):
+            expression = f"{function}({array}, {expression})"
 
-    def get_string(self, indent=1):
+        bindings = []
+        for i, (data_type, (_, name, _)) in enumerate(zip(element_types, arrays)):
+            # the last array is the right of the innermost pair
+            access = identifier + ".right" * i + (".left" if i < len(arrays) - 1 else "")
+            bindings.append(WorkflowDeclaration(data_type, name, access))
+
+        element_type = element_types[-1]
+        for t in reversed(element_types[:-1]):
+            element_type = WdlType(PairType(t, element_type))
+
+        scatter = WorkflowScatter(identifier, expression, [*bindings, *(calls or [])])
+        scatter.element_type = element_type
+        return scatter
+
+    def get_gathered_type(self, name: str) -> WdlType:
+        """
+        The type of a declaration in this scatter (or nested within it) when
+        referenced after it, eg: an Array of the element binding's type.
+        """
+        data_type = _get_gathered_type(self, name)
+        if data_type is None:
+            raise Exception(
+                f"Couldn't find a declaration '{name}' in the scatter '{self.identifier}'"
+            )
+        return data_type
+
+    def get_string(self, indent=1, compact=False):
+        body = "\n".join(
+            c.get_string(indent=indent + 1, compact=compact) for c in self.calls
+        )
+        return self.get_string_from_body(body, indent)
+
+    def get_string_from_body(self, body: str, indent=1):
+        """
+        Wraps the already rendered calls in the scatter statement,
+        used when the body is rendered separately (eg: in parallel).
+        """
         scatter_iteration_statement = "{identifier} in {expression}".format(
             identifier=self.identifier, expression=self.expression
         )
 
-        body = "\n".join(c.get_string(indent=indent + 1) for c in self.calls)
-
         return "{ind}scatter ({st}) {{\n{body}\n{ind}}}".format(
             ind=indent * "  ", st=scatter_iteration_statement, body=body
         )
+
+
+def _get_gathered_type(block, name: str) -> Optional[WdlType]:
+    """
+    Every enclosing scatter gathers the declaration into an Array, and
+    every enclosing conditional makes it optional.
+    """
+    for item in block.calls:
+        if isinstance(item, WorkflowDeclaration) and item.name == name:
+            data_type = item.type
+        elif isinstance(item, (WorkflowScatter, WorkflowConditional)):
+            data_type = _get_gathered_type(item, name)
+            if data_type is None:
+                continue
+        else:
+            continue
+
+        if isinstance(block, WorkflowScatter):
+            return WdlType(ArrayType(data_type, requires_multiple=False))
+        if data_type.optional:
+            return data_type
+        return WdlType(data_type, optional=True)
+
+    return None